@@ -0,0 +1,56 @@
+"""
+Бенчмарки очереди, кэша, индикаторов и построения графика
+
+Нужен pytest-benchmark (pip install -e .[dev]); без него модули
+пропускаются. Биржа заменена синтетической (benchmarks.fake_exchange), сеть
+не используется, кэш пишется во временный HOME.
+
+    python -m pytest benchmarks --benchmark-autosave
+    python -m pytest benchmarks --benchmark-compare
+    pytest-benchmark compare 0001 0002 --group-by=name
+
+--benchmark-autosave сохраняет результаты в .benchmarks/ с хэшем коммита в
+имени файла, --benchmark-compare сравнивает прогон с последним сохраненным.
+Размеры до миллиона свечей ограничиваются переменной
+KUCOIN_VIEWER_BENCH_MAX_CANDLES (по умолчанию 1000000).
+"""
+import os
+
+import pytest
+
+# Без цикла событий Qt: callback'и доставляются в потоке задачи
+os.environ.setdefault("KUCOIN_VIEWER_HEADLESS", "1")
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.fake_exchange import install_fake_exchange, make_archive, make_symbols  # noqa: E402
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """Временный HOME: кэш и хранилище ApiClient не смешиваются с рабочими"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def archive():
+    return make_archive(make_symbols(20), timeframe='1m', candles=5000)
+
+
+@pytest.fixture
+def api_client(home, archive):
+    from core.api_client import ApiClient
+
+    client = ApiClient()
+    install_fake_exchange(client, archive)
+    return client
+
+
+@pytest.fixture
+def request_queue(api_client):
+    from core.request_queue import RequestQueue
+
+    queue = RequestQueue(api_client)
+    yield queue
+    queue.stop()
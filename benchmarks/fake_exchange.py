@@ -0,0 +1,79 @@
+"""
+Синтетическая биржа для бенчмарков и нагрузочных тестов
+
+Архив core.replay заполняется сгенерированными рынками, тикерами и
+свечами (случайное блуждание с фиксированным seed), а ReplayExchange
+подключается к ExchangePool клиента вместо ccxt. Прогоны не ходят в сеть и
+повторяются от запуска к запуску.
+"""
+import os
+
+import ccxt
+import numpy as np
+
+from core.data_manager import rows_to_candles
+from core.replay import ReplayArchive, ReplayExchange
+
+
+START_MS = 1704067200000  # 2024-01-01 UTC
+
+MAX_CANDLES = int(os.environ.get("KUCOIN_VIEWER_BENCH_MAX_CANDLES", "1000000"))
+
+# Размеры рядов свечей от одного графика до многолетней минутной истории
+CANDLE_SIZES = [size for size in (1000, 10000, 100000, 1000000) if size <= MAX_CANDLES]
+
+
+def make_candle_array(count, timeframe_ms=60000, start_ms=START_MS, seed=0):
+    """Свечи массивом (count, 6): ts в мс и OHLCV"""
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, count)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.001, count)) * close
+    candles = np.empty((count, 6))
+    candles[:, 0] = start_ms + np.arange(count) * timeframe_ms
+    candles[:, 1] = open_
+    candles[:, 2] = np.maximum(open_, close) + spread
+    candles[:, 3] = np.minimum(open_, close) - spread
+    candles[:, 4] = close
+    candles[:, 5] = rng.gamma(2.0, 50.0, count)
+    return candles
+
+
+def make_candle_frame(count, timeframe_ms=60000, start_ms=START_MS, seed=0):
+    """Свечи DataFrame в формате ApiClient (timestamp + OHLCV)"""
+    return rows_to_candles(make_candle_array(count, timeframe_ms, start_ms, seed))
+
+
+def make_symbols(count):
+    return [f"COIN{index}/USDT" for index in range(count)]
+
+
+def make_archive(symbols, timeframe='1m', candles=5000, start_ms=START_MS, rate_limit_ms=1):
+    """
+    Архив с рынками, тикерами и свечами для symbols
+
+    rate_limit_ms попадает в rateLimit биржи - по нему ExchangeClient
+    настраивает свой ограничитель запросов.
+    """
+    timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    archive = ReplayArchive(meta={'rateLimit': rate_limit_ms})
+    archive.add('fetch_markets', [], {}, result=[
+        {'symbol': symbol, 'base': symbol.split('/')[0], 'quote': symbol.split('/')[1], 'active': True,
+         'precision': {'price': 0.0001}, 'limits': {'amount': {'min': 0.01}}}
+        for symbol in symbols
+    ])
+    for seed, symbol in enumerate(symbols):
+        rows = make_candle_array(candles, timeframe_ms, start_ms, seed)
+        archive.add('fetch_ohlcv', [symbol, timeframe], {}, result=rows.tolist(), ts=start_ms)
+        last = rows[-1]
+        archive.add('fetch_ticker', [symbol], {}, result={
+            'symbol': symbol, 'last': last[4], 'bid': last[4] * 0.999, 'ask': last[4] * 1.001,
+            'high': last[2], 'low': last[3], 'volume': last[5], 'percentage': 0.0, 'timestamp': int(last[0]),
+        })
+    return archive
+
+
+def install_fake_exchange(api_client, archive, exchange_id='kucoin', latency=0.0, rate=0.0):
+    """Подключает ReplayExchange по archive к ExchangePool клиента; возвращает ExchangeClient"""
+    exchange = ReplayExchange(archive, exchange_id, latency=latency, rate=rate)
+    return api_client.exchanges.install(exchange_id, exchange)
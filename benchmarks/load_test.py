@@ -0,0 +1,365 @@
+"""
+Нагрузочный тест RequestQueue
+
+Несколько пользователей одновременно ставят задачи в одну очередь, как
+аналитики общего сервиса загрузки: графики (fetch_ohlcv), тикеры, поиск
+растущих монет и выгрузки на TCP-коллектор. Каждый пользователь - поток,
+отправляющий запросы с пуассоновскими интервалами; тип запроса выбирается
+по весам --mix. Биржа синтетическая (benchmarks.fake_exchange) с задержкой
+ответа и ограничением частоты, выгрузки принимает коллектор внутри процесса.
+
+    python -m benchmarks.load_test --users 10 --rate 2 --duration 60
+    python -m benchmarks.load_test --users 50 --rate 1 --mix chart=6,ticker=3,trending=0,upload=1 \\
+        --exchange-rate 30 --latency 0.05 --csv load.csv
+
+Раз в --interval печатается строка: пропускная способность, глубина очереди,
+p50/p99 ожидания в очереди, ожидания лимита биржи и полного времени
+выполнения, число потоков и память процесса; в конце - сводка по типам
+задач. Время выполнения (от add_request до callback) меряется точно;
+ожидания берутся из гистограмм queue_wait и rate_limit_wait core.metrics и
+точны до границы корзины.
+"""
+import os
+
+# До импорта модулей core: без цикла событий Qt callback'и вызываются в потоке задачи
+os.environ.setdefault("KUCOIN_VIEWER_HEADLESS", "1")
+
+import argparse  # noqa: E402
+import csv  # noqa: E402
+import logging  # noqa: E402
+import random  # noqa: E402
+import shutil  # noqa: E402
+import socketserver  # noqa: E402
+import tempfile  # noqa: E402
+import threading  # noqa: E402
+import time  # noqa: E402
+from collections import defaultdict  # noqa: E402
+
+from benchmarks.fake_exchange import install_fake_exchange, make_archive, make_candle_frame, make_symbols  # noqa: E402
+from core.api_client import ApiClient  # noqa: E402
+from core.log import setup_logging  # noqa: E402
+from core.metrics import QUEUE_WAIT, RATE_LIMIT_WAIT, Histogram, pipeline_metrics  # noqa: E402
+from core.request_queue import RequestQueue  # noqa: E402
+from core.result_dispatcher import ResultDispatcher  # noqa: E402
+from core.tcp_sink import FRAME_HEADER, TcpSink  # noqa: E402
+
+
+# Тип запроса в --mix -> тип задачи RequestQueue
+REQUEST_TYPES = {
+    'chart': 'fetch_ohlcv',
+    'ticker': 'fetch_ticker',
+    'trending': 'fetch_trending_coins',
+    'upload': 'upload_data',
+}
+DEFAULT_MIX = 'chart=5,ticker=4,trending=1,upload=1'
+
+
+def parse_mix(text):
+    """'chart=5,ticker=4' -> {'chart': 5.0, 'ticker': 4.0}"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in REQUEST_TYPES:
+            raise argparse.ArgumentTypeError(f"Unknown request type: {name} (expected {', '.join(REQUEST_TYPES)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("Request mix has no positive weights")
+    return mix
+
+
+def percentile(values, q):
+    """Квантиль по ближайшему рангу; values отсортированы"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def histogram_delta(current, previous):
+    """Наблюдения гистограммы current, сделанные после снимка previous"""
+    delta = Histogram(current.buckets)
+    if previous is None:
+        previous = Histogram(current.buckets)
+    delta.counts = [now - before for now, before in zip(current.counts, previous.counts)]
+    delta.count = current.count - previous.count
+    delta.sum = current.sum - previous.sum
+    delta.max = current.max
+    return delta
+
+
+def stage_histogram(name):
+    """Этап name по всем типам задач (копия гистограмм core.metrics)"""
+    total = Histogram()
+    for (kind, _, stage), histogram in pipeline_metrics.histograms().items():
+        if kind == 'task' and stage == name:
+            total.counts = [a + b for a, b in zip(total.counts, histogram.counts)]
+            total.count += histogram.count
+            total.sum += histogram.sum
+            total.max = max(total.max, histogram.max)
+    return total
+
+
+def rss_bytes():
+    """Резидентная память процесса; без /proc - пиковая по getrusage"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class CollectorHandler(socketserver.BaseRequestHandler):
+    """Коллектор выгрузок: читает кадры TcpSink и подтверждает их, не сохраняя"""
+
+    def _recv_exact(self, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def handle(self):
+        received = 0
+        while True:
+            header = self._recv_exact(FRAME_HEADER.size)
+            if header is None:
+                return
+            length, _ = FRAME_HEADER.unpack(header)
+            if self._recv_exact(length - 1) is None:
+                return
+            received += 1
+            self.request.sendall(TcpSink.ACK.pack(received))
+
+
+def start_collector():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), CollectorHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="load-test-collector", daemon=True).start()
+    return server
+
+
+class LoadTest:
+    """
+    Генератор нагрузки и сбор результатов
+
+    Результаты копятся по интервалам отчета: завершенные задачи интервала с
+    временем выполнения, ошибки по типам и снимок гистограммы ожидания.
+    """
+
+    def __init__(self, request_queue, symbols, mix, users, rate, upload_endpoint, upload_candles=1000,
+                 chart_since=None, seed=0):
+        self.request_queue = request_queue
+        self.symbols = symbols
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.users = users
+        self.rate = rate
+        self.upload_endpoint = upload_endpoint
+        self.upload_data = make_candle_frame(upload_candles)
+        self.chart_since = chart_since
+        self.seed = seed
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.submitted = defaultdict(int)
+        self.finished = defaultdict(list)  # Тип -> времена выполнения за все время, секунды
+        self.errors = defaultdict(int)
+        self._window = []  # Времена выполнения за текущий интервал
+        self._window_errors = 0
+        self.outstanding = 0
+
+    def _callback(self, name, created):
+        def on_done(data, error):
+            elapsed = time.monotonic() - created
+            with self._lock:
+                self.outstanding -= 1
+                self.finished[name].append(elapsed)
+                self._window.append(elapsed)
+                if error:
+                    self.errors[name] += 1
+                    self._window_errors += 1
+        return on_done
+
+    def _submit(self, name, rng):
+        symbol = rng.choice(self.symbols)
+        request = {'callback': self._callback(name, time.monotonic()), 'delivery': ResultDispatcher.WORKER}
+        if name == 'chart':
+            # Окна на сетке суток: повторные открытия одного графика попадают в JSON-кэш
+            request.update(symbol=symbol, timeframe='1m', limit=rng.choice([500, 1000]),
+                           since=self.chart_since + rng.randrange(3) * 86400)
+        elif name == 'ticker':
+            request.update(symbol=symbol)
+        elif name == 'trending':
+            request.update(timeframe='1m', limit=20)
+        else:
+            request.update(endpoint=self.upload_endpoint, data=self.upload_data,
+                           metadata={'symbol': symbol, 'timeframe': '1m'})
+        with self._lock:
+            self.submitted[name] += 1
+            self.outstanding += 1
+        self.request_queue.add_request(REQUEST_TYPES[name], **request)
+
+    def _user(self, index):
+        rng = random.Random(self.seed + index)
+        # Пользователи стартуют вразнобой, а не одной пачкой
+        if self._stop.wait(rng.random() / self.rate):
+            return
+        while not self._stop.is_set():
+            self._submit(rng.choices(self.names, self.weights)[0], rng)
+            self._stop.wait(rng.expovariate(self.rate))
+
+    def start(self):
+        self._threads = [threading.Thread(target=self._user, args=(index,), name=f"load-user-{index}", daemon=True)
+                         for index in range(self.users)]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def take_window(self):
+        """Времена выполнения и число ошибок с прошлого вызова"""
+        with self._lock:
+            window, self._window = self._window, []
+            errors, self._window_errors = self._window_errors, 0
+        return sorted(window), errors
+
+
+def run(load, request_queue, duration, interval, drain, writer=None):
+    """Держит нагрузку duration секунд, затем ждет завершения задач до drain секунд"""
+    columns = ['elapsed', 'submitted', 'finished', 'errors', 'throughput', 'queue', 'active', 'parked',
+               'wait_p50', 'wait_p99', 'limit_p50', 'limit_p99', 'latency_p50', 'latency_p99', 'threads', 'rss_mb']
+    if writer is not None:
+        writer.writerow(columns)
+    print(f"{'time':>6} {'sent':>6} {'done':>6} {'err':>4} {'tasks/s':>8} {'queue':>6} {'active':>6} {'parked':>6} "
+          f"{'wait p50/p99':>14} {'limit p50/p99':>14} {'latency p50/p99':>16} {'threads':>7} {'rss MB':>7}")
+
+    started = time.monotonic()
+    previous = {QUEUE_WAIT: None, RATE_LIMIT_WAIT: None}
+    load.start()
+    stopping_at = started + duration
+    deadline = stopping_at + drain
+    next_report = started + interval
+    stopped = False
+    while True:
+        now = time.monotonic()
+        if now >= stopping_at and not stopped:
+            load.stop()
+            stopped = True
+        if (stopped and load.outstanding <= 0) or now >= deadline:
+            break
+        time.sleep(max(0.0, min(next_report, deadline) - now))
+        if time.monotonic() < next_report:
+            continue
+        next_report += interval
+
+        latencies, errors = load.take_window()
+        waits = {}
+        for stage in previous:
+            total = stage_histogram(stage)
+            waits[stage] = histogram_delta(total, previous[stage])
+            previous[stage] = total
+        stats = request_queue.get_stats()
+        row = [
+            round(time.monotonic() - started, 1),
+            sum(load.submitted.values()),
+            len(latencies),
+            errors,
+            round(len(latencies) / interval, 1),
+            stats['queue_size'],
+            stats['active'],
+            # Активные задачи, не ждущие в очереди и не выполняемые, - отложены до сброса лимита биржи
+            stats['active'] - stats['waiting'] - stats['processing'],
+            waits[QUEUE_WAIT].quantile(0.5),
+            waits[QUEUE_WAIT].quantile(0.99),
+            waits[RATE_LIMIT_WAIT].quantile(0.5),
+            waits[RATE_LIMIT_WAIT].quantile(0.99),
+            round(percentile(latencies, 0.5), 4),
+            round(percentile(latencies, 0.99), 4),
+            threading.active_count(),
+            round(rss_bytes() / 1024 / 1024, 1),
+        ]
+        if writer is not None:
+            writer.writerow(row)
+        print(f"{row[0]:>6} {row[1]:>6} {row[2]:>6} {row[3]:>4} {row[4]:>8} {row[5]:>6} {row[6]:>6} {row[7]:>6} "
+              f"{row[8]:>6.3f}/{row[9]:<7.3f} {row[10]:>6.3f}/{row[11]:<7.3f} {row[12]:>7.3f}/{row[13]:<8.3f} "
+              f"{row[14]:>7} {row[15]:>7}")
+    return time.monotonic() - started
+
+
+def print_summary(load, elapsed):
+    print(f"\nFinished in {elapsed:.1f}s; {load.outstanding} tasks still pending")
+    print(f"{'type':<10} {'sent':>6} {'done':>6} {'errors':>6} {'tasks/s':>8} {'p50':>8} {'p99':>8} {'max':>8}")
+    for name in load.names:
+        latencies = sorted(load.finished[name])
+        print(f"{name:<10} {load.submitted[name]:>6} {len(latencies):>6} {load.errors[name]:>6} "
+              f"{len(latencies) / elapsed:>8.1f} {percentile(latencies, 0.5):>8.3f} "
+              f"{percentile(latencies, 0.99):>8.3f} {(latencies[-1] if latencies else 0.0):>8.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10, help="Одновременных пользователей")
+    parser.add_argument('--rate', type=float, default=1.0, help="Запросов в секунду от одного пользователя")
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Веса типов запросов (по умолчанию {DEFAULT_MIX})")
+    parser.add_argument('--duration', type=float, default=30.0, help="Длительность нагрузки, секунды")
+    parser.add_argument('--drain', type=float, default=30.0,
+                        help="Сколько ждать завершения поставленных задач после нагрузки, секунды")
+    parser.add_argument('--interval', type=float, default=1.0, help="Период отчета, секунды")
+    parser.add_argument('--symbols', type=int, default=50, help="Пар на синтетической бирже")
+    parser.add_argument('--candles', type=int, default=5000, help="Минутных свечей на пару")
+    parser.add_argument('--exchange-rate', type=float, default=50.0,
+                        help="Запросов в секунду, которые принимает биржа (0 - без ограничения)")
+    parser.add_argument('--latency', type=float, default=0.02, help="Задержка ответа биржи, секунды")
+    parser.add_argument('--upload-candles', type=int, default=1000, help="Свечей в одной выгрузке")
+    parser.add_argument('--csv', default=None, help="Файл для рядов отчета")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    setup_logging(path=None, console_level=logging.ERROR)
+
+    # Кэш, хранилище и файлы TcpSink - во временном каталоге, рабочие данные не трогаются
+    home = tempfile.mkdtemp(prefix="kucoin-viewer-load-")
+    os.environ['HOME'] = home
+    collector = start_collector()
+    try:
+        # Свечи заканчиваются сейчас: поиск растущих монет запрашивает последние сутки
+        now_ms = int(time.time() // 60 * 60000)
+        start_ms = now_ms - args.candles * 60000
+        archive = make_archive(make_symbols(args.symbols), timeframe='1m', candles=args.candles,
+                               start_ms=start_ms,
+                               rate_limit_ms=1000 / args.exchange_rate if args.exchange_rate else 1)
+        api_client = ApiClient()
+        install_fake_exchange(api_client, archive, latency=args.latency, rate=args.exchange_rate)
+        request_queue = RequestQueue(api_client)
+
+        chart_since = (start_ms // 86400000 + 1) * 86400
+        load = LoadTest(request_queue, make_symbols(args.symbols), args.mix, args.users, args.rate,
+                        f"tcp://127.0.0.1:{collector.server_address[1]}", args.upload_candles, chart_since,
+                        args.seed)
+        print(f"Load test: {args.users} users x {args.rate:g} req/s for {args.duration:g}s, mix "
+              f"{','.join(f'{name}={weight:g}' for name, weight in args.mix.items())}, exchange "
+              f"{args.exchange_rate:g} req/s with {args.latency * 1000:.0f} ms latency")
+
+        csv_file = open(args.csv, 'w', newline='') if args.csv else None
+        try:
+            elapsed = run(load, request_queue, args.duration, args.interval, args.drain,
+                          csv.writer(csv_file) if csv_file else None)
+        finally:
+            if csv_file:
+                csv_file.close()
+        print_summary(load, elapsed)
+        request_queue.stop()
+    finally:
+        collector.shutdown()
+        collector.server_close()
+        shutil.rmtree(home, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
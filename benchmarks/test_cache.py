@@ -0,0 +1,23 @@
+"""Задержка чтения и записи JSON-кэша ApiClient в зависимости от числа свечей"""
+import pytest
+
+from benchmarks.fake_exchange import make_candle_frame
+
+
+CACHE_SIZES = [100, 1000, 10000, 100000]
+
+
+@pytest.mark.parametrize("candles", CACHE_SIZES)
+def test_cache_write(benchmark, api_client, candles):
+    benchmark.group = "cache-write"
+    df = make_candle_frame(candles)
+    benchmark(api_client.save_to_cache, f"COIN0/USDT_1m_{candles}", df)
+
+
+@pytest.mark.parametrize("candles", CACHE_SIZES)
+def test_cache_read(benchmark, api_client, candles):
+    benchmark.group = "cache-read"
+    key = f"COIN0/USDT_1m_{candles}"
+    api_client.save_to_cache(key, make_candle_frame(candles))
+    df = benchmark(api_client.get_cached_data, key)
+    assert len(df) == candles
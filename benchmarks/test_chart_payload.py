@@ -0,0 +1,32 @@
+"""Построение графика: время сборки и размер HTML и JSON, которые уходят в QWebEngineView"""
+import pytest
+
+from benchmarks.fake_exchange import CANDLE_SIZES, make_candle_array
+from ui.chart_builder import build_chart_figure, build_chart_html, candles_to_dataframe
+
+
+INDICATORS = {'ma': True, 'bollinger': True, 'rsi': True}
+
+
+def rounds_for(candles):
+    # Миллион свечей строится секундами: одного-двух прогонов достаточно
+    return 1 if candles >= 1000000 else 2 if candles >= 100000 else 5
+
+
+@pytest.mark.parametrize("candles", CANDLE_SIZES)
+def test_chart_html(benchmark, candles):
+    benchmark.group = "chart-html"
+    array = make_candle_array(candles)
+    html = benchmark.pedantic(build_chart_html, args=(array, 'COIN0/USDT', '1m', INDICATORS),
+                              rounds=rounds_for(candles))
+    benchmark.extra_info['payload_bytes'] = len(html.encode())
+    benchmark.extra_info['bytes_per_candle'] = round(len(html.encode()) / candles, 1)
+
+
+@pytest.mark.parametrize("candles", CANDLE_SIZES)
+def test_chart_json(benchmark, candles):
+    benchmark.group = "chart-json"
+    fig = build_chart_figure(candles_to_dataframe(make_candle_array(candles)), 'COIN0/USDT', '1m', INDICATORS)
+    payload = benchmark.pedantic(fig.to_json, rounds=rounds_for(candles))
+    benchmark.extra_info['payload_bytes'] = len(payload.encode())
+    benchmark.extra_info['bytes_per_candle'] = round(len(payload.encode()) / candles, 1)
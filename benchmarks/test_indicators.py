@@ -0,0 +1,27 @@
+"""Расчет индикаторов и склейка догруженных свечей с рядом"""
+import pytest
+
+from benchmarks.fake_exchange import CANDLE_SIZES, START_MS, make_candle_frame
+from core.data_manager import merge_candles
+from ui.chart_builder import compute_indicators
+
+
+ALL_INDICATORS = {'ma': True, 'ema': True, 'bollinger': True, 'rsi': True, 'macd': True}
+
+
+@pytest.mark.parametrize("candles", CANDLE_SIZES)
+def test_compute_indicators(benchmark, candles):
+    benchmark.group = "indicators"
+    close = make_candle_frame(candles)['close']
+    result = benchmark(compute_indicators, close, ALL_INDICATORS)
+    assert len(result['macd_line']) == candles
+
+
+@pytest.mark.parametrize("candles", CANDLE_SIZES)
+def test_merge_on_append(benchmark, candles):
+    """Догрузка страницы в 1000 свечей, перекрывающейся с концом ряда на 100 свечей"""
+    benchmark.group = "merge-on-append"
+    existing = make_candle_frame(candles)
+    incoming = make_candle_frame(1000, start_ms=START_MS + (candles - 100) * 60000, seed=1)
+    merged = benchmark(merge_candles, existing, incoming)
+    assert len(merged) == candles + 900
@@ -0,0 +1,55 @@
+"""Пропускная способность RequestQueue: постановка, диспетчеризация и доставка результатов"""
+import threading
+
+import pytest
+
+from benchmarks.fake_exchange import START_MS, make_symbols
+from core.result_dispatcher import ResultDispatcher
+
+
+def run_batch(request_queue, count, task_type, **request):
+    """Ставит count задач и ждет доставки всех результатов; возвращает число ошибок"""
+    done = threading.Event()
+    remaining = [count]
+    errors = []
+    lock = threading.Lock()
+
+    def callback(data, error):
+        with lock:
+            if error:
+                errors.append(error)
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                done.set()
+
+    symbols = make_symbols(20)
+    for index in range(count):
+        request_queue.add_request(task_type, symbol=symbols[index % len(symbols)], callback=callback,
+                                  delivery=ResultDispatcher.WORKER, **request)
+    assert done.wait(60), f"{remaining[0]} of {count} tasks not finished"
+    return len(errors)
+
+
+@pytest.mark.parametrize("count", [100, 1000])
+def test_dispatch_tickers(benchmark, request_queue, count):
+    benchmark.group = "queue-dispatch"
+    benchmark.extra_info['tasks'] = count
+    errors = benchmark.pedantic(run_batch, args=(request_queue, count, 'fetch_ticker'), rounds=5)
+    assert errors == 0
+
+
+@pytest.mark.parametrize("limit", [500, 1500])
+def test_dispatch_ohlcv(benchmark, request_queue, limit):
+    benchmark.group = "queue-dispatch"
+    benchmark.extra_info['tasks'] = 100
+    errors = benchmark.pedantic(
+        run_batch, args=(request_queue, 100, 'fetch_ohlcv'), rounds=3,
+        kwargs={'timeframe': '1m', 'since': START_MS / 1000, 'limit': limit, 'metadata': {'use_cache': False}})
+    assert errors == 0
+
+
+def test_add_request(benchmark, request_queue):
+    """Стоимость постановки задачи в главном потоке (очередь на паузе - задачи не запускаются)"""
+    benchmark.group = "queue-enqueue"
+    request_queue.pause()
+    benchmark(request_queue.add_request, 'fetch_ticker', symbol='COIN0/USDT')
@@ -1,11 +1,21 @@
 import ccxt
+import numpy as np
 import pandas as pd
 from datetime import datetime, date, timedelta
 import time
-from PyQt5.QtCore import QObject, pyqtSignal
+from core.signals import QObject, pyqtSignal
 import os
 import json
 import hashlib
+import logging
+
+from core.exchange_pool import ExchangePool
+from core.lanes import INTERACTIVE
+from core.listing_index import ListingIndex
+from core.metrics import CACHE_READ, CACHE_WRITE, PARSE, pipeline_metrics
+
+
+logger = logging.getLogger(__name__)
 
 
 class ApiClient(QObject):
@@ -13,16 +23,23 @@ class ApiClient(QObject):
     rate_limit_hit = pyqtSignal(str, int)  # (exchange, reset_time)
     request_complete = pyqtSignal(int, object, str)  # (task_id, data, error)
 
-    def __init__(self):
+    def __init__(self, storage=None):
         super().__init__()
-        # Создаем только экземпляр KuCoin
+        # Клиенты бирж по идентификатору ccxt; у каждой свой лимит запросов
+        self.exchanges = ExchangePool()
+        # Экземпляр KuCoin - биржа по умолчанию
         self.exchange = self.create_exchange()
-        self.rate_limits = {}  # Отслеживание ограничений по запросам
+
+        # Общее хранилище истории свечей (core.data_manager); None - не используется
+        self.storage = storage
+
+        # Время самой ранней свечи по парам: запросы до листинга не уходят на биржу
+        self.listing_index = ListingIndex()
         
         # Инициализация кэша
         self.cache_dir = os.path.join(os.path.expanduser("~"), ".kucoin_viewer", "cache")
         os.makedirs(self.cache_dir, exist_ok=True)
-        print(f"Cache directory: {self.cache_dir}")
+        logger.info("Cache directory: %s", self.cache_dir)
         
         # Словарь с базовыми настройками timeframes
         self.timeframe_configs = {
@@ -36,16 +53,14 @@ class ApiClient(QObject):
             '1w': {'limit': 200, 'days_back': 730}
         }
 
-    def create_exchange(self):
-        """Создает экземпляр биржи KuCoin"""
-        return ccxt.kucoin({
-            'enableRateLimit': True,  # Автоматическая задержка для соблюдения лимитов API
-            'timeout': 30000,  # Увеличенный таймаут для надежности
-        })
+    def create_exchange(self, exchange="kucoin"):
+        """Возвращает экземпляр ccxt биржи из пула"""
+        return self.exchanges.get(exchange).exchange
 
-    def fetch_ohlcv(self, task_id, symbol, timeframe, since, limit=None, append_mode=False):
+    def fetch_ohlcv(self, task_id, symbol, timeframe, since, limit=None, append_mode=False,
+                    exchange="kucoin", lane=INTERACTIVE, use_cache=True):
         """
-        Получает OHLCV данные для KuCoin с обработкой rate limits и кэшированием
+        Получает OHLCV данные с обработкой rate limits и кэшированием
         
         Parameters:
         - task_id: ID задачи
@@ -54,9 +69,14 @@ class ApiClient(QObject):
         - since: Начальная дата/время для данных
         - limit: Максимальное количество свечей (если None, используется значение из конфигурации)
         - append_mode: Если True, данные предназначены для добавления к существующим
+        - exchange: Идентификатор биржи ccxt
+        - lane: Полоса обслуживания задачи (core.lanes) - определяет долю бюджета запросов
+        - use_cache: False - не читать и не писать JSON-кэш (ключ кэша - дата, а не точное время);
+          ошибка записи в хранилище истории тогда завершает задачу ошибкой
         """
-        print(f"Запрос OHLCV для {symbol} с таймфреймом {timeframe} с {since}, limit={limit}, append_mode={append_mode}")
-        
+        logger.debug("OHLCV request %s %s since=%s limit=%s append_mode=%s", symbol, timeframe, since, limit,
+                     append_mode, extra={'task_id': task_id, 'exchange': exchange})
+
         try:
             # Используем стандартные настройки для timeframe, если limit не указан
             if limit is None:
@@ -76,46 +96,83 @@ class ApiClient(QObject):
                 since_timestamp = int(since * 1000)
                 since_datetime = datetime.fromtimestamp(since)
 
-            # Формируем ключ кэша с учетом лимита
+            client = self.exchanges.get(exchange)
+
+            # Формируем ключ кэша с учетом лимита (у KuCoin - без префикса биржи, как раньше)
             cache_key = f"{symbol}_{timeframe}_{since_datetime.strftime('%Y-%m-%d')}_{limit}"
+            if exchange != "kucoin":
+                cache_key = f"{exchange}_{cache_key}"
             
             # Проверяем кэш перед запросом, только если не в режиме добавления
             cached_data = None
-            if not append_mode:
-                cached_data = self.get_cached_data(cache_key)
+            if use_cache and not append_mode:
+                with pipeline_metrics.stage(CACHE_READ):
+                    cached_data = self.get_cached_data(cache_key)
+                pipeline_metrics.cache_lookup('json', cached_data is not None)
             
             if cached_data is not None:
-                print(f"Использованы кэшированные данные для {symbol}")
+                logger.debug("Cache hit for %s %s", symbol, timeframe, extra={'task_id': task_id})
                 self.request_complete.emit(task_id, cached_data, "")
                 return cached_data
 
+            # Полный диапазон уже мог загрузить кто-то другой в общую историю
+            stored_data = None
+            if self.storage is not None:
+                with pipeline_metrics.stage(CACHE_READ):
+                    stored_data = self.read_from_storage(exchange, symbol, timeframe, since_timestamp, limit)
+                pipeline_metrics.cache_lookup('storage', stored_data is not None)
+            if stored_data is not None:
+                logger.debug("Storage hit for %s %s", symbol, timeframe, extra={'task_id': task_id})
+                if append_mode:
+                    stored_data.attrs['append_mode'] = True
+                self.request_complete.emit(task_id, stored_data, "")
+                return stored_data
+
             # Попытка получить данные
             try:
-                print(f"Отправляем запрос на KuCoin для {symbol} с таймфреймом {timeframe} с {since}, limit={limit}")
-                ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since=since_timestamp, limit=limit)
-
-                # Если данных нет или очень мало, попробуем более новые данные
-                if len(ohlcv) < 5:
-                    print(f"Получено слишком мало данных ({len(ohlcv)}), пробуем более новую дату")
-                    # Пробуем запрос за более свежий период, сдвигаемся вперед на половину от запрошенного периода
-                    time_shift = self._get_time_shift_for_timeframe(timeframe)
-                    new_since = since_timestamp + time_shift
-                    ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since=new_since, limit=limit)
-                    
-                # Если все еще мало данных, последний шанс - запросить последние свечи
-                if len(ohlcv) < 5:
-                    print(f"Все еще мало данных ({len(ohlcv)}), запрашиваем последние свечи")
-                    ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+                tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+                window_end = since_timestamp + limit * tf_ms
+                history_start = self.listing_index.get(exchange, symbol, timeframe)
+
+                # Окно целиком до листинга: истории нет, запрос не нужен
+                if history_start is not None and window_end <= history_start:
+                    return self._emit_before_history(task_id, history_start, append_mode)
+
+                # Окно захватывает листинг: запрашиваем с первой свечи
+                if history_start is not None and since_timestamp < history_start:
+                    since_timestamp = history_start
+
+                ohlcv = client.call('fetch_ohlcv', symbol, timeframe, since=since_timestamp, limit=limit, lane=lane)
+
+                # Пустой ответ для прошлого: возможно, окно до листинга. Один раз
+                # ищем начало истории пары и больше не запрашиваем пустые окна
+                if not ohlcv and history_start is None and window_end < time.time() * 1000:
+                    history_start = self.listing_index.discover(
+                        exchange, symbol, timeframe,
+                        lambda probe_since, probe_limit: client.call(
+                            'fetch_ohlcv', symbol, timeframe, since=probe_since, limit=probe_limit, lane=lane),
+                        limit)
+                    logger.info("History of %s %s on %s starts at %s", symbol, timeframe, exchange, history_start)
+                    if history_start is not None and history_start > since_timestamp:
+                        if window_end <= history_start:
+                            return self._emit_before_history(task_id, history_start, append_mode)
+                        ohlcv = client.call('fetch_ohlcv', symbol, timeframe, since=history_start,
+                                            limit=limit, lane=lane)
 
                 # Преобразуем в DataFrame
-                df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                print(f"Получены данные для {symbol}: {len(df)} записей")
-                print(f"Диапазон дат: с {df['timestamp'].min()} по {df['timestamp'].max()}")
+                with pipeline_metrics.stage(PARSE):
+                    df = self.ohlcv_to_dataframe(ohlcv)
+                # Диапазон дат считается, только если отладочный журнал включен
+                if logger.isEnabledFor(logging.DEBUG) and not df.empty:
+                    logger.debug("Received %d candles for %s %s: %s .. %s", len(df), symbol, timeframe,
+                                 df['timestamp'].min(), df['timestamp'].max(), extra={'task_id': task_id})
                 
                 # Сохраняем в кэш, только если это не режим добавления
-                if not append_mode:
-                    self.save_to_cache(cache_key, df)
+                with pipeline_metrics.stage(CACHE_WRITE):
+                    if use_cache and not append_mode:
+                        self.save_to_cache(cache_key, df)
+                    # Догрузке и backfill нужны свечи в хранилище, а не только в ответе
+                    self.save_to_storage(exchange, symbol, timeframe, df, raise_errors=not use_cache)
                 
                 # Помечаем данные как предназначенные для добавления, если это режим добавления
                 if append_mode:
@@ -126,48 +183,55 @@ class ApiClient(QObject):
                 return df
 
             except ccxt.RateLimitExceeded as e:
-                print(f"Rate limit exceeded for {symbol}: {e}")
+                logger.warning("Rate limit exceeded on %s for %s: %s", exchange, symbol, e)
                 # Обрабатываем ограничение запросов
                 reset_time = self.extract_reset_time(e)
-                self.rate_limits['kucoin'] = {
-                    'limited': True,
-                    'reset_time': reset_time,
-                    'timestamp': time.time()
-                }
+                client.mark_rate_limited(reset_time)
 
                 # Отправляем сигнал о достижении лимита
-                self.rate_limit_hit.emit('kucoin', reset_time)
+                self.rate_limit_hit.emit(exchange, reset_time)
 
                 # Возвращаем ошибку обработчику
                 self.request_complete.emit(task_id, None, f"Rate limit exceeded: wait {reset_time} seconds")
                 return None
 
         except Exception as e:
-            print(f"Error fetching OHLCV data for {symbol}: {e}")
+            logger.warning("Error fetching OHLCV data for %s: %s", symbol, e, extra={'task_id': task_id})
             # Любые другие ошибки
             self.request_complete.emit(task_id, None, str(e))
             return None
 
-    def _get_time_shift_for_timeframe(self, timeframe):
-        """Вычисляет временной сдвиг в миллисекундах для timeframe"""
-        if timeframe == '1m':
-            return 60 * 1000 * 500  # 500 минут
-        elif timeframe == '5m':
-            return 5 * 60 * 1000 * 500  # 2500 минут
-        elif timeframe == '15m':
-            return 15 * 60 * 1000 * 500  # 7500 минут
-        elif timeframe == '30m':
-            return 30 * 60 * 1000 * 500  # 15000 минут
-        elif timeframe == '1h':
-            return 60 * 60 * 1000 * 500  # 500 часов
-        elif timeframe == '4h':
-            return 4 * 60 * 60 * 1000 * 300  # 1200 часов
-        elif timeframe == '1d':
-            return 24 * 60 * 60 * 1000 * 200  # 200 дней
-        elif timeframe == '1w':
-            return 7 * 24 * 60 * 60 * 1000 * 100  # 100 недель
-        else:
-            return 24 * 60 * 60 * 1000 * 7  # 7 дней по умолчанию
+    @staticmethod
+    def ohlcv_to_dataframe(ohlcv):
+        """
+        Преобразует список свечей ccxt в DataFrame
+
+        Список сначала превращается в один массив numpy (цикл в C), затем колонки
+        берутся срезами массива - без построчного разбора объектов Python.
+        """
+        array = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(array[:, 0].astype(np.int64), unit='ms'),
+            'open': array[:, 1],
+            'high': array[:, 2],
+            'low': array[:, 3],
+            'close': array[:, 4],
+            'volume': array[:, 5],
+        })
+
+    def _emit_before_history(self, task_id, history_start, append_mode):
+        """
+        Завершает запрос окна, целиком лежащего до начала истории пары
+
+        Возвращает пустой DataFrame; attrs['history_start'] - время первой
+        свечи (мс), по нему листание назад останавливается.
+        """
+        df = self.ohlcv_to_dataframe([])
+        df.attrs['history_start'] = history_start
+        if append_mode:
+            df.attrs['append_mode'] = True
+        self.request_complete.emit(task_id, df, "")
+        return df
 
     def get_cached_data(self, cache_key):
         """Получает данные из кэша по ключу"""
@@ -183,7 +247,7 @@ class ApiClient(QObject):
             # Проверяем возраст кэша (24 часа)
             file_age = time.time() - os.path.getmtime(cache_file)
             if file_age > 86400:  # 24 часа в секундах
-                print(f"Cache expired for {cache_key}")
+                logger.debug("Cache expired for %s", cache_key)
                 return None
                 
             # Загружаем данные из файла
@@ -194,11 +258,11 @@ class ApiClient(QObject):
             df = pd.DataFrame(cache_data['data'])
             df['timestamp'] = pd.to_datetime(df['timestamp'])
             
-            print(f"Loaded from cache: {cache_key}")
+            logger.debug("Loaded from cache: %s", cache_key)
             return df
             
         except Exception as e:
-            print(f"Error reading from cache: {e}")
+            logger.warning("Error reading from cache: %s", e)
             # При ошибке чтения кэша возвращаем None
             return None
 
@@ -224,10 +288,39 @@ class ApiClient(QObject):
             with open(cache_file, 'w') as f:
                 json.dump(cache_data, f)
                 
-            print(f"Saved to cache: {cache_key}")
+            logger.debug("Saved to cache: %s", cache_key)
             
         except Exception as e:
-            print(f"Error saving to cache: {e}")
+            logger.warning("Error saving to cache: %s", e)
+
+    def read_from_storage(self, exchange, symbol, timeframe, since_timestamp, limit):
+        """
+        Возвращает свечи из хранилища, если там есть весь запрошенный диапазон
+
+        Диапазон [since, since + limit * timeframe) считается полным, когда в
+        нем ровно limit свечей (ключ уникален). Иначе возвращает None.
+        """
+        if self.storage is None:
+            return None
+        try:
+            end = since_timestamp + limit * ccxt.Exchange.parse_timeframe(timeframe) * 1000
+            df = self.storage.read_candles(exchange, symbol, timeframe, since_timestamp, end)
+            return df if len(df) == limit else None
+        except Exception as e:
+            logger.warning("Error reading from storage: %s", e)
+            return None
+
+    def save_to_storage(self, exchange, symbol, timeframe, df, raise_errors=False):
+        """Сохраняет полученные свечи в хранилище истории; raise_errors - не глушить ошибку записи"""
+        if self.storage is None:
+            return
+        try:
+            count = self.storage.write_candles(exchange, symbol, timeframe, df)
+            logger.debug("Saved %d candles to storage: %s %s", count, symbol, timeframe)
+        except Exception as e:
+            logger.warning("Error saving to storage: %s", e)
+            if raise_errors:
+                raise
 
     def clear_cache(self):
         """Очищает весь кэш или старые записи"""
@@ -241,10 +334,10 @@ class ApiClient(QObject):
                     if file_age > 86400:  # Старше 24 часов
                         os.remove(file_path)
                         count += 1
-            print(f"Cleared {count} old cache entries")
+            logger.info("Cleared %d old cache entries", count)
             return count
         except Exception as e:
-            print(f"Error clearing cache: {e}")
+            logger.warning("Error clearing cache: %s", e)
             return 0
 
     def extract_reset_time(self, exception):
@@ -267,10 +360,10 @@ class ApiClient(QObject):
             # В случае ошибки используем стандартное значение
             return 60
 
-    def fetch_markets(self, task_id=None):
-        """Получает информацию о всех доступных торговых парах на KuCoin"""
+    def fetch_markets(self, task_id=None, exchange="kucoin", lane=INTERACTIVE):
+        """Получает информацию о всех доступных торговых парах биржи"""
         try:
-            markets = self.exchange.fetch_markets()
+            markets = self.exchanges.get(exchange).call('fetch_markets', lane=lane)
 
             # Преобразуем в более удобный формат
             df = pd.DataFrame([{
@@ -295,10 +388,10 @@ class ApiClient(QObject):
                 self.request_complete.emit(task_id, None, str(e))
             return None
 
-    def fetch_ticker(self, task_id, symbol):
+    def fetch_ticker(self, task_id, symbol, exchange="kucoin", lane=INTERACTIVE):
         """Получает текущий тикер для указанной пары"""
         try:
-            ticker = self.exchange.fetch_ticker(symbol)
+            ticker = self.exchanges.get(exchange).call('fetch_ticker', symbol, lane=lane)
 
             # Преобразуем в DataFrame для единообразия
             df = pd.DataFrame([{
@@ -320,11 +413,14 @@ class ApiClient(QObject):
             self.request_complete.emit(task_id, None, str(e))
             return None
 
-    def fetch_trending_coins(self, task_id, timeframe='1h', limit=20):
+    def fetch_trending_coins(self, task_id, timeframe='1h', limit=20, exchange="kucoin",
+                             lane=INTERACTIVE):
         """Находит монеты с наибольшим ростом за указанный период"""
         try:
+            client = self.exchanges.get(exchange)
+
             # Получаем все доступные пары с USDT
-            markets_df = self.fetch_markets()
+            markets_df = self.fetch_markets(exchange=exchange, lane=lane)
             usdt_markets = markets_df[markets_df['quote'] == 'USDT']
 
             # Берем выборку пар (ограничиваем для скорости)
@@ -338,7 +434,7 @@ class ApiClient(QObject):
                 try:
                     # Получаем OHLCV данные
                     since = int((datetime.now().timestamp() - 3600 * 24) * 1000)  # За последние 24 часа
-                    ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since=since)
+                    ohlcv = client.call('fetch_ohlcv', symbol, timeframe, since=since, lane=lane)
 
                     if len(ohlcv) > 0:
                         first_price = ohlcv[0][4]  # Цена закрытия первой свечи
@@ -385,33 +481,9 @@ class ApiClient(QObject):
             return None
 
     def is_rate_limited(self, exchange="kucoin"):
-        """Проверяет, действует ли ограничение запросов"""
-        if exchange not in self.rate_limits:
-            return False
-
-        limit_info = self.rate_limits[exchange]
-
-        if not limit_info['limited']:
-            return False
-
-        # Проверяем, не истекло ли время ограничения
-        elapsed = time.time() - limit_info['timestamp']
-        remaining = limit_info['reset_time'] - elapsed
-
-        if remaining <= 0:
-            # Ограничение истекло, обновляем статус
-            self.rate_limits[exchange]['limited'] = False
-            return False
-
-        return True
+        """Проверяет, действует ли ограничение запросов для биржи"""
+        return self.exchanges.is_rate_limited(exchange)
 
     def get_reset_time(self, exchange="kucoin"):
         """Возвращает оставшееся время до сброса ограничения"""
-        if not self.is_rate_limited(exchange):
-            return 0
-
-        limit_info = self.rate_limits[exchange]
-        elapsed = time.time() - limit_info['timestamp']
-        remaining = max(0, limit_info['reset_time'] - elapsed)
-
-        return int(remaining)
\ No newline at end of file
+        return self.exchanges.get_reset_time(exchange)
@@ -0,0 +1,158 @@
+"""
+Загрузка истории свечей без графического интерфейса
+
+Скачивает свечи для списков символов и таймфреймов за диапазон дат в
+хранилище истории (core.data_manager) через те же ApiClient и RequestQueue,
+что и приложение, но без импорта PyQt: страницы загружаются параллельно с
+соблюдением лимитов каждой биржи. Задания записываются в журнал
+(core.backfill_jobs): прерванную загрузку продолжает запуск с --resume.
+
+    python -m core.backfill --symbols BTC/USDT,ETH/USDT --timeframes 1h,1d \\
+        --start 2024-01-01 --end 2024-06-01 --storage sqlite:///history.db
+    python -m core.backfill --resume
+"""
+import os
+
+# До импорта модулей core: сигналы - на чистом Python, без PyQt
+os.environ.setdefault("KUCOIN_VIEWER_HEADLESS", "1")
+
+import argparse  # noqa: E402
+import sys  # noqa: E402
+import threading  # noqa: E402
+from datetime import datetime, timezone  # noqa: E402
+
+from core import lanes  # noqa: E402
+from core.api_client import ApiClient  # noqa: E402
+from core.backfill_jobs import BackfillJournal, BackfillManager, parse_date  # noqa: E402
+from core.config import PROFILE_ON_START  # noqa: E402
+from core.data_manager import create_storage  # noqa: E402
+from core.integrity import IntegrityChecker  # noqa: E402
+from core.log import setup_logging  # noqa: E402
+from core.metrics_export import start_metrics_export  # noqa: E402
+from core.profiler import profiler  # noqa: E402
+from core.request_queue import RequestQueue  # noqa: E402
+
+
+def report_progress(manager, job_ids, report_every=5.0):
+    """Печатает прогресс заданий, пока они не завершатся"""
+    while not manager.wait(job_ids, timeout=report_every):
+        for job in manager.jobs():
+            if job['id'] in job_ids:
+                eta = f"{job['eta']:.0f}s" if job['eta'] is not None else "?"
+                print(f"Backfill job {job['id']}: {job['done']}/{job['total']} pages, {job['rows']} candles, "
+                      f"{job['throughput']:.0f} candles/s, ETA {eta}, {job['errors']} errors")
+
+
+def repair_gaps(checker, exchange, symbols, timeframes, start, end):
+    """Догружает пропуски сохраненных рядов; возвращает число оставшихся пропусков"""
+    pending = []
+    for symbol in symbols:
+        for timeframe in timeframes:
+            gaps = checker.find_gaps(exchange, symbol, timeframe,
+                                     start=int(start.timestamp() * 1000), end=int(end.timestamp() * 1000))
+            if gaps:
+                print(f"Gaps in {symbol} {timeframe}: {len(gaps)}")
+                pending.append((symbol, timeframe, gaps))
+
+    lock = threading.Lock()
+    all_done = threading.Event()
+    remaining = [0]
+
+    def on_page(data, error):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                all_done.set()
+
+    with lock:
+        for symbol, timeframe, gaps in pending:
+            remaining[0] += checker.repair(exchange, symbol, timeframe, gaps, callback=on_page)
+        if remaining[0] == 0:
+            all_done.set()
+    all_done.wait()
+
+    # Что осталось после догрузки - пропуски, которые биржа не смогла заполнить из-за ошибок
+    return sum(len(checker.find_gaps(exchange, symbol, timeframe,
+                                     start=int(start.timestamp() * 1000), end=int(end.timestamp() * 1000)))
+               for symbol, timeframe, _ in pending)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--symbols', help="Символы через запятую: BTC/USDT,ETH/USDT")
+    parser.add_argument('--timeframes', default='1h', help="Таймфреймы через запятую: 1m,1h,1d")
+    parser.add_argument('--start', type=parse_date, help="Начало диапазона (ISO 8601, UTC)")
+    parser.add_argument('--end', type=parse_date, default=None, help="Конец диапазона (по умолчанию - сейчас)")
+    parser.add_argument('--exchange', default='kucoin', help="Идентификатор биржи ccxt")
+    parser.add_argument('--storage', default=None,
+                        help="URL хранилища: tiered:///, sqlite:///, postgresql:// (по умолчанию - "
+                             "KUCOIN_VIEWER_STORAGE_URL, иначе уже существующий ~/.kucoin_viewer/history.db "
+                             "или ~/.kucoin_viewer/history (tiered))")
+    parser.add_argument('--journal', default=None,
+                        help="Файл журнала заданий (по умолчанию ~/.kucoin_viewer/backfill_jobs.db)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Продолжить незавершенные задания из журнала")
+    parser.add_argument('--repair-gaps', action='store_true',
+                        help="После загрузки найти пропуски в диапазоне и догрузить их")
+    parser.add_argument('--page-limit', type=int, default=1000, help="Свечей в одном запросе")
+    parser.add_argument('--lane', default=lanes.BULK, choices=lanes.LANES,
+                        help="Полоса обслуживания; на выделенном сервере можно interactive - весь бюджет запросов")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if not args.resume and not (args.symbols and args.start):
+        parser.error("--symbols and --start are required unless --resume is given")
+
+    storage = create_storage(args.storage)
+    if storage is None:
+        parser.error("Backfill needs a storage backend (storage URL is 'none')")
+
+    api_client = ApiClient(storage=storage)
+    request_queue = RequestQueue(api_client)
+    journal = BackfillJournal(args.journal)
+    manager = BackfillManager(request_queue, journal, args.lane)
+    metrics_exporter = start_metrics_export(request_queue)
+    if PROFILE_ON_START:
+        profiler.start(trace_memory=PROFILE_ON_START == 'memory')
+    try:
+        job_ids = manager.resume() if args.resume else []
+        for job_id in job_ids:
+            print(f"Backfill: resuming job {job_id}")
+
+        if args.symbols and args.start:
+            end = args.end or datetime.now(timezone.utc)
+            symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
+            timeframes = [t.strip() for t in args.timeframes.split(',') if t.strip()]
+            job_id = manager.create_job(symbols, timeframes, args.start, end, args.exchange, args.page_limit)
+            job_ids.append(job_id)
+            print(f"Backfill job {job_id}: {len(symbols)} symbols x {len(timeframes)} timeframes "
+                  f"from {args.start.isoformat()} to {end.isoformat()}")
+
+        report_progress(manager, job_ids)
+
+        if args.repair_gaps and args.symbols and args.start:
+            checker = IntegrityChecker(request_queue, storage, api_client.listing_index,
+                                       lane=args.lane, page_limit=args.page_limit)
+            unrepaired = repair_gaps(checker, args.exchange, symbols, timeframes, args.start, end)
+            print(f"Gap repair finished: {unrepaired} gaps left")
+    finally:
+        if profiler.running:
+            for path in profiler.dump():
+                print(f"Profile written: {path}")
+            profiler.stop()
+        if metrics_exporter is not None:
+            metrics_exporter.stop()
+        request_queue.stop()
+        journal.close()
+        storage.close()
+
+    failed = 0
+    for job in manager.jobs():
+        print(f"Backfill job {job['id']} {job['status']}: {job['done']}/{job['total']} pages, {job['rows']} candles")
+        if job['status'] != 'completed':
+            failed += 1
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
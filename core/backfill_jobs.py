@@ -0,0 +1,304 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+import ccxt
+
+from core import lanes
+from core.result_dispatcher import ResultDispatcher
+
+
+def parse_date(value):
+    """Дата или дата-время ISO 8601; без часового пояса считается UTC"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def plan_pages(symbols, timeframes, start, end, page_limit):
+    """Разбивает диапазон на страницы: [(symbol, timeframe, since в секундах)]"""
+    start_ms = int(start.timestamp() * 1000)
+    end_ms = int(end.timestamp() * 1000)
+    pages = []
+    for symbol in symbols:
+        for timeframe in timeframes:
+            step = page_limit * ccxt.Exchange.parse_timeframe(timeframe) * 1000
+            for since in range(start_ms, end_ms, step):
+                pages.append((symbol, timeframe, since // 1000))
+    return pages
+
+
+class BackfillJournal:
+    """
+    Журнал заданий загрузки истории в SQLite
+
+    Задание состоит из страниц (symbol, timeframe, since); каждая завершенная
+    страница фиксируется сразу, поэтому после перезапуска загружаются только
+    незавершенные страницы.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(os.path.expanduser("~"), ".kucoin_viewer", "backfill_jobs.db")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                exchange TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS pages (
+                job_id INTEGER NOT NULL,
+                page INTEGER NOT NULL,
+                symbol TEXT NOT NULL,
+                timeframe TEXT NOT NULL,
+                since INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                rows INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                PRIMARY KEY (job_id, page)
+            );
+        """)
+        self._conn.commit()
+
+    def create_job(self, exchange, params, pages):
+        """Записывает задание и его страницы; возвращает ID задания"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (exchange, params, status, created_at) VALUES (?, ?, 'running', ?)",
+                (exchange, json.dumps(params), time.time()))
+            job_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO pages (job_id, page, symbol, timeframe, since, status) "
+                "VALUES (?, ?, ?, ?, ?, 'pending')",
+                [(job_id, index, symbol, timeframe, since)
+                 for index, (symbol, timeframe, since) in enumerate(pages)])
+        return job_id
+
+    def running_jobs(self):
+        """Незавершенные задания: [(job_id, exchange, params)]"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, exchange, params FROM jobs WHERE status = 'running' ORDER BY id").fetchall()
+        return [(job_id, exchange, json.loads(params)) for job_id, exchange, params in rows]
+
+    def pending_pages(self, job_id):
+        """Незавершенные страницы задания (ошибочные повторяются): [(page, symbol, timeframe, since)]"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT page, symbol, timeframe, since FROM pages "
+                "WHERE job_id = ? AND status != 'done' ORDER BY page", (job_id,)).fetchall()
+
+    def job_totals(self, job_id):
+        """(всего страниц, завершено, с ошибкой, загружено свечей)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*), SUM(status = 'done'), SUM(status = 'error'), COALESCE(SUM(rows), 0) "
+                "FROM pages WHERE job_id = ?", (job_id,)).fetchone()
+
+    def complete_page(self, job_id, page, rows, error):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE pages SET status = ?, rows = ?, error = ? WHERE job_id = ? AND page = ?",
+                ('error' if error else 'done', rows, error or None, job_id, page))
+
+    def finish_job(self, job_id, status):
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?",
+                               (status, time.time(), job_id))
+
+    def reopen_job(self, job_id):
+        """Возвращает задание в работу (для повтора страниц с ошибкой)"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', finished_at = NULL WHERE id = ?", (job_id,))
+            return cursor.rowcount > 0
+
+    def job(self, job_id):
+        """(exchange, params) задания или None"""
+        with self._lock:
+            row = self._conn.execute("SELECT exchange, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return None if row is None else (row[0], json.loads(row[1]))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class BackfillJob:
+    """Прогресс задания в текущем сеансе"""
+
+    def __init__(self, job_id, exchange, params, total, done, errors, rows):
+        self.id = job_id
+        self.exchange = exchange
+        self.params = params
+        self.total = total
+        self.done = done
+        self.errors = errors
+        self.rows = rows
+        self.status = 'running'
+        self.outstanding = 0  # Страниц в очереди в этом сеансе
+        self.cancelled = 0  # Страниц, отмененных очисткой очереди
+        # Скорость считается по страницам, загруженным в этом сеансе
+        self.session_started = time.time()
+        self.session_pages = 0
+        self.session_rows = 0
+
+    def snapshot(self):
+        """Прогресс, скорость (свечей/с) и оценка оставшегося времени"""
+        elapsed = max(time.time() - self.session_started, 1e-6)
+        remaining = self.total - self.done
+        page_rate = self.session_pages / elapsed
+        return {
+            'id': self.id,
+            'description': f"{self.exchange}: {', '.join(self.params['symbols'])} "
+                           f"[{', '.join(self.params['timeframes'])}]",
+            'status': self.status,
+            'total': self.total,
+            'done': self.done,
+            'errors': self.errors,
+            'rows': self.rows,
+            'throughput': self.session_rows / elapsed,
+            'eta': remaining / page_rate if page_rate > 0 and remaining else None,
+        }
+
+
+class BackfillManager:
+    """
+    Задания загрузки истории поверх RequestQueue
+
+    Страницы задания ставятся в очередь задачами fetch_ohlcv (свечи сохраняет
+    в хранилище ApiClient), результат каждой страницы записывается в журнал.
+    resume() после перезапуска ставит в очередь незавершенные страницы.
+    """
+
+    def __init__(self, request_queue, journal=None, lane=lanes.BULK):
+        self.request_queue = request_queue
+        self.journal = journal if journal is not None else BackfillJournal()
+        self.lane = lane
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._finished = threading.Condition(self._lock)
+
+    def create_job(self, symbols, timeframes, start, end, exchange="kucoin", page_limit=1000):
+        """Создает задание и ставит его страницы в очередь; возвращает ID задания"""
+        params = {
+            'symbols': list(symbols),
+            'timeframes': list(timeframes),
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'page_limit': page_limit,
+        }
+        pages = plan_pages(symbols, timeframes, start, end, page_limit)
+        job_id = self.journal.create_job(exchange, params, pages)
+        self._start_job(job_id, exchange, params)
+        return job_id
+
+    def resume(self):
+        """Продолжает незавершенные задания из журнала; возвращает их ID"""
+        job_ids = []
+        for job_id, exchange, params in self.journal.running_jobs():
+            with self._lock:
+                if job_id in self._jobs:
+                    continue
+            self._start_job(job_id, exchange, params)
+            job_ids.append(job_id)
+        return job_ids
+
+    def retry(self, job_id):
+        """Повторяет страницы с ошибкой и отмененные страницы завершенного задания"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status == 'running':
+                return False
+        stored = self.journal.job(job_id)
+        if stored is None or not self.journal.reopen_job(job_id):
+            return False
+        self._start_job(job_id, *stored)
+        return True
+
+    def _start_job(self, job_id, exchange, params):
+        total, done, errors, rows = self.journal.job_totals(job_id)
+        pending = self.journal.pending_pages(job_id)
+        # Ошибочные страницы повторяются, поэтому в начале сеанса ошибок нет
+        job = BackfillJob(job_id, exchange, params, total, done or 0, 0, rows)
+        job.outstanding = len(pending)
+        with self._lock:
+            self._jobs[job_id] = job
+
+        if not pending:
+            self._finish_if_done(job)
+            return
+
+        for page, symbol, timeframe, since in pending:
+            self.request_queue.add_request(
+                task_type="fetch_ohlcv",
+                exchange=exchange,
+                symbol=symbol,
+                timeframe=timeframe,
+                since=since,
+                limit=params['page_limit'],
+                lane=self.lane,
+                # Ключ JSON-кэша - дата, а страницы начинаются в любое время суток
+                metadata={'use_cache': False},
+                # Журнал пишется вне главного потока
+                delivery=ResultDispatcher.WORKER,
+                callback=lambda data, error, page=page: self._on_page(job, page, data, error)
+            )
+
+    def _on_page(self, job, page, data, error):
+        cancelled = error == self.request_queue.CANCELLED
+        rows = 0 if error or data is None else len(data)
+        # Отмененная страница не загружалась: в журнале она остается pending
+        if not cancelled:
+            self.journal.complete_page(job.id, page, rows, error)
+        with self._lock:
+            job.outstanding -= 1
+            if cancelled:
+                job.cancelled += 1
+            elif error:
+                job.errors += 1
+            else:
+                job.done += 1
+                job.rows += rows
+                job.session_pages += 1
+                job.session_rows += rows
+        self._finish_if_done(job)
+
+    def _finish_if_done(self, job):
+        with self._lock:
+            if job.outstanding > 0 or job.status != 'running':
+                return
+            if job.done >= job.total:
+                job.status = 'completed'
+            else:
+                job.status = 'cancelled' if job.cancelled else 'failed'
+            self._finished.notify_all()
+        self.journal.finish_job(job.id, job.status)
+
+    def jobs(self):
+        """Снимки заданий текущего сеанса"""
+        with self._lock:
+            return [job.snapshot() for job in self._jobs.values()]
+
+    def wait(self, job_ids, timeout=None):
+        """Ждет завершения заданий; возвращает True, если все завершились"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while any(job_id in self._jobs and self._jobs[job_id].status == 'running' for job_id in job_ids):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._finished.wait(remaining)
+        return True
@@ -0,0 +1,125 @@
+import gc
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Порядок колонок свечного массива, передаваемого в разделяемой памяти
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+class CandleBuffer:
+    """
+    Свечи в блоке разделяемой памяти
+
+    Массив float64 формы (n, 6): timestamp в миллисекундах и OHLCV. Рабочий
+    процесс подключается к блоку по имени, поэтому сами данные не пиклятся.
+    """
+
+    def __init__(self, array):
+        array = np.ascontiguousarray(array, dtype=np.float64)
+        self.shape = array.shape
+        self._shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        view = np.ndarray(self.shape, dtype=np.float64, buffer=self._shm.buf)
+        view[:] = array
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Упаковывает DataFrame со свечами (timestamp - datetime64) в разделяемую память"""
+        array = np.empty((len(df), len(CANDLE_COLUMNS)), dtype=np.float64)
+        array[:, 0] = df['timestamp'].values.astype('datetime64[ms]').astype(np.int64)
+        for i, column in enumerate(CANDLE_COLUMNS[1:], start=1):
+            array[:, i] = df[column].to_numpy(dtype=np.float64)
+        return cls(array)
+
+    @property
+    def handle(self):
+        """Описание блока для передачи в рабочий процесс"""
+        return self._shm.name, self.shape
+
+    def release(self):
+        """Освобождает блок разделяемой памяти"""
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def _run_with_candles(fn, handle, args):
+    """Выполняется в рабочем процессе: подключает свечи и вызывает fn(candles, *args)"""
+    name, shape = handle
+    shm = shared_memory.SharedMemory(name=name)
+    candles = None
+    try:
+        candles = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        return fn(candles, *args)
+    finally:
+        # Ссылки на буфер не должны пережить закрытие блока; объекты с циклическими
+        # ссылками (например, фигуры Plotly) освобождает только сборщик мусора
+        del candles
+        try:
+            shm.close()
+        except BufferError:
+            gc.collect()
+            shm.close()
+
+
+class ComputeService:
+    """
+    Пул процессов для CPU-емких этапов: индикаторы и сериализация графиков
+
+    Задачи получают свечи через CandleBuffer и выполняются в отдельных
+    процессах, не занимая GIL главного потока и потоков загрузки. Несколько
+    графиков считаются параллельно на разных ядрах. При max_workers=0 задачи
+    выполняются синхронно в текущем процессе.
+    """
+
+    def __init__(self, max_workers=None):
+        if max_workers is None:
+            max_workers = max(1, (os.cpu_count() or 2) - 1)
+        self.max_workers = max_workers
+        self._executor = None
+        if max_workers > 0:
+            # spawn: дочерние процессы не наследуют потоки и состояние Qt
+            context = multiprocessing.get_context('spawn')
+            self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+
+    def submit(self, fn, candles, *args):
+        """
+        Выполняет fn(candles, *args) в пуле процессов
+
+        fn должна быть функцией верхнего уровня модуля без зависимостей от Qt.
+        candles - DataFrame или массив свечей; он копируется в разделяемую
+        память, которая освобождается по завершении задачи. Возвращает Future.
+        """
+        if hasattr(candles, 'columns'):
+            buffer = CandleBuffer.from_dataframe(candles)
+        else:
+            buffer = CandleBuffer(candles)
+
+        if self._executor is None:
+            future = Future()
+            try:
+                future.set_result(_run_with_candles(fn, buffer.handle, args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                buffer.release()
+            return future
+
+        try:
+            future = self._executor.submit(_run_with_candles, fn, buffer.handle, args)
+        except Exception:
+            buffer.release()
+            raise
+        future.add_done_callback(lambda _: buffer.release())
+        return future
+
+    def shutdown(self):
+        """Останавливает пул процессов"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,76 @@
+import json
+import os
+
+try:
+    # Настройки можно задать в файле .env рядом с приложением
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass
+
+
+# Глубина истории завершенных задач в RequestQueue
+TASK_HISTORY_SIZE = int(os.environ.get("KUCOIN_VIEWER_TASK_HISTORY", 1000))
+
+# Сколько задача выгрузки по TCP ждет подтверждения коллектора, секунды; потом
+# задача завершается ошибкой, а кадры остаются в очереди TcpSink до переподключения
+TCP_UPLOAD_TIMEOUT = float(os.environ.get("KUCOIN_VIEWER_TCP_UPLOAD_TIMEOUT") or 120)
+
+# Хранилище истории свечей: tiered:///path, sqlite:///path, postgresql://... или none
+# (по умолчанию - tiered в ~/.kucoin_viewer/history)
+STORAGE_URL = os.environ.get("KUCOIN_VIEWER_STORAGE_URL", "")
+
+# Настройки клиентов бирж (core.exchange_pool): параметры ccxt, а также
+# max_concurrency, burst и interactive_reserve (доля бюджета запросов,
+# недоступная фоновым полосам, вместе с ней фоновым полосам не отдается один
+# из слотов - поэтому при резерве max_concurrency должен быть не меньше 2);
+# 'default' применяется ко всем биржам. Дополняются
+# JSON-объектом из KUCOIN_VIEWER_EXCHANGE_SETTINGS
+EXCHANGE_SETTINGS = {
+    'default': {'timeout': 30000, 'max_concurrency': 2, 'interactive_reserve': 0.3},
+}
+EXCHANGE_SETTINGS.update(json.loads(os.environ.get("KUCOIN_VIEWER_EXCHANGE_SETTINGS", "{}")))
+
+# Выгрузка метрик в формате Prometheus (core.metrics_export), по умолчанию выключена:
+# порт HTTP-эндпоинта на 127.0.0.1 (0 - не поднимать) и файл, в который раз в
+# METRICS_INTERVAL секунд дописывается снимок метрик (пусто - не писать)
+METRICS_PORT = int(os.environ.get("KUCOIN_VIEWER_METRICS_PORT") or 0)
+METRICS_FILE = os.environ.get("KUCOIN_VIEWER_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("KUCOIN_VIEWER_METRICS_INTERVAL") or 15)
+# Ротация файла метрик по размеру: байт в файле и число старых файлов
+METRICS_FILE_MAX_BYTES = int(os.environ.get("KUCOIN_VIEWER_METRICS_FILE_MAX_BYTES") or 10 * 1024 * 1024)
+METRICS_FILE_BACKUPS = int(os.environ.get("KUCOIN_VIEWER_METRICS_FILE_BACKUPS") or 5)
+
+# Журнал приложения (core.log): уровень по умолчанию, уровни отдельных модулей
+# JSON-объектом {"core.request_queue": "DEBUG"}, файл с ротацией и формат
+# записей (text или json - по записи JSON на строку). В консоль попадают
+# записи не ниже LOG_CONSOLE_LEVEL
+LOG_LEVEL = os.environ.get("KUCOIN_VIEWER_LOG_LEVEL", "INFO")
+LOG_LEVELS = json.loads(os.environ.get("KUCOIN_VIEWER_LOG_LEVELS", "{}"))
+LOG_FILE = os.environ.get("KUCOIN_VIEWER_LOG_FILE",
+                          os.path.join(os.path.expanduser("~"), ".kucoin_viewer", "logs", "kucoin_viewer.log"))
+LOG_FORMAT = os.environ.get("KUCOIN_VIEWER_LOG_FORMAT", "text")
+LOG_CONSOLE_LEVEL = os.environ.get("KUCOIN_VIEWER_LOG_CONSOLE_LEVEL", "WARNING")
+
+# Порог зависания главного потока, секунды: дольше - сторож цикла событий
+# (ui.stall_watchdog) снимает стек и показывает зависание на вкладке Pipe
+STALL_THRESHOLD = float(os.environ.get("KUCOIN_VIEWER_STALL_THRESHOLD") or 0.25)
+
+# Встроенный профилировщик (core.profiler): каталог профилей, интервал
+# сэмплирования в секундах и включение при запуске (1 - CPU, memory - CPU и
+# tracemalloc); во время работы переключается на вкладке Settings
+PROFILE_DIR = os.environ.get("KUCOIN_VIEWER_PROFILE_DIR",
+                             os.path.join(os.path.expanduser("~"), ".kucoin_viewer", "profiles"))
+PROFILE_INTERVAL = float(os.environ.get("KUCOIN_VIEWER_PROFILE_INTERVAL") or 0.005)
+PROFILE_ON_START = os.environ.get("KUCOIN_VIEWER_PROFILE", "")
+
+# Режим работы с биржами (core.replay): live - сеть, record - сеть с записью
+# ответов в архив, replay - ответы из архива без сети с задержкой
+# REPLAY_LATENCY секунд и ограничением REPLAY_RATE запросов в секунду
+# (0 - без ограничения). REPLAY_SHIFT_TIME сдвигает время архива к текущему
+EXCHANGE_MODE = os.environ.get("KUCOIN_VIEWER_EXCHANGE_MODE", "live")
+REPLAY_ARCHIVE = os.environ.get("KUCOIN_VIEWER_REPLAY_ARCHIVE",
+                                os.path.join(os.path.expanduser("~"), ".kucoin_viewer", "replay"))
+REPLAY_LATENCY = float(os.environ.get("KUCOIN_VIEWER_REPLAY_LATENCY") or 0)
+REPLAY_RATE = float(os.environ.get("KUCOIN_VIEWER_REPLAY_RATE") or 0)
+REPLAY_SHIFT_TIME = os.environ.get("KUCOIN_VIEWER_REPLAY_SHIFT_TIME", "1").lower() in ("1", "true", "yes")
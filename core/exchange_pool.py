@@ -0,0 +1,175 @@
+import threading
+import time
+from contextlib import ExitStack
+
+import ccxt
+
+from core.config import EXCHANGE_SETTINGS
+from core.lanes import INTERACTIVE, is_background
+from core.metrics import NETWORK, RATE_LIMIT_WAIT, pipeline_metrics
+from core.replay import create_exchange
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов (token bucket), безопасный для потоков
+
+    acquire() ждет свободный токен только в вызывающем потоке, поэтому
+    задержка одной биржи не влияет на запросы к другим.
+
+    Доля reserve бюджета зарезервирована за интерактивными запросами:
+    фоновые дополнительно проходят через собственный ограничитель с частотой
+    (1 - reserve) * rate и не берут токен, пока его ждет интерактивный запрос.
+    """
+
+    def __init__(self, rate, burst=1, reserve=0.0):
+        self.rate = rate  # Токенов в секунду
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._priority_waiting = 0
+        self._background = RateLimiter(rate * (1 - reserve), burst) if 0 < reserve < 1 else None
+
+    def acquire(self, background=False):
+        """Забирает токен, при необходимости дожидаясь его"""
+        if background and self._background is not None:
+            self._background.acquire()
+
+        with self._cond:
+            if not background:
+                self._priority_waiting += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1 and not (background and self._priority_waiting):
+                        self._tokens -= 1
+                        return
+                    self._cond.wait(max((1 - self._tokens) / self.rate, 0.001))
+            finally:
+                if not background:
+                    self._priority_waiting -= 1
+                    self._cond.notify_all()
+
+
+class ExchangeClient:
+    """
+    Экземпляр ccxt одной биржи с собственным ограничителем запросов
+
+    Одновременно выполняется не больше max_concurrency запросов к бирже.
+    При interactive_reserve > 0 фоновых (полосы prefetch и bulk) - на один
+    меньше, чтобы интерактивному запросу всегда оставалось соединение; для
+    этого нужно max_concurrency >= 2, иначе резерв не защищал бы
+    интерактивные запросы, и настройка отвергается (ValueError). Без резерва
+    фоновые запросы могут занять все слоты. Ограничение, объявленное биржей
+    (RateLimitExceeded), хранится здесь же и действует только на эту биржу.
+    """
+
+    def __init__(self, exchange_id, settings=None, exchange=None):
+        settings = dict(settings or {})
+        self.exchange_id = exchange_id
+        max_concurrency = settings.pop('max_concurrency', 2)
+        burst = settings.pop('burst', 1)
+        reserve = settings.pop('interactive_reserve', 0.3)
+        if reserve > 0 and max_concurrency < 2:
+            raise ValueError(f"{exchange_id}: interactive_reserve={reserve} needs max_concurrency >= 2 "
+                             f"(got {max_concurrency}); set interactive_reserve to 0 to allow a single slot")
+
+        options = {'timeout': 30000}
+        options.update(settings)
+        # Частоту запросов контролирует RateLimiter: встроенный throttle ccxt
+        # не рассчитан на вызовы из нескольких потоков
+        options['enableRateLimit'] = False
+        # ccxt, ccxt с записью ответов или воспроизведение архива (core.replay);
+        # готовый экземпляр (например, ReplayExchange в бенчмарках) используется как есть
+        self.exchange = exchange if exchange is not None else create_exchange(exchange_id, options)
+
+        # rateLimit у ccxt - минимальный интервал между запросами в мс
+        rate = 1000.0 / max(self.exchange.rateLimit or 1, 1)
+        self.limiter = RateLimiter(rate, burst, reserve)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._background_slots = threading.BoundedSemaphore(max_concurrency - 1 if reserve > 0 else max_concurrency)
+
+        self._limited_until = 0.0
+
+    def call(self, method, *args, lane=INTERACTIVE, **kwargs):
+        """Вызывает метод ccxt с учетом ограничений частоты и параллелизма полосы lane"""
+        endpoint = f"{self.exchange_id}.{method}"
+        background = is_background(lane)
+        with ExitStack() as slots:
+            # Ожидание слота и токена меряется отдельно от сетевого времени
+            with pipeline_metrics.stage(RATE_LIMIT_WAIT, endpoint):
+                if background:
+                    slots.enter_context(self._background_slots)
+                slots.enter_context(self._slots)
+                self.limiter.acquire(background=background)
+            with pipeline_metrics.stage(NETWORK, endpoint):
+                return getattr(self.exchange, method)(*args, **kwargs)
+
+    def mark_rate_limited(self, reset_time):
+        """Запоминает ограничение запросов на reset_time секунд"""
+        self._limited_until = time.time() + reset_time
+
+    def is_rate_limited(self):
+        return time.time() < self._limited_until
+
+    def get_reset_time(self):
+        """Оставшееся время ограничения в секундах"""
+        return max(0, int(self._limited_until - time.time()))
+
+
+class ExchangePool:
+    """
+    Пул клиентов бирж по идентификатору ccxt ('kucoin', 'binance', ...)
+
+    Клиенты создаются при первом обращении с настройками из
+    core.config.EXCHANGE_SETTINGS (общие - под ключом 'default').
+    """
+
+    def __init__(self, settings=None):
+        self.settings = settings if settings is not None else EXCHANGE_SETTINGS
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def get(self, exchange_id):
+        """Возвращает клиента биржи, создавая его при необходимости"""
+        client = self._clients.get(exchange_id)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(exchange_id)
+            if client is None:
+                if exchange_id not in ccxt.exchanges:
+                    raise ValueError(f"Unknown exchange: {exchange_id}")
+                client = ExchangeClient(exchange_id, self._client_settings(exchange_id))
+                self._clients[exchange_id] = client
+            return client
+
+    def _client_settings(self, exchange_id):
+        settings = dict(self.settings.get('default', {}))
+        settings.update(self.settings.get(exchange_id, {}))
+        return settings
+
+    def install(self, exchange_id, exchange):
+        """Подключает готовый экземпляр биржи вместо ccxt (с настройками пула для exchange_id)"""
+        client = ExchangeClient(exchange_id, self._client_settings(exchange_id), exchange)
+        with self._lock:
+            self._clients[exchange_id] = client
+        return client
+
+    def is_rate_limited(self, exchange_id):
+        client = self._clients.get(exchange_id)
+        return client is not None and client.is_rate_limited()
+
+    def get_reset_time(self, exchange_id):
+        client = self._clients.get(exchange_id)
+        return client.get_reset_time() if client is not None else 0
+
+    def rate_limits(self):
+        """Оставшееся время ограничения по каждой ограниченной бирже"""
+        return {exchange_id: client.get_reset_time()
+                for exchange_id, client in list(self._clients.items())
+                if client.is_rate_limited()}
@@ -0,0 +1,181 @@
+import json
+import itertools
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+from core.signals import QObject, pyqtSignal
+
+
+logger = logging.getLogger(__name__)
+
+
+# Форматы экспорта: ключ -> (название, расширение файла, фильтр диалога)
+EXPORT_FORMATS = {
+    'json': ("JSON", "json", "JSON Files (*.json)"),
+    'csv': ("CSV", "csv", "CSV Files (*.csv)"),
+    'parquet': ("Parquet", "parquet", "Parquet Files (*.parquet)"),
+    'arrow': ("Arrow IPC", "arrow", "Arrow IPC Files (*.arrow)"),
+}
+DEFAULT_EXPORT_FORMAT = 'json'
+
+
+def _require_pyarrow():
+    """Импортирует pyarrow для колоночных форматов"""
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet/Arrow export requires the 'pyarrow' package")
+
+
+def _timestamps_as_strings(series):
+    """Форматирует колонку datetime как str(pd.Timestamp): 'YYYY-MM-DD HH:MM:SS'"""
+    values = series.to_numpy(dtype='datetime64[s]')
+    return np.char.replace(np.datetime_as_string(values), 'T', ' ').tolist()
+
+
+class JsonExportWriter:
+    """Потоковая запись компактного JSON: {"metadata": ..., "data": [...]}"""
+
+    def __init__(self, filepath, metadata):
+        self._file = open(filepath, 'w', encoding='utf-8')
+        self._file.write('{"metadata":')
+        json.dump(metadata, self._file, separators=(',', ':'), default=str)
+        self._file.write(',"data":[')
+        self._first = True
+
+    def write(self, chunk):
+        columns = []
+        for name in chunk.columns:
+            if pd.api.types.is_datetime64_any_dtype(chunk[name]):
+                columns.append(_timestamps_as_strings(chunk[name]))
+            else:
+                columns.append(chunk[name].astype(object).where(chunk[name].notna(), None).tolist())
+
+        names = list(chunk.columns)
+        encoder = json.JSONEncoder(separators=(',', ':'), default=str)
+        text = ','.join(encoder.encode(dict(zip(names, row))) for row in zip(*columns))
+        if text:
+            if not self._first:
+                self._file.write(',')
+            self._file.write(text)
+            self._first = False
+
+    def close(self):
+        self._file.write(']}')
+        self._file.close()
+
+
+class CsvExportWriter:
+    """Потоковая запись CSV (метаданные - в комментарии первой строки)"""
+
+    def __init__(self, filepath, metadata):
+        self._file = open(filepath, 'w', encoding='utf-8', newline='')
+        self._file.write('# ' + json.dumps(metadata, separators=(',', ':'), default=str) + '\n')
+        self._header = True
+
+    def write(self, chunk):
+        # Формат времени задан явно: иначе pandas выбирает его по чанку, и чанк,
+        # где все свечи ровно в полночь, записывается одними датами
+        chunk.to_csv(self._file, header=self._header, index=False, date_format='%Y-%m-%d %H:%M:%S')
+        self._header = False
+
+    def close(self):
+        self._file.close()
+
+
+class ArrowExportWriter:
+    """Потоковая запись Parquet (row group на чанк) или Arrow IPC (batch на чанк)"""
+
+    def __init__(self, filepath, metadata, file_format):
+        self._pa = _require_pyarrow()
+        self._filepath = filepath
+        self._format = file_format
+        self._metadata = {b'export_metadata': json.dumps(metadata, default=str).encode()}
+        self._writer = None
+
+    def write(self, chunk):
+        pa = self._pa
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if self._writer is None:
+            schema = table.schema.with_metadata(self._metadata)
+            if self._format == 'parquet':
+                import pyarrow.parquet as pq
+                self._writer = pq.ParquetWriter(self._filepath, schema, compression='zstd')
+            else:
+                import pyarrow.ipc as ipc
+                self._writer = ipc.new_file(self._filepath, schema)
+        self._writer.write_table(table.replace_schema_metadata(self._metadata))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def create_export_writer(file_format, filepath, metadata):
+    """Создает потоковый writer для формата экспорта"""
+    if file_format == 'json':
+        return JsonExportWriter(filepath, metadata)
+    if file_format == 'csv':
+        return CsvExportWriter(filepath, metadata)
+    if file_format in ('parquet', 'arrow'):
+        return ArrowExportWriter(filepath, metadata, file_format)
+    raise ValueError(f"Unknown export format: {file_format}")
+
+
+def export_dataframe(df, filepath, file_format, metadata, chunk_size=50000, progress=None):
+    """
+    Записывает DataFrame в файл по частям
+
+    Одновременно в памяти находится только сериализованное представление
+    одного чанка. progress(done, total) вызывается после каждого чанка.
+    """
+    total = len(df)
+    writer = create_export_writer(file_format, filepath, metadata)
+    try:
+        for start in range(0, total, chunk_size):
+            writer.write(df.iloc[start:start + chunk_size])
+            if progress is not None:
+                progress(min(start + chunk_size, total), total)
+    finally:
+        writer.close()
+    if progress is not None and total == 0:
+        progress(0, 0)
+    return filepath
+
+
+class DataExporter(QObject):
+    """Выполняет экспорт данных в фоновых потоках и сообщает о прогрессе"""
+
+    progress_updated = pyqtSignal(int, int, int)  # (job_id, done, total)
+    export_finished = pyqtSignal(int, str, str)  # (job_id, filepath, error)
+
+    def __init__(self, chunk_size=50000, parent=None):
+        super().__init__(parent)
+        self.chunk_size = chunk_size
+        self._job_ids = itertools.count(1)
+
+    def start(self, df, filepath, file_format, metadata):
+        """Запускает экспорт в фоновом потоке; возвращает ID задания"""
+        job_id = next(self._job_ids)
+        thread = threading.Thread(
+            target=self._run,
+            args=(job_id, df, filepath, file_format, metadata),
+            name=f"export-{job_id}"
+        )
+        thread.daemon = True
+        thread.start()
+        return job_id
+
+    def _run(self, job_id, df, filepath, file_format, metadata):
+        try:
+            export_dataframe(
+                df, filepath, file_format, metadata, self.chunk_size,
+                progress=lambda done, total: self.progress_updated.emit(job_id, done, total)
+            )
+            self.export_finished.emit(job_id, filepath, "")
+        except Exception as e:
+            logger.warning("Error exporting data to %s: %s", filepath, e)
+            self.export_finished.emit(job_id, filepath, str(e))
@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+
+import ccxt
+import numpy as np
+
+from core import lanes
+from core.result_dispatcher import ResultDispatcher
+
+
+logger = logging.getLogger(__name__)
+
+
+def timeframe_ms(timeframe):
+    return ccxt.Exchange.parse_timeframe(timeframe) * 1000
+
+
+def candle_timestamps(df):
+    """Время свечей DataFrame в мс (int64)"""
+    return df['timestamp'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+
+
+def find_gaps(timestamps, tf_ms, start=None, end=None):
+    """
+    Пропуски в ряду свечей: [(start, end)] мс, полуинтервалы [start, end)
+
+    Соседние свечи сравниваются одной операцией numpy, без цикла по ряду.
+    Без start и end ищутся только пропуски между первой и последней свечой.
+    """
+    ts = np.unique(np.asarray(timestamps, dtype=np.int64))
+    if start is not None:
+        # Начало выравнивается по сетке таймфрейма
+        start = -(-int(start) // tf_ms) * tf_ms
+        ts = ts[ts >= start]
+    if end is not None:
+        ts = ts[ts < end]
+
+    if ts.size == 0:
+        return [(start, end)] if start is not None and end is not None and end > start else []
+
+    breaks = np.flatnonzero(np.diff(ts) > tf_ms)
+    gaps = list(zip((ts[breaks] + tf_ms).tolist(), ts[breaks + 1].tolist()))
+    if start is not None and ts[0] > start:
+        gaps.insert(0, (start, int(ts[0])))
+    if end is not None and ts[-1] + tf_ms < end:
+        gaps.append((int(ts[-1]) + tf_ms, end))
+    return gaps
+
+
+def subtract_intervals(gaps, covered):
+    """Вычитает из пропусков отсортированные интервалы covered (известно пустые)"""
+    result = []
+    covered = sorted(covered)
+    for start, end in gaps:
+        for covered_start, covered_end in covered:
+            if covered_end <= start:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > start:
+                result.append((start, covered_start))
+            start = max(start, covered_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+class IntegrityChecker:
+    """
+    Поиск и догрузка пропусков в рядах свечей
+
+    Пропуски догружаются фоновыми задачами fetch_ohlcv только для
+    недостающих интервалов. Если биржа вернула для интервала не все свечи,
+    оставшиеся пропуски запоминаются как известно пустые (в хранилище, а без
+    него - в памяти) и больше не запрашиваются.
+    """
+
+    def __init__(self, request_queue, storage=None, listing_index=None, lane=lanes.PREFETCH,
+                 priority=5, page_limit=1000):
+        self.request_queue = request_queue
+        self.storage = storage
+        self.listing_index = listing_index
+        self.lane = lane
+        self.priority = priority
+        self.page_limit = page_limit
+        self._lock = threading.Lock()
+        self._empty = {}  # Известно пустые интервалы без хранилища
+        self._in_flight = set()  # Страницы, уже поставленные в очередь
+
+    def known_empty(self, exchange, symbol, timeframe, start=None, end=None):
+        if self.storage is not None:
+            return self.storage.read_empty(exchange, symbol, timeframe, start, end)
+        with self._lock:
+            return list(self._empty.get((exchange, symbol, timeframe), []))
+
+    def _mark_empty(self, exchange, symbol, timeframe, intervals):
+        if not intervals:
+            return
+        if self.storage is not None:
+            self.storage.mark_empty(exchange, symbol, timeframe, intervals)
+            return
+        with self._lock:
+            self._empty.setdefault((exchange, symbol, timeframe), []).extend(intervals)
+
+    def find_gaps(self, exchange, symbol, timeframe, df=None, start=None, end=None):
+        """
+        Пропуски ряда без известно пустых интервалов и времени до листинга
+
+        df - ряд в памяти (например, на графике); без него ряд читается из
+        хранилища за [start, end). Незакрытая текущая свеча пропуском не считается.
+        """
+        tf_ms = timeframe_ms(timeframe)
+        closed_end = (int(time.time() * 1000) // tf_ms) * tf_ms
+        end = closed_end if end is None else min(end, closed_end)
+
+        if self.listing_index is not None:
+            history_start = self.listing_index.get(exchange, symbol, timeframe)
+            if history_start is not None and start is not None:
+                start = max(start, history_start)
+
+        if df is None:
+            df = self.storage.read_candles(exchange, symbol, timeframe, start, end)
+            gaps = find_gaps(candle_timestamps(df), tf_ms, start, end)
+        else:
+            gaps = find_gaps(candle_timestamps(df), tf_ms)
+        if not gaps:
+            return []
+        return subtract_intervals(gaps, self.known_empty(exchange, symbol, timeframe,
+                                                         gaps[0][0], gaps[-1][1]))
+
+    def repair(self, exchange, symbol, timeframe, gaps, callback=None):
+        """
+        Ставит в очередь догрузку пропусков страницами не больше page_limit свечей
+
+        callback(data, error) вызывается в главном потоке для каждой страницы
+        со свечами из интервала страницы. Возвращает число новых страниц.
+        """
+        tf_ms = timeframe_ms(timeframe)
+        scheduled = 0
+        for gap_start, gap_end in gaps:
+            for page_start in range(gap_start, gap_end, self.page_limit * tf_ms):
+                page_end = min(page_start + self.page_limit * tf_ms, gap_end)
+                key = (exchange, symbol, timeframe, page_start)
+                with self._lock:
+                    if key in self._in_flight:
+                        continue
+                    self._in_flight.add(key)
+
+                self.request_queue.add_request(
+                    task_type="fetch_ohlcv",
+                    exchange=exchange,
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    since=page_start // 1000,
+                    limit=(page_end - page_start) // tf_ms,
+                    priority=self.priority,
+                    lane=self.lane,
+                    metadata={'use_cache': False},
+                    # Пустые интервалы пишутся в хранилище вне главного потока
+                    delivery=ResultDispatcher.WORKER,
+                    callback=lambda data, error, key=key, page_end=page_end:
+                        self._on_page(key, page_end, data, error, callback)
+                )
+                scheduled += 1
+        return scheduled
+
+    def _on_page(self, key, page_end, data, error, callback):
+        exchange, symbol, timeframe, page_start = key
+        with self._lock:
+            self._in_flight.discard(key)
+
+        if not error and data is not None:
+            timestamps = candle_timestamps(data)
+            in_page = (timestamps >= page_start) & (timestamps < page_end)
+            data = data[in_page]
+            # Биржа ответила за все окно: чего нет в ответе, того у нее нет
+            try:
+                self._mark_empty(exchange, symbol, timeframe,
+                                 find_gaps(timestamps[in_page], timeframe_ms(timeframe), page_start, page_end))
+            except Exception as e:
+                logger.warning("Error saving empty intervals: %s", e)
+
+        if callback is not None:
+            self.request_queue.result_dispatcher.submit(callback, data, error)
@@ -0,0 +1,124 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+
+# Полосы обслуживания (QoS) в порядке приоритета выдачи
+INTERACTIVE = 'interactive'  # Запросы, результата которых ждет пользователь
+PREFETCH = 'prefetch'  # Упреждающая загрузка
+BULK = 'bulk'  # Массовая загрузка и выгрузка на сервер
+LANES = (INTERACTIVE, PREFETCH, BULK)
+
+# Сколько задач полосы может выполняться одновременно (None - без ограничения).
+# Фоновые полосы не занимают все потоки и соединения, и новая интерактивная
+# задача не ждет, пока разойдется накопившийся фон
+LANE_CONCURRENCY = {
+    INTERACTIVE: None,
+    PREFETCH: 4,
+    BULK: 2,
+}
+
+
+def is_background(lane):
+    """Фоновые полосы расходуют только нерезервированную часть бюджета биржи"""
+    return lane != INTERACTIVE
+
+
+class LaneWaitStats:
+    """Время ожидания задач полосы в очереди (среднее, p95, максимум по последним задачам)"""
+
+    def __init__(self, window=500):
+        self.samples = deque(maxlen=window)
+        self.total = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.total += 1
+
+    def summary(self):
+        if not self.samples:
+            return {'count': self.total, 'avg': 0.0, 'p95': 0.0, 'max': 0.0}
+        ordered = sorted(self.samples)
+        return {
+            'count': self.total,
+            'avg': sum(ordered) / len(ordered),
+            'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+            'max': ordered[-1],
+        }
+
+
+class LaneScheduler:
+    """
+    Очередь задач RequestQueue, разделенная на полосы
+
+    get() выдает задачу из самой приоритетной полосы, у которой есть задачи и
+    свободное место по LANE_CONCURRENCY: интерактивная задача обходит любой
+    накопившийся фон. Внутри полосы порядок - по (priority, task_id).
+    """
+
+    def __init__(self, concurrency=None):
+        self.concurrency = dict(LANE_CONCURRENCY if concurrency is None else concurrency)
+        self._cond = threading.Condition()
+        self._heaps = {lane: [] for lane in LANES}
+        self._in_flight = {lane: 0 for lane in LANES}
+        self._wait_stats = {lane: LaneWaitStats() for lane in LANES}
+        self._order = itertools.count()
+
+    def put(self, lane, priority, task_id, task):
+        """Ставит задачу в полосу"""
+        with self._cond:
+            heapq.heappush(self._heaps[lane], (priority, task_id, next(self._order), time.time(), task))
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """
+        Забирает следующую задачу: (lane, priority, task)
+
+        Задача считается выполняющейся до вызова done(lane). Если за timeout
+        подходящей задачи нет, бросает queue.Empty.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                for lane in LANES:
+                    heap = self._heaps[lane]
+                    limit = self.concurrency.get(lane)
+                    if heap and (limit is None or self._in_flight[lane] < limit):
+                        priority, _, _, queued_at, task = heapq.heappop(heap)
+                        self._in_flight[lane] += 1
+                        self._wait_stats[lane].add(time.time() - queued_at)
+                        return lane, priority, task
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                self._cond.wait(remaining)
+
+    def done(self, lane):
+        """Отмечает завершение (или откладывание) выданной задачи полосы"""
+        with self._cond:
+            self._in_flight[lane] = max(0, self._in_flight[lane] - 1)
+            self._cond.notify()
+
+    def clear(self):
+        """Удаляет все ожидающие задачи"""
+        with self._cond:
+            for heap in self._heaps.values():
+                heap.clear()
+
+    def qsize(self):
+        with self._cond:
+            return sum(len(heap) for heap in self._heaps.values())
+
+    def stats(self):
+        """Состояние полос: в очереди, выполняется и время ожидания"""
+        with self._cond:
+            return {
+                lane: dict(self._wait_stats[lane].summary(),
+                           queued=len(self._heaps[lane]),
+                           in_flight=self._in_flight[lane])
+                for lane in LANES
+            }
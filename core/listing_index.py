@@ -0,0 +1,118 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import ccxt
+
+
+logger = logging.getLogger(__name__)
+
+
+# Нижняя граница поиска: раньше этой даты на биржах нет свечей
+HISTORY_START_MS = 1262304000000  # 2010-01-01 UTC
+
+# Ограничение на число запросов одного поиска
+MAX_PROBES = 32
+
+
+def find_earliest_candle(fetch, timeframe, window_candles, now_ms=None, lower_ms=HISTORY_START_MS,
+                         max_probes=MAX_PROBES):
+    """
+    Двоичным поиском находит время (мс) самой ранней свечи или None, если свечей нет
+
+    fetch(since_ms, limit) возвращает свечи ccxt начиная с since_ms. Поиск
+    опирается на то, что после листинга история непрерывна: если в окне
+    [mid, mid + window) свечей нет, листинг позже. Каждый шаг делит интервал
+    пополам, поэтому даже для 1m хватает 12-15 запросов.
+    """
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    window = window_candles * tf_ms
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+
+    def first_candle(since):
+        timestamps = [candle[0] for candle in fetch(since, window_candles) if candle[0] >= since]
+        return min(timestamps) if timestamps else None
+
+    # Самая ранняя свеча лежит в [lo, hi]; hi - время известной свечи
+    lo, hi = lower_ms, None
+    for _ in range(max_probes):
+        upper = hi if hi is not None else now_ms
+        if upper - lo < tf_ms:
+            return hi
+
+        # Узкий интервал проверяется одним запросом с его начала
+        probe = lo if upper - lo <= window else lo + (upper - lo) // 2 // tf_ms * tf_ms
+        first = first_candle(probe)
+        if first is None:
+            if probe == lo:
+                return hi
+            # В окне свечей нет - листинг позже окна
+            lo = min(probe + window, upper)
+        elif first >= probe + tf_ms:
+            # Перед первой свечой пропуск: до нее истории нет
+            return first
+        elif probe == lo:
+            return first
+        else:
+            hi = first
+    return hi
+
+
+class ListingIndex:
+    """
+    Время самой ранней свечи по (биржа, символ, таймфрейм)
+
+    Хранится в JSON-файле, поэтому поиск для пары выполняется один раз.
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(os.path.expanduser("~"), ".kucoin_viewer", "listing_index.json")
+        self.path = path
+        self._lock = threading.Lock()
+        self._index = self._load()
+
+    @staticmethod
+    def _key(exchange, symbol, timeframe):
+        return f"{exchange}:{symbol}:{timeframe}"
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning("Error reading listing index: %s", e)
+            return {}
+
+    def get(self, exchange, symbol, timeframe):
+        """Время самой ранней свечи (мс) или None, если неизвестно"""
+        with self._lock:
+            return self._index.get(self._key(exchange, symbol, timeframe))
+
+    def set(self, exchange, symbol, timeframe, earliest_ms):
+        with self._lock:
+            self._index[self._key(exchange, symbol, timeframe)] = int(earliest_ms)
+            snapshot = dict(self._index)
+        self._save(snapshot)
+
+    def _save(self, snapshot):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            # Запись через временный файл: прерванное сохранение не портит индекс
+            tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(snapshot, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning("Error saving listing index: %s", e)
+
+    def discover(self, exchange, symbol, timeframe, fetch, window_candles):
+        """Находит и запоминает время самой ранней свечи; None, если свечей нет"""
+        earliest = find_earliest_candle(fetch, timeframe, window_candles)
+        if earliest is not None:
+            self.set(exchange, symbol, timeframe, earliest)
+        return earliest
@@ -0,0 +1,129 @@
+"""
+Журнал приложения
+
+Модули пишут через logging.getLogger(__name__) с отложенным форматированием
+(logger.debug("... %s", value)): если уровень модуля выключен, сообщение не
+форматируется вовсе. Включенные записи попадают в QueueHandler и пишутся в
+файл с ротацией и в консоль фоновым потоком QueueListener, поэтому поток
+задачи не ждет диска и stdout. Поля из extra={...} сохраняются в записи:
+в текстовом формате они дописываются как key=value, в json - отдельными
+ключами.
+
+Настройки - в core.config (LOG_LEVEL, LOG_LEVELS, LOG_FILE, LOG_FORMAT).
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+from core.config import LOG_CONSOLE_LEVEL, LOG_FILE, LOG_FORMAT, LOG_LEVEL, LOG_LEVELS
+
+
+# Логгеры приложения, к которым применяется LOG_LEVEL; сторонние библиотеки
+# (ccxt, urllib3) остаются на уровне WARNING корневого логгера
+APP_LOGGERS = ('core', 'ui', '__main__')
+
+LOG_FILE_MAX_BYTES = 10 * 1024 * 1024
+LOG_FILE_BACKUPS = 5
+
+# Атрибуты LogRecord; все остальное в записи пришло из extra
+_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+_listener = None
+
+
+def record_fields(record):
+    """Поля, переданные в запись через extra"""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+
+
+class TextFormatter(logging.Formatter):
+    """Строка с временем, уровнем, модулем и потоком; поля extra - key=value в конце"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(threadName)s] %(message)s")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = record_fields(record)
+        if fields:
+            text += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """Запись JSON на строку - для сборщиков логов"""
+
+    def format(self, record):
+        entry = {
+            'ts': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        entry.update(record_fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging(path=LOG_FILE, level=LOG_LEVEL, levels=LOG_LEVELS, fmt=LOG_FORMAT,
+                  console_level=LOG_CONSOLE_LEVEL):
+    """
+    Настраивает журнал один раз на процесс; повторный вызов ничего не делает
+
+    path=None - только консоль. Возвращает QueueListener.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    formatter = JsonFormatter() if fmt == 'json' else TextFormatter()
+    handlers = []
+
+    console = logging.StreamHandler()
+    console.setLevel(console_level)
+    console.setFormatter(formatter)
+    handlers.append(console)
+
+    if path:
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8')
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError as e:
+            console.setLevel(logging.NOTSET)
+            logging.getLogger(__name__).warning("Log file %s is not writable, logging to console: %s", path, e)
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(logging.WARNING)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    for name in APP_LOGGERS:
+        logging.getLogger(name).setLevel(level)
+    for name, module_level in levels.items():
+        logging.getLogger(name).setLevel(module_level.upper() if isinstance(module_level, str) else module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def shutdown_logging():
+    """Дописывает накопленные записи и останавливает фоновый поток журнала"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
@@ -0,0 +1,197 @@
+"""
+Время этапов конвейера запросов
+
+Каждая задача RequestQueue получает отметки времени: постановка в очередь,
+выдача диспетчером, начало и конец обработки и доставка результата. Этапы
+внутри задачи (ожидание лимита биржи, сеть, чтение и запись кэша, разбор
+ответа) меряются в потоке задачи через stage(). По завершении задачи
+длительности попадают в гистограммы по типу задачи и по методу биржи.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+# Этапы задачи в порядке прохождения
+QUEUE_WAIT = 'queue_wait'  # От постановки в очередь до выдачи диспетчером
+RATE_LIMIT_WAIT = 'rate_limit_wait'  # Ожидание токена и слота биржи
+NETWORK = 'network'  # Вызов метода ccxt
+CACHE_READ = 'cache_read'  # JSON-кэш и хранилище истории
+CACHE_WRITE = 'cache_write'
+PARSE = 'parse'  # Ответ биржи -> DataFrame
+DELIVERY_WAIT = 'delivery_wait'  # От завершения до вызова callback
+CALLBACK = 'callback'
+TOTAL = 'total'  # От постановки в очередь до конца callback
+STAGES = (QUEUE_WAIT, RATE_LIMIT_WAIT, NETWORK, CACHE_READ, CACHE_WRITE, PARSE,
+          DELIVERY_WAIT, CALLBACK, TOTAL)
+
+# Границы корзин гистограмм, секунды
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Гистограмма длительностей с фиксированными корзинами (совместима с Prometheus)"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина - +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Оценка квантиля по верхней границе корзины"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'avg': self.sum / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'max': self.max,
+        }
+
+
+class PipelineMetrics:
+    """
+    Отметки времени задач, гистограммы этапов и доля попаданий в кэши
+
+    Гистограммы ведутся по ключам ('task', тип задачи) и ('endpoint',
+    'биржа.метод'). Потокобезопасно: отметки ставят диспетчер очереди,
+    потоки задач и главный поток.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._tasks = {}  # task_id -> {'type', 'marks', 'stages'}
+        self._histograms = defaultdict(Histogram)  # (kind, key, stage) -> Histogram
+        self._cache = defaultdict(lambda: [0, 0])  # Уровень кэша -> [попадания, промахи]
+
+    def task_enqueued(self, task_id, task_type):
+        with self._lock:
+            self._tasks[task_id] = {'type': task_type, 'marks': {'enqueue': time.monotonic()},
+                                    'stages': defaultdict(float)}
+
+    def mark(self, task_id, event):
+        """Отметка времени события задачи: parked, dispatch, complete, callback_start, callback_end"""
+        with self._lock:
+            task = self._tasks.get(task_id)
+            if task is not None:
+                task['marks'][event] = time.monotonic()
+
+    @contextmanager
+    def bind(self, task_id):
+        """Привязывает поток к задаче: stage() в нем учитывается в этой задаче"""
+        previous = getattr(self._local, 'task_id', None)
+        self._local.task_id = task_id
+        try:
+            yield
+        finally:
+            self._local.task_id = previous
+
+    @contextmanager
+    def stage(self, name, endpoint=None):
+        """Меряет этап в потоке задачи; endpoint - 'биржа.метод' для гистограммы по методу"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            task_id = getattr(self._local, 'task_id', None)
+            with self._lock:
+                task = self._tasks.get(task_id)
+                if task is not None:
+                    task['stages'][name] += elapsed
+                if endpoint is not None:
+                    self._histograms[('endpoint', endpoint, name)].observe(elapsed)
+
+    def cache_lookup(self, layer, hit):
+        with self._lock:
+            self._cache[layer][0 if hit else 1] += 1
+
+    def task_finished(self, task_id):
+        """Переносит длительности завершенной задачи в гистограммы"""
+        with self._lock:
+            task = self._tasks.pop(task_id, None)
+            if task is None:
+                return
+            marks = task['marks']
+            durations = dict(task['stages'])
+            if 'parked' in marks and 'dispatch' in marks:
+                # Задача ждала сброса ограничения биржи: это ожидание лимита, а не очереди
+                durations[QUEUE_WAIT] = marks['parked'] - marks['enqueue']
+                durations[RATE_LIMIT_WAIT] = (durations.get(RATE_LIMIT_WAIT, 0.0)
+                                              + marks['dispatch'] - marks['parked'])
+            elif 'dispatch' in marks:
+                durations[QUEUE_WAIT] = marks['dispatch'] - marks['enqueue']
+            if 'complete' in marks and 'callback_start' in marks:
+                durations[DELIVERY_WAIT] = marks['callback_start'] - marks['complete']
+            if 'callback_start' in marks and 'callback_end' in marks:
+                durations[CALLBACK] = marks['callback_end'] - marks['callback_start']
+            durations[TOTAL] = max(marks.values()) - marks['enqueue']
+            for stage, seconds in durations.items():
+                self._histograms[('task', task['type'], stage)].observe(seconds)
+
+    def task_dropped(self, task_id):
+        """Забывает отмененную задачу"""
+        with self._lock:
+            self._tasks.pop(task_id, None)
+
+    def histograms(self):
+        """Копии гистограмм: {(kind, key, stage): Histogram}"""
+        with self._lock:
+            copies = {}
+            for key, histogram in self._histograms.items():
+                copy = Histogram(histogram.buckets)
+                copy.counts = list(histogram.counts)
+                copy.count, copy.sum, copy.max = histogram.count, histogram.sum, histogram.max
+                copies[key] = copy
+            return copies
+
+    def snapshot(self):
+        """
+        Сводка для интерфейса
+
+        {'task': {тип: {этап: summary}}, 'endpoint': {метод: {этап: summary}},
+         'cache': {уровень: {'hits', 'misses', 'ratio'}}}
+        """
+        result = {'task': defaultdict(dict), 'endpoint': defaultdict(dict), 'cache': self.cache_stats()}
+        for (kind, key, stage), histogram in self.histograms().items():
+            result[kind][key][stage] = histogram.summary()
+        return result
+
+    def cache_stats(self):
+        """Попадания в кэши: {уровень: {'hits', 'misses', 'ratio'}}"""
+        with self._lock:
+            result = {}
+            for layer, (hits, misses) in self._cache.items():
+                total = hits + misses
+                result[layer] = {'hits': hits, 'misses': misses, 'ratio': hits / total if total else 0.0}
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._cache.clear()
+
+
+# Общий реестр: этапы отмечают RequestQueue, ApiClient и клиенты бирж
+pipeline_metrics = PipelineMetrics()
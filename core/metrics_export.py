@@ -0,0 +1,244 @@
+"""
+Выгрузка метрик в текстовом формате Prometheus
+
+Статистика RequestQueue.get_stats() (очередь, полосы, ограничения бирж),
+попадания в кэши и гистограммы этапов core.metrics отдаются по HTTP на
+127.0.0.1 (GET /metrics) и раз в интервал дописываются в файл с ротацией
+по размеру. В файле у каждого значения стоит метка времени снимка, поэтому
+его можно собирать тем же сборщиком, что и логи. Оба канала включаются
+настройками core.config (METRICS_PORT, METRICS_FILE).
+"""
+import logging
+import logging.handlers
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.config import (METRICS_FILE, METRICS_FILE_BACKUPS, METRICS_FILE_MAX_BYTES, METRICS_INTERVAL,
+                         METRICS_PORT)
+from core.metrics import pipeline_metrics
+from core.startup import startup
+
+
+logger = logging.getLogger(__name__)
+
+
+PREFIX = 'kucoin_viewer'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+class _Exposition:
+    """Текст в формате Prometheus: семейства метрик с HELP и TYPE"""
+
+    def __init__(self, timestamp_ms=None):
+        self.suffix = f" {timestamp_ms}" if timestamp_ms is not None else ''
+        self.lines = []
+
+    def family(self, name, kind, help_text, samples):
+        """samples - [(суффикс имени, {метка: значение}, число)]"""
+        name = f"{PREFIX}_{name}"
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+            label_text = f"{{{label_text}}}" if label_text else ''
+            self.lines.append(f"{name}{suffix}{label_text} {_format_value(value)}{self.suffix}")
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _histogram_samples(histograms, kind, label):
+    """Корзины гистограмм core.metrics: накопительные _bucket, _sum и _count"""
+    samples = []
+    for (hist_kind, key, stage), histogram in sorted(histograms.items()):
+        if hist_kind != kind:
+            continue
+        labels = {label: key, 'stage': stage}
+        seen = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            seen += count
+            samples.append(('_bucket', dict(labels, le=_format_value(bound)), seen))
+        samples.append(('_bucket', dict(labels, le='+Inf'), histogram.count))
+        samples.append(('_sum', labels, histogram.sum))
+        samples.append(('_count', labels, histogram.count))
+    return samples
+
+
+def render_metrics(stats, histograms, cache, timestamp_ms=None, startup=None):
+    """
+    Текст метрик Prometheus
+
+    stats - снимок RequestQueue.get_stats(), histograms - результат
+    PipelineMetrics.histograms(), cache - PipelineMetrics.cache_stats(),
+    startup - этапы запуска core.startup ({этап: секунды}). timestamp_ms добавляется к каждому значению (для файла).
+    """
+    out = _Exposition(timestamp_ms)
+    out.family('queue_size', 'gauge', "Tasks waiting in the request queue",
+               [('', {}, stats['queue_size'])])
+    out.family('tasks_active', 'gauge', "Queued and running tasks",
+               [('', {}, stats['active'])])
+    out.family('tasks_processing', 'gauge', "Tasks being executed",
+               [('', {}, stats['processing'])])
+    out.family('queue_paused', 'gauge', "1 if the request queue is paused",
+               [('', {}, int(stats['paused']))])
+    out.family('tasks_finished_total', 'counter', "Finished tasks by final status",
+               [('', {'status': status}, count) for status, count in sorted(stats['status_totals'].items())])
+    out.family('tasks_by_type_total', 'counter', "Finished tasks by task type",
+               [('', {'type': task_type}, count) for task_type, count in sorted(stats['type_totals'].items())])
+
+    out.family('rate_limited', 'gauge', "1 if any exchange is rate limited",
+               [('', {}, int(stats['rate_limited']))])
+    out.family('rate_limit_reset_seconds', 'gauge', "Seconds until the exchange rate limit resets",
+               [('', {'exchange': exchange}, seconds) for exchange, seconds in sorted(stats['rate_limits'].items())])
+
+    lanes = sorted(stats['lanes'].items())
+    out.family('lane_queued', 'gauge', "Tasks waiting in the QoS lane",
+               [('', {'lane': lane}, lane_stats['queued']) for lane, lane_stats in lanes])
+    out.family('lane_in_flight', 'gauge', "Tasks of the QoS lane being executed",
+               [('', {'lane': lane}, lane_stats['in_flight']) for lane, lane_stats in lanes])
+    out.family('lane_dispatched_total', 'counter', "Tasks dispatched from the QoS lane",
+               [('', {'lane': lane}, lane_stats['count']) for lane, lane_stats in lanes])
+    out.family('lane_wait_seconds', 'gauge', "Queue wait of recent lane tasks (avg, p95, max)",
+               [('', {'lane': lane, 'stat': stat}, lane_stats[stat])
+                for lane, lane_stats in lanes for stat in ('avg', 'p95', 'max')])
+
+    layers = sorted(cache.items())
+    out.family('cache_hits_total', 'counter', "Cache lookups that returned data",
+               [('', {'layer': layer}, layer_stats['hits']) for layer, layer_stats in layers])
+    out.family('cache_misses_total', 'counter', "Cache lookups that missed",
+               [('', {'layer': layer}, layer_stats['misses']) for layer, layer_stats in layers])
+
+    out.family('task_stage_seconds', 'histogram', "Duration of request pipeline stages by task type",
+               _histogram_samples(histograms, 'task', 'type'))
+    out.family('endpoint_stage_seconds', 'histogram', "Duration of exchange calls by endpoint",
+               _histogram_samples(histograms, 'endpoint', 'endpoint'))
+    if startup:
+        out.family('startup_seconds', 'gauge', "Time from process start to the startup phase",
+                   [('', {'phase': phase}, seconds) for phase, seconds in startup.items()])
+    return out.text()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        try:
+            body = self.server.exporter.render().encode('utf-8')
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Запросы сборщика не засоряют вывод
+        pass
+
+
+class MetricsExporter:
+    """
+    HTTP-эндпоинт и файл метрик для одного RequestQueue
+
+    Эндпоинт слушает только 127.0.0.1. Файл пишет отдельный поток; снимок
+    целиком попадает в один файл - ротация происходит между снимками.
+    """
+
+    def __init__(self, request_queue, port=None, file_path=None, interval=METRICS_INTERVAL,
+                 max_bytes=METRICS_FILE_MAX_BYTES, backup_count=METRICS_FILE_BACKUPS, host='127.0.0.1'):
+        self.request_queue = request_queue
+        self.port = port
+        self.file_path = file_path
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.host = host
+        self._server = None
+        self._file_handler = None
+        self._stop = threading.Event()
+        self._threads = []
+
+    def render(self, timestamp_ms=None):
+        return render_metrics(self.request_queue.get_stats(), pipeline_metrics.histograms(),
+                              pipeline_metrics.cache_stats(), timestamp_ms, startup.phases())
+
+    def start(self):
+        if self.port:
+            self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+            self._server.daemon_threads = True
+            self._server.exporter = self
+            self._spawn(self._server.serve_forever, "MetricsHTTP")
+            logger.info("Metrics endpoint: http://%s:%s/metrics", self.host, self.port)
+
+        if self.file_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.file_path)), exist_ok=True)
+            self._file_handler = logging.handlers.RotatingFileHandler(
+                self.file_path, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                encoding='utf-8', delay=True)
+            self._file_handler.setFormatter(logging.Formatter('%(message)s'))
+            self._spawn(self._file_loop, "MetricsFile")
+        return self
+
+    def _spawn(self, target, name):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def write_snapshot(self):
+        """Дописывает снимок метрик в файл"""
+        text = self.render(timestamp_ms=int(time.time() * 1000))
+        self._file_handler.handle(logging.makeLogRecord({'msg': text.rstrip('\n')}))
+
+    def _file_loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logger.warning("Error writing metrics file: %s", e)
+
+    def stop(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        if self._file_handler is not None:
+            # Последний снимок перед закрытием
+            try:
+                self.write_snapshot()
+            except Exception as e:
+                logger.warning("Error writing metrics file: %s", e)
+            self._file_handler.close()
+
+
+def start_metrics_export(request_queue, port=METRICS_PORT, file_path=METRICS_FILE):
+    """Запускает выгрузку метрик, если она включена настройками; иначе None"""
+    if not port and not file_path:
+        return None
+    exporter = MetricsExporter(request_queue, port=port, file_path=file_path)
+    try:
+        return exporter.start()
+    except Exception as e:
+        logger.warning("Error starting metrics export: %s", e)
+        exporter.stop()
+        return None
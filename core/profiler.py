@@ -0,0 +1,228 @@
+"""
+Встроенный сэмплирующий профилировщик
+
+Код помечает свою работу контекстами: задачи RequestQueue - "task:<тип>",
+их callback'и - "callback:<тип>", обработчики интерфейса - через декоратор
+profiled("update_indicators"). Пока профилирование включено, фоновый поток
+раз в интервал снимает стеки потоков, находящихся в контексте
+(sys._current_frames), и считает одинаковые стеки. Опционально tracemalloc
+отслеживает выделения памяти: по контекстам считается прирост памяти за
+вызов, по стекам - живые выделения.
+
+dump() пишет свернутые стеки (формат collapsed: "кадр;кадр;... число"),
+которые читают flamegraph.pl, speedscope и inferno, и текстовую сводку по
+контекстам.
+"""
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from core.config import PROFILE_DIR, PROFILE_INTERVAL
+
+
+logger = logging.getLogger(__name__)
+
+# Глубина стеков tracemalloc: больше - точнее граф памяти и дороже каждое выделение
+TRACEMALLOC_FRAMES = 25
+
+
+def _frame_label(code):
+    """Кадр свернутого стека: функция и строка ее определения - вызовы одной функции сливаются"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Сэмплы CPU-стеков и выделения памяти по контекстам
+
+    Контексты ставятся всегда (это одна запись в словаре), поэтому
+    профилирование можно включить посреди работы задачи. Потоки вне
+    контекстов не сэмплируются.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._contexts = {}  # Идентификатор потока -> текущий контекст
+        self._stacks = Counter()  # Свернутый стек -> число сэмплов
+        self._samples = Counter()  # Контекст -> число сэмплов
+        self._allocations = defaultdict(lambda: [0, 0, 0])  # Контекст -> [вызовы, прирост байт, максимум]
+        self._started_at = None
+        self._stop = None
+        self._thread = None
+        self.tracing_memory = False
+        self._owns_tracemalloc = False
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, trace_memory=False):
+        """Включает сэмплирование; trace_memory - еще и tracemalloc"""
+        with self._lock:
+            if self._thread is None:
+                self._started_at = time.time()
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._sample_loop, args=(self._stop,),
+                                                name="SamplingProfiler", daemon=True)
+                self._thread.start()
+        self.set_memory_tracing(trace_memory)
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._stop.set()
+        if thread is not None:
+            thread.join(timeout=1)
+        self.set_memory_tracing(False)
+
+    def set_memory_tracing(self, enabled):
+        """Включает и выключает tracemalloc; запущенный не нами tracemalloc не останавливается"""
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._owns_tracemalloc = True
+        elif not enabled and self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        self.tracing_memory = enabled
+
+    def reset(self):
+        with self._lock:
+            self._stacks.clear()
+            self._samples.clear()
+            self._allocations.clear()
+            self._started_at = time.time() if self._thread is not None else None
+
+    @contextmanager
+    def context(self, label):
+        """Помечает работу текущего потока; вложенный контекст восстанавливает внешний"""
+        ident = threading.get_ident()
+        previous = self._contexts.get(ident)
+        self._contexts[ident] = label
+        before = tracemalloc.get_traced_memory()[0] if self.tracing_memory else None
+        try:
+            yield
+        finally:
+            if previous is None:
+                self._contexts.pop(ident, None)
+            else:
+                self._contexts[ident] = previous
+            if before is not None and self.tracing_memory:
+                # Прирост памяти за вызов; параллельные контексты в других потоках
+                # тоже попадают в эту разницу, поэтому оценка приблизительная
+                delta = tracemalloc.get_traced_memory()[0] - before
+                with self._lock:
+                    stats = self._allocations[label]
+                    stats[0] += 1
+                    stats[1] += delta
+                    stats[2] = max(stats[2], delta)
+
+    def _sample_loop(self, stop):
+        own_ident = threading.get_ident()
+        while not stop.wait(self.interval):
+            contexts = dict(self._contexts)
+            if not contexts:
+                continue
+            frames = sys._current_frames()
+            folded = []
+            for ident, label in contexts.items():
+                frame = frames.get(ident)
+                if frame is None or ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(label)
+                folded.append((label, ';'.join(reversed(stack))))
+            del frames
+            with self._lock:
+                for label, stack in folded:
+                    self._stacks[stack] += 1
+                    self._samples[label] += 1
+
+    def summary(self):
+        """Сэмплы и выделения по контекстам: {контекст: {'samples', 'calls', 'alloc_bytes', 'max_alloc'}}"""
+        with self._lock:
+            labels = set(self._samples) | set(self._allocations)
+            return {
+                label: {
+                    'samples': self._samples.get(label, 0),
+                    'calls': self._allocations[label][0] if label in self._allocations else 0,
+                    'alloc_bytes': self._allocations[label][1] if label in self._allocations else 0,
+                    'max_alloc': self._allocations[label][2] if label in self._allocations else 0,
+                }
+                for label in labels
+            }
+
+    def dump(self, directory=PROFILE_DIR):
+        """
+        Пишет профиль в каталог; возвращает список файлов
+
+            cpu-<время>.folded    - CPU-стеки по контекстам, число сэмплов
+            memory-<время>.folded - живые выделения tracemalloc по стекам, байты
+            profile-<время>.txt   - сводка по контекстам
+        """
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = []
+
+        with self._lock:
+            stacks = dict(self._stacks)
+            started_at = self._started_at
+        cpu_path = os.path.join(directory, f"cpu-{stamp}.folded")
+        with open(cpu_path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(stacks.items()):
+                f.write(f"{stack} {count}\n")
+        paths.append(cpu_path)
+
+        if tracemalloc.is_tracing():
+            memory_path = os.path.join(directory, f"memory-{stamp}.folded")
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ])
+            with open(memory_path, 'w', encoding='utf-8') as f:
+                for stat in snapshot.statistics('traceback'):
+                    # Кадры traceback идут от внешнего к внутреннему, как в свернутом стеке
+                    frames = ';'.join(f"{os.path.basename(frame.filename)}:{frame.lineno}"
+                                      for frame in stat.traceback)
+                    f.write(f"{frames} {stat.size}\n")
+            paths.append(memory_path)
+
+        summary_path = os.path.join(directory, f"profile-{stamp}.txt")
+        duration = time.time() - started_at if started_at else 0.0
+        rows = sorted(self.summary().items(), key=lambda item: -item[1]['samples'])
+        total_samples = sum(stats['samples'] for _, stats in rows) or 1
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            f.write(f"Profiled for {duration:.1f}s, sampling every {self.interval * 1000:.0f} ms\n\n")
+            f.write(f"{'Context':<40} {'Samples':>8} {'Share':>6} {'Calls':>7} {'Alloc net':>12} {'Alloc max':>12}\n")
+            for label, stats in rows:
+                f.write(f"{label:<40} {stats['samples']:>8} {stats['samples'] / total_samples:>6.1%} "
+                        f"{stats['calls']:>7} {stats['alloc_bytes']:>12} {stats['max_alloc']:>12}\n")
+        paths.append(summary_path)
+
+        logger.info("Profile written to %s", directory)
+        return paths
+
+
+# Общий профилировщик: контексты ставят RequestQueue и обработчики интерфейса
+profiler = SamplingProfiler()
+
+
+def profiled(label):
+    """Декоратор обработчика: его работа попадает в контекст label"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.context(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,298 @@
+"""
+Запись и воспроизведение ответов бирж
+
+В режиме record (KUCOIN_VIEWER_EXCHANGE_MODE=record) экземпляр ccxt
+оборачивается в RecordingExchange: каждый вызов метода (рынки, тикеры,
+страницы OHLCV) и каждая ошибка, включая RateLimitExceeded, дописываются в
+архив - файл <биржа>.jsonl.gz в каталоге REPLAY_ARCHIVE. В режиме replay
+вместо ccxt работает ReplayExchange: он отвечает из архива с заданной
+задержкой и собственным ограничением частоты, без сети.
+
+Ответ ищется по точному вызову (метод и аргументы); повторы одного вызова
+воспроизводятся в порядке записи. Для fetch_ohlcv без точной записи окно
+собирается из всех записанных свечей пары, поэтому после записи любой
+загрузки пару можно листать с другими since и limit.
+"""
+import atexit
+import bisect
+import gzip
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import defaultdict
+
+import ccxt
+
+from core.config import EXCHANGE_MODE, REPLAY_ARCHIVE, REPLAY_LATENCY, REPLAY_RATE, REPLAY_SHIFT_TIME
+
+
+logger = logging.getLogger(__name__)
+
+LIVE, RECORD, REPLAY = 'live', 'record', 'replay'
+
+# Сдвиг времени архива кратен неделе: сетка свечей всех таймфреймов сохраняется
+WEEK_MS = 7 * 24 * 3600 * 1000
+
+
+def archive_path(directory, exchange_id):
+    return os.path.join(directory, f"{exchange_id}.jsonl.gz")
+
+
+def call_key(method, args, kwargs):
+    """Ключ вызова: метод и аргументы в каноническом JSON (без params и пустых kwargs)"""
+    kwargs = {key: value for key, value in kwargs.items() if value is not None and key != 'params'}
+    return json.dumps([method, list(args), kwargs], sort_keys=True, default=str)
+
+
+class ArchiveWriter:
+    """
+    Дописывает записи вызовов в архив
+
+    Каждая запись сбрасывается на диск (gzip flush), поэтому архив читается
+    и после аварийного завершения записи. Новый запуск добавляет в файл
+    следующий gzip-поток - gzip читает их подряд.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+
+    def write(self, record):
+        line = json.dumps(record, default=str, separators=(',', ':'))
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(line + '\n')
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplayArchive:
+    """
+    Записанные ответы одной биржи
+
+    responses - ключ вызова -> записи в порядке записи; series - (символ,
+    таймфрейм) -> свечи всех страниц без повторов, по времени.
+    """
+
+    def __init__(self, meta=None):
+        self.meta = dict(meta or {})
+        self.responses = defaultdict(list)
+        self._candles = defaultdict(dict)  # (символ, таймфрейм) -> {время: свеча}
+        self._series = {}
+        self.recorded_at = 0  # Время последней записи, мс
+
+    @classmethod
+    def load(cls, path):
+        archive = cls()
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Оборванная последняя строка после аварийной записи
+                    break
+                if 'meta' in record:
+                    archive.meta.update(record['meta'])
+                else:
+                    archive.add(record['method'], record['args'], record['kwargs'], record.get('result'),
+                                record.get('error'), record.get('ts'))
+        return archive
+
+    def add(self, method, args, kwargs, result=None, error=None, ts=None):
+        """Добавляет запись; error - [имя класса ccxt, сообщение]"""
+        self.responses[call_key(method, args, kwargs)].append({'result': result, 'error': error})
+        self.recorded_at = max(self.recorded_at, ts or 0)
+        if method == 'fetch_ohlcv' and result:
+            symbol, timeframe = args[0], args[1] if len(args) > 1 else kwargs.get('timeframe', '1m')
+            candles = self._candles[(symbol, timeframe)]
+            for candle in result:
+                candles[candle[0]] = candle
+            self._series.pop((symbol, timeframe), None)
+            if ts is None:
+                self.recorded_at = max(self.recorded_at, result[-1][0])
+
+    def series(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        series = self._series.get(key)
+        if series is None:
+            candles = [self._candles[key][ts] for ts in sorted(self._candles.get(key, {}))]
+            series = self._series[key] = ([candle[0] for candle in candles], candles)
+        return series
+
+
+class RecordingExchange:
+    """Обертка ccxt: вызовы методов fetch_* записываются в архив вместе с ответом или ошибкой"""
+
+    def __init__(self, exchange, writer):
+        self._exchange = exchange
+        self._writer = writer
+        writer.write({'meta': {'exchange': exchange.id, 'rateLimit': exchange.rateLimit}})
+
+    def __getattr__(self, name):
+        attr = getattr(self._exchange, name)
+        if not (callable(attr) and name.startswith('fetch_')):
+            return attr
+
+        def recorded(*args, **kwargs):
+            record = {'method': name, 'args': list(args), 'kwargs': kwargs, 'ts': int(time.time() * 1000)}
+            try:
+                result = attr(*args, **kwargs)
+            except ccxt.BaseError as e:
+                record['error'] = [type(e).__name__, str(e)]
+                self._writer.write(record)
+                raise
+            record['result'] = result
+            self._writer.write(record)
+            return result
+        return recorded
+
+
+class ReplayExchange:
+    """
+    Биржа, отвечающая из архива без сети
+
+    latency - задержка каждого ответа, секунды; rate - сколько запросов в
+    секунду биржа принимает (0 - без ограничения), сверх этого вызов
+    завершается RateLimitExceeded, как у настоящей биржи. shift_time
+    сдвигает время архива (с шагом в неделю) к текущему, чтобы окна "за
+    последние N дней" попадали в записанные данные.
+    """
+
+    def __init__(self, archive, exchange_id='kucoin', latency=0.0, rate=0.0, shift_time=False):
+        self.id = exchange_id
+        self.archive = archive
+        self.latency = latency
+        self.rate = rate
+        self.rateLimit = archive.meta.get('rateLimit', 100)
+        self._lock = threading.Lock()
+        self._cursors = defaultdict(int)
+        self._window = []  # Время последних запросов для ограничения частоты
+        self.offset = 0
+        if shift_time and archive.recorded_at:
+            self.offset = (int(time.time() * 1000) - archive.recorded_at) // WEEK_MS * WEEK_MS
+
+    def _throttle(self):
+        if not self.rate:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._window = [t for t in self._window if now - t < 1.0]
+            if len(self._window) >= self.rate:
+                # Целые секунды, как в ответах бирж: ApiClient.extract_reset_time берет первое число
+                retry_after = math.ceil(1.0 - (now - self._window[0]))
+                raise ccxt.RateLimitExceeded(f"{self.id} replay: too many requests, retry after {retry_after}s")
+            self._window.append(now)
+
+    def _recorded(self, method, args, kwargs):
+        """Следующая запись точного вызова или None"""
+        key = call_key(method, args, kwargs)
+        with self._lock:
+            records = self.archive.responses.get(key)
+            if not records:
+                return None
+            index = self._cursors[key]
+            # Повторы воспроизводятся по порядку, дальше повторяется последний ответ
+            self._cursors[key] = min(index + 1, len(records) - 1)
+            record = records[index]
+        if record['error']:
+            name, message = record['error']
+            raise getattr(ccxt, name, ccxt.ExchangeError)(message)
+        return record
+
+    def _respond(self, method, args, kwargs):
+        self._throttle()
+        if self.latency:
+            time.sleep(self.latency)
+        record = self._recorded(method, args, kwargs)
+        if record is None:
+            raise ccxt.ExchangeNotAvailable(f"{self.id} replay: no recorded response for {method}{tuple(args)}")
+        return record['result']
+
+    def fetch_markets(self, params={}):
+        return self._respond('fetch_markets', [], {})
+
+    def fetch_ticker(self, symbol, params={}):
+        ticker = dict(self._respond('fetch_ticker', [symbol], {}))
+        if self.offset and ticker.get('timestamp'):
+            ticker['timestamp'] += self.offset
+        return ticker
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        self._throttle()
+        if self.latency:
+            time.sleep(self.latency)
+        if since is not None:
+            since -= self.offset
+
+        kwargs = {'since': since, 'limit': limit}
+        record = self._recorded('fetch_ohlcv', [symbol, timeframe], kwargs)
+        if record is not None:
+            candles = record['result']
+        else:
+            # Точного вызова нет: окно из всех записанных свечей пары
+            timestamps, all_candles = self.archive.series(symbol, timeframe)
+            if not timestamps:
+                raise ccxt.ExchangeNotAvailable(f"{self.id} replay: no recorded candles for {symbol} {timeframe}")
+            limit = limit or 1500
+            # Без since биржа отдает последние свечи
+            if since is not None:
+                start = bisect.bisect_left(timestamps, since)
+            else:
+                start = max(0, len(all_candles) - limit)
+            candles = all_candles[start:start + limit]
+        if self.offset:
+            candles = [[candle[0] + self.offset] + list(candle[1:]) for candle in candles]
+        return candles
+
+
+_writers = {}
+_archives = {}
+_lock = threading.Lock()
+
+
+def create_exchange(exchange_id, options, mode=EXCHANGE_MODE, directory=REPLAY_ARCHIVE):
+    """
+    Экземпляр биржи для ExchangeClient по режиму работы
+
+    live - ccxt; record - ccxt с записью в архив; replay - ReplayExchange
+    по архиву (архивы и файлы записи общие для всех клиентов процесса).
+    """
+    if mode == REPLAY:
+        with _lock:
+            archive = _archives.get(exchange_id)
+            if archive is None:
+                path = archive_path(directory, exchange_id)
+                archive = _archives[exchange_id] = ReplayArchive.load(path) if os.path.exists(path) else ReplayArchive()
+                logger.info("Replaying %s from %s: %d recorded calls", exchange_id, path, len(archive.responses))
+        return ReplayExchange(archive, exchange_id, REPLAY_LATENCY, REPLAY_RATE, REPLAY_SHIFT_TIME)
+
+    exchange = getattr(ccxt, exchange_id)(options)
+    if mode == RECORD:
+        with _lock:
+            writer = _writers.get(exchange_id)
+            if writer is None:
+                if not _writers:
+                    atexit.register(close_recordings)
+                writer = _writers[exchange_id] = ArchiveWriter(archive_path(directory, exchange_id))
+                logger.info("Recording %s responses to %s", exchange_id, writer.path)
+        return RecordingExchange(exchange, writer)
+    return exchange
+
+
+def close_recordings():
+    """Закрывает архивы записи"""
+    with _lock:
+        for writer in _writers.values():
+            writer.close()
+        _writers.clear()
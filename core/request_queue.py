@@ -1,38 +1,107 @@
+import itertools
+import logging
 import queue
 import threading
 import time
 import uuid
-from PyQt5.QtCore import QObject, pyqtSignal
+from types import MappingProxyType
+from urllib.parse import urlsplit
+from core.signals import QObject, pyqtSignal, Qt
+
+from core import lanes
+from core.config import TASK_HISTORY_SIZE, TCP_UPLOAD_TIMEOUT
+from core.lanes import LaneScheduler
+from core.metrics import pipeline_metrics
+from core.profiler import profiler
+from core.result_dispatcher import ResultDispatcher
+from core.task_state import TaskState
+from core.tcp_sink import TcpSink, encode_candle_frames
+from core.uploader import Uploader
+
+
+logger = logging.getLogger(__name__)
 
 
 class RequestQueue(QObject):
+    # Статусы, в которых задача еще может быть запущена диспетчером
+    DISPATCHABLE = ('queued', 'rate_limited')
+    # Типы задач, которые умеет запускать диспетчер (по ним фильтрует вкладка Pipe)
+    TASK_TYPES = ('fetch_ohlcv', 'fetch_ticker', 'fetch_trending_coins', 'fetch_markets', 'upload_data')
+    # Типы задач, которые не обращаются к бирже и не зависят от ее лимитов
+    LOCAL_TASK_TYPES = ('upload_data',)
+    # Ошибка, с которой callback получает задачу, отмененную clear()
+    CANCELLED = "Task cancelled"
+
     progress_updated = pyqtSignal(int, int, int)  # (task_id, progress, total)
-    queue_status_changed = pyqtSignal(dict)  # статус очереди
+    queue_status_changed = pyqtSignal(object)  # неизменяемый снимок статуса очереди
 
-    def __init__(self, api_client):
+    def __init__(self, api_client, history_size=TASK_HISTORY_SIZE):
         super().__init__()
         self.api_client = api_client
-        self.task_queue = queue.PriorityQueue()
-        self.active_tasks = {}
-        self.completed_tasks = []
+        # Задачи ждут в полосах (interactive / prefetch / bulk), см. core.lanes
+        self.task_queue = LaneScheduler()
+        # Все состояние задач (активные, история, журнал изменений) живет в TaskState
+        self.state = TaskState(history_size)
         self.is_running = True
         self.paused = False
         self.last_task_id = 0
+        self._task_ids = itertools.count(1)
+        # Задачи бирж под ограничением запросов ждут здесь, не блокируя другие биржи:
+        # exchange -> [(priority, task_id, task)]; под _parked_lock, его же берет clear()
+        self._parked = {}
+        self._parked_lock = threading.Lock()
+
+        # Доставка результатов в callback'и (пачками в главном потоке Qt)
+        self.result_dispatcher = ResultDispatcher(parent=self)
+
+        # Загрузка экспортированных данных на сервер (задачи upload_data)
+        self.uploader = Uploader()
+        # Постоянные TCP-соединения с коллекторами: (host, port, secure) -> TcpSink
+        self.tcp_sinks = {}
+        self._tcp_sinks_lock = threading.Lock()
 
         # Запускаем обработчик очереди в отдельном потоке
         self.worker_thread = threading.Thread(target=self._process_queue)
         self.worker_thread.daemon = True
         self.worker_thread.start()
 
-        # Подключаем сигналы от API клиента
-        self.api_client.request_complete.connect(self._on_request_complete)
-        self.api_client.rate_limit_hit.connect(self._on_rate_limit_hit)
+        # Подключаем сигналы от API клиента. Учет завершения выполняется прямо
+        # в потоке запроса; в главный поток callback'и передает ResultDispatcher
+        self.api_client.request_complete.connect(self._on_request_complete, Qt.DirectConnection)
+        self.api_client.rate_limit_hit.connect(self._on_rate_limit_hit, Qt.DirectConnection)
 
     def add_request(self, task_type, symbol=None, timeframe=None, since=None,
-                    callback=None, priority=1, limit=None, exchange="kucoin"):
-        """Добавляет запрос в очередь"""
-        self.last_task_id += 1
-        task_id = self.last_task_id
+                    callback=None, priority=1, limit=None, exchange="kucoin",
+                    delivery=ResultDispatcher.MAIN, data=None, endpoint=None, metadata=None,
+                    lane=None):
+        """
+        Добавляет запрос в очередь
+
+        callback(data, error) вызывается по завершении задачи. При
+        delivery='main' он выполняется в главном потоке Qt, при
+        delivery='worker' - в пуле рабочих потоков (для тяжелой обработки).
+
+        Для task_type='fetch_ohlcv' metadata={'use_cache': False} отправляет
+        запрос мимо JSON-кэша ApiClient (точечная догрузка пропусков); ошибка
+        записи свечей в хранилище истории тогда приходит в callback ошибкой.
+        task_type='fetch_markets' возвращает DataFrame активных пар биржи.
+
+        Для task_type='upload_data' используются endpoint, metadata и
+        data: если data не задан, загружается файл metadata['filepath'].
+        Для endpoint вида tcp:// (tcps:// - с TLS) data - DataFrame свечей,
+        который передается кадрами через постоянное TCP-соединение.
+
+        lane - полоса обслуживания (core.lanes): по умолчанию 'interactive'
+        для запросов к бирже и 'bulk' для локальных задач. priority
+        упорядочивает задачи внутри полосы.
+        """
+        if lane is None:
+            lane = lanes.BULK if task_type in self.LOCAL_TASK_TYPES else lanes.INTERACTIVE
+        if lane not in lanes.LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+
+        task_id = next(self._task_ids)
+        self.last_task_id = task_id
 
         task = {
             'id': task_id,
@@ -43,17 +112,27 @@ class RequestQueue(QObject):
             'limit': limit,
             'callback': callback,
             'priority': priority,
+            'lane': lane,
             'status': 'queued',
             'created_at': time.time(),
-            'exchange': exchange  # Добавляем поле exchange
+            'exchange': exchange,  # Добавляем поле exchange
+            'delivery': delivery,
+            'data': data,
+            'endpoint': endpoint,
+            'metadata': metadata,
+            'progress': None
         }
-        print(f"Добавляем задачу {task_id} в очередь: {task}")
+        logger.debug("Task %s queued: %s %s %s", task_id, task_type, symbol or '', timeframe or '',
+                     extra={'task_id': task_id, 'lane': lane, 'priority': priority})
 
-        # Добавляем в очередь с приоритетом (меньшее число = высший приоритет)
-        self.task_queue.put((priority, task))
+        # Сохраняем для отслеживания до постановки в очередь, чтобы диспетчер
+        # не получил задачу, о которой состояние еще не знает
+        self.state.add(task)
+        pipeline_metrics.task_enqueued(task_id, task_type)
 
-        # Сохраняем для отслеживания
-        self.active_tasks[task_id] = task
+        # Добавляем в полосу с приоритетом (меньшее число = высший приоритет),
+        # ID задачи разрешает равные приоритеты без сравнения словарей
+        self.task_queue.put(lane, priority, task_id, task)
 
         # Уведомляем об изменении очереди
         self._notify_queue_status()
@@ -67,42 +146,76 @@ class RequestQueue(QObject):
                 time.sleep(0.5)
                 continue
 
+            # Возвращаем в очередь задачи бирж, у которых истекло ограничение
+            self._release_parked()
+
             try:
-                # Пытаемся получить задачу из очереди с таймаутом
-                priority, task = self.task_queue.get(timeout=0.5)
-                print(f"Обрабатываем задачу {task['id']} с приоритетом {priority}: {task}")
-
-                # Проверяем ограничения по запросам
-                if self.api_client.is_rate_limited():
-                    # Если биржа в режиме ограничения, возвращаем задачу обратно в очередь
-                    reset_time = self.api_client.get_reset_time()
-                    task['status'] = 'rate_limited'
-                    print(f"Задача {task['id']} возвращена в очередь из-за ограничения запросов. Время сброса: {reset_time}")
-                    self.task_queue.put((priority, task))
+                # Пытаемся получить задачу из очереди с таймаутом: сначала
+                # интерактивная полоса, затем фоновые со свободными слотами
+                lane, priority, task = self.task_queue.get(timeout=0.5)
+
+                # Проверяем ограничения по запросам (только для запросов к бирже)
+                if task['task_type'] not in self.LOCAL_TASK_TYPES and \
+                        self.api_client.is_rate_limited(task['exchange']):
+                    # Биржа в режиме ограничения: откладываем задачу до сброса лимита
+                    self.task_queue.done(lane)
+                    with self._parked_lock:
+                        # Статус и список отложенных меняются вместе: clear() не застанет
+                        # задачу отмененной, но оставшейся в _parked
+                        if self.state.set_status(task['id'], 'rate_limited', self.DISPATCHABLE) is None:
+                            # Задача отменена, пока ждала в очереди
+                            pipeline_metrics.task_dropped(task['id'])
+                            continue
+                        self._parked.setdefault(task['exchange'], []).append((priority, task['id'], task))
+                    pipeline_metrics.mark(task['id'], 'parked')
+                    reset_time = self.api_client.get_reset_time(task['exchange'])
+                    logger.info("Task %s parked until %s rate limit resets in %ss", task['id'], task['exchange'],
+                                reset_time, extra={'task_id': task['id']})
                     self._notify_queue_status()
-                    time.sleep(1)  # Небольшая задержка перед следующей попыткой
                     continue
 
                 # Обновляем статус и запускаем запрос
-                task['status'] = 'in_progress'
+                if self.state.set_status(task['id'], 'in_progress', self.DISPATCHABLE) is None:
+                    # Задача отменена, пока ждала в очереди
+                    self.task_queue.done(lane)
+                    pipeline_metrics.task_dropped(task['id'])
+                    continue
                 self._notify_queue_status()
-                print(f"Запускаем задачу {task['id']}... и task_type: {task['task_type']}")
+                logger.debug("Task %s started: %s", task['id'], task['task_type'],
+                             extra={'task_id': task['id'], 'lane': lane, 'priority': priority})
                 # Запускаем API запрос в отдельном потоке на основе типа задачи
                 if task['task_type'] == 'fetch_ohlcv':
                     
                     task_thread = threading.Thread(
-                        target=self.api_client.fetch_ohlcv,
-                        args=(task['id'], task['symbol'], task['timeframe'], task['since'])
+                        target=self._run_task,
+                        args=(task['id'], task['task_type'], self.api_client.fetch_ohlcv,
+                              task['id'], task['symbol'], task['timeframe'], task['since']),
+                        kwargs={'limit': task['limit'], 'exchange': task['exchange'], 'lane': lane,
+                                'use_cache': (task['metadata'] or {}).get('use_cache', True)}
                     )
                 elif task['task_type'] == 'fetch_trending_coins':
                     task_thread = threading.Thread(
-                        target=self.api_client.fetch_trending_coins,
-                        args=(task['id'], task['timeframe'], task.get('limit', 20))
+                        target=self._run_task,
+                        args=(task['id'], task['task_type'], self.api_client.fetch_trending_coins,
+                              task['id'], task['timeframe'], task.get('limit') or 20),
+                        kwargs={'exchange': task['exchange'], 'lane': lane}
+                    )
+                elif task['task_type'] == 'fetch_markets':
+                    task_thread = threading.Thread(
+                        target=self._run_task,
+                        args=(task['id'], task['task_type'], self.api_client.fetch_markets, task['id']),
+                        kwargs={'exchange': task['exchange'], 'lane': lane}
                     )
                 elif task['task_type'] == 'fetch_ticker':
                     task_thread = threading.Thread(
-                        target=self.api_client.fetch_ticker,
-                        args=(task['id'], task['symbol'])
+                        target=self._run_task,
+                        args=(task['id'], task['task_type'], self.api_client.fetch_ticker, task['id'], task['symbol']),
+                        kwargs={'exchange': task['exchange'], 'lane': lane}
+                    )
+                elif task['task_type'] == 'upload_data':
+                    task_thread = threading.Thread(
+                        target=self._run_task,
+                        args=(task['id'], task['task_type'], self._run_upload, task)
                     )
                 else:
                     # Неизвестный тип задачи
@@ -118,34 +231,148 @@ class RequestQueue(QObject):
 
             except Exception as e:
                 # Обрабатываем любые другие ошибки
-                print(f"Error processing queue: {e}")
+                logger.exception("Error processing queue: %s", e)
                 time.sleep(1)
 
+    @staticmethod
+    def _run_task(task_id, task_type, target, *args, **kwargs):
+        """Выполняет задачу в ее потоке; этапы внутри учитываются в метриках задачи"""
+        pipeline_metrics.mark(task_id, 'dispatch')
+        with pipeline_metrics.bind(task_id), profiler.context(f"task:{task_type}"):
+            target(*args, **kwargs)
+
+    def _release_parked(self):
+        """Возвращает в очередь отложенные задачи бирж, для которых истекло ограничение"""
+        with self._parked_lock:
+            for exchange in list(self._parked):
+                if not self.api_client.is_rate_limited(exchange):
+                    for priority, task_id, task in self._parked.pop(exchange):
+                        self.task_queue.put(task['lane'], priority, task_id, task)
+
     def _on_request_complete(self, task_id, data, error):
         """Обработчик завершения запроса"""
-        if task_id in self.active_tasks:
-            task = self.active_tasks[task_id]
-
-            if error:
-                task['status'] = 'error'
-                task['error'] = error
-            else:
-                task['status'] = 'completed'
-                task['completed_at'] = time.time()
-
-                # Вызываем callback, если он задан
-                if task['callback']:
-                    try:
-                        task['callback'](data, error)
-                    except Exception as e:
-                        print(f"Error in callback for task {task_id}: {e}")
-
-            # Перемещаем задачу в завершенные
-            self.completed_tasks.append(task)
-            del self.active_tasks[task_id]
-
-            # Уведомляем об изменении очереди
-            self._notify_queue_status()
+        if error:
+            task = self.state.finish(task_id, 'error', error=error)
+        else:
+            task = self.state.finish(task_id, 'completed', completed_at=time.time())
+
+        if task is None:
+            # Задача уже завершена или отменена
+            return
+
+        # Освобождаем слот полосы для следующей задачи
+        self.task_queue.done(task['lane'])
+
+        # Передаем результат (или ошибку) в callback на нужном потоке
+        pipeline_metrics.mark(task_id, 'complete')
+        callback = task['callback']
+        if callback is None:
+            pipeline_metrics.task_finished(task_id)
+        else:
+            self.result_dispatcher.submit(self._timed_callback(task_id, task['task_type'], callback),
+                                         data, error, task['delivery'])
+
+        # Уведомляем об изменении очереди
+        self._notify_queue_status()
+
+    @staticmethod
+    def _timed_callback(task_id, task_type, callback):
+        """Оборачивает callback отметками доставки для метрик задачи"""
+        def timed(data, error):
+            pipeline_metrics.mark(task_id, 'callback_start')
+            try:
+                with profiler.context(f"callback:{task_type}"):
+                    callback(data, error)
+            finally:
+                pipeline_metrics.mark(task_id, 'callback_end')
+                pipeline_metrics.task_finished(task_id)
+        return timed
+
+    def _run_upload(self, task):
+        """Выполняет задачу upload_data в потоке задачи"""
+        task_id = task['id']
+        metadata = task['metadata'] or {}
+
+        def on_progress(sent, total):
+            self.state.update(task_id, progress=int(sent * 100 / total) if total else 100)
+            self.progress_updated.emit(task_id, sent, total)
+
+        try:
+            if not task['endpoint']:
+                raise ValueError("Upload endpoint is not set")
+            if urlsplit(task['endpoint']).scheme in ('tcp', 'tcps'):
+                result = self._run_tcp_upload(task, metadata, on_progress)
+                self._on_request_complete(task_id, result, "")
+                return
+
+            result = self.uploader.upload(
+                task['endpoint'],
+                filepath=metadata.get('filepath') if task['data'] is None else None,
+                data=task['data'],
+                metadata=metadata,
+                progress=on_progress
+            )
+            self._on_request_complete(task_id, result, "")
+        except Exception as e:
+            logger.warning("Error uploading data for task %s: %s", task_id, e, extra={'task_id': task_id})
+            self._on_request_complete(task_id, None, str(e))
+
+    def _run_tcp_upload(self, task, metadata, on_progress):
+        """
+        Ставит свечи в очередь TCP-коллектора и ждет подтверждения их доставки
+
+        Ожидание ограничено TCP_UPLOAD_TIMEOUT: если коллектор недоступен,
+        задача завершается ошибкой и освобождает слот полосы bulk. Кадры при
+        этом остаются в очереди TcpSink (при переполнении буфера - в файле на
+        диске) и будут доставлены после восстановления соединения.
+        """
+        df = task['data']
+        if df is None or not hasattr(df, 'columns'):
+            raise ValueError("TCP transport streams candle data; no DataFrame given")
+
+        sink = self._get_tcp_sink(task['endpoint'])
+        frames = encode_candle_frames(df, {k: v for k, v in metadata.items() if k != 'filepath'})
+        last = sink.send_frames(frames)
+        first = last - len(frames)
+        frames = len(frames)
+
+        delivered = sink.wait_sent(last, timeout=TCP_UPLOAD_TIMEOUT,
+                                   progress=lambda sent: on_progress(min(max(sent - first, 0), frames), frames))
+        if not delivered:
+            raise TimeoutError(f"Collector {task['endpoint']} did not acknowledge {frames} frames within "
+                               f"{TCP_UPLOAD_TIMEOUT:g}s; they stay queued and are sent on reconnect")
+        on_progress(frames, frames)
+        return {'endpoint': task['endpoint'], 'rows': len(df), 'frames': frames,
+                'metadata': metadata, 'response': sink.stats()}
+
+    def _get_tcp_sink(self, endpoint):
+        """Возвращает постоянное соединение для endpoint, создавая его при первом обращении"""
+        url = urlsplit(endpoint)
+        if not url.hostname or not url.port:
+            raise ValueError(f"Invalid TCP endpoint: {endpoint}")
+        key = (url.hostname, url.port, url.scheme == 'tcps')
+        with self._tcp_sinks_lock:
+            sink = self.tcp_sinks.get(key)
+            if sink is None:
+                sink = TcpSink(url.hostname, url.port, secure=key[2])
+                self.tcp_sinks[key] = sink
+            return sink
+
+    def get_task(self, task_id):
+        """Возвращает неизменяемую запись задачи по ID (активной или завершенной)"""
+        return self.state.get(task_id)
+
+    def get_all_tasks(self):
+        """Возвращает записи всех известных задач в порядке добавления"""
+        return self.state.all_tasks()[1]
+
+    def get_task_changes(self, since_revision):
+        """
+        Возвращает задачи, изменившиеся после ревизии since_revision
+
+        См. TaskState.changes_since.
+        """
+        return self.state.changes_since(since_revision)
 
     def _on_rate_limit_hit(self, exchange, reset_time):
         """Обработчик достижения лимита запросов"""
@@ -153,82 +380,51 @@ class RequestQueue(QObject):
         self._notify_queue_status()
 
     def _notify_queue_status(self):
+        """Планирует отправку статуса очереди (повторы схлопываются до одной отправки)"""
+        self.result_dispatcher.coalesce('queue_status', self._emit_queue_status)
+
+    def _emit_queue_status(self):
         """Формирует и отправляет статус очереди"""
-        active_tasks = list(self.active_tasks.values())
+        self.queue_status_changed.emit(self.get_stats())
 
-        # Сортируем задачи по приоритету
-        tasks = sorted(active_tasks, key=lambda x: x['priority'])
+    def get_stats(self):
+        """
+        Возвращает неизменяемый снимок статистики очереди
 
-        # Добавляем последние 10 завершенных задач
-        tasks.extend(self.completed_tasks[-10:])
+        Данные о задачах берутся из закэшированного снимка TaskState, поэтому
+        вызов дешевый и безопасен из любого потока.
+        """
+        snapshot = self.state.snapshot()
 
-        # Собираем статистику
         queue_size = self.task_queue.qsize()
-        processing = len([t for t in active_tasks if t['status'] == 'in_progress'])
-        waiting = len([t for t in active_tasks if t['status'] == 'queued'])
-
-        # Используем "kucoin" как биржу по умолчанию
-        exchange = "kucoin"
-        rate_limited = self.api_client.is_rate_limited(exchange)
-        max_reset_time = self.api_client.get_reset_time(exchange) if rate_limited else 0
+        # Ограничения действуют по биржам независимо: exchange -> секунд до сброса
+        rate_limits = self.api_client.exchanges.rate_limits()
+        rate_limited = bool(rate_limits)
+        max_reset_time = max(rate_limits.values(), default=0)
 
         # Вычисляем общий прогресс
-        total = queue_size + len(active_tasks)
-        done = len(self.completed_tasks)
+        total = queue_size + snapshot['active']
+        done = snapshot['processed']
         if total + done > 0:
             progress = int(done / (total + done) * 100)
         else:
             progress = 100
 
-        stats = {
+        stats = dict(snapshot)
+        stats.update({
             'queue_size': queue_size,
-            'processing': processing,
-            'waiting': waiting,
             'rate_limited': rate_limited,
             'reset_time': max_reset_time,
+            'rate_limits': MappingProxyType(rate_limits),
+            'lanes': MappingProxyType(self.task_queue.stats()),
             'progress': progress,
-            'tasks': tasks,
             'paused': self.paused
-        }
-
-        # Отправляем сигнал
-        self.queue_status_changed.emit(stats)
-
-    def get_stats(self):
-        """Возвращает текущую статистику очереди"""
-        active_tasks = list(self.active_tasks.values())
-
-        # Собираем статистику
-        queue_size = self.task_queue.qsize()
-        processing = len([t for t in active_tasks if t['status'] == 'in_progress'])
-        waiting = len([t for t in active_tasks if t['status'] == 'queued'])
-        rate_limited = self.api_client.is_rate_limited()
-        max_reset_time = self.api_client.get_reset_time() if rate_limited else 0
+        })
+        return MappingProxyType(stats)
 
-        # Вычисляем общий прогресс
-        total = queue_size + len(active_tasks)
-        done = len(self.completed_tasks)
-        if total + done > 0:
-            progress = int(done / (total + done) * 100)
-        else:
-            progress = 100
-
-        # Сортируем задачи по приоритету
-        tasks = sorted(active_tasks, key=lambda x: x['priority'])
-
-        # Добавляем последние 10 завершенных задач
-        tasks.extend(self.completed_tasks[-10:])
-
-        return {
-            'queue_size': queue_size,
-            'processing': processing,
-            'waiting': waiting,
-            'rate_limited': rate_limited,
-            'reset_time': max_reset_time,
-            'progress': progress,
-            'tasks': tasks,
-            'paused': self.paused
-        }
+    def get_metrics(self):
+        """Гистограммы этапов по типам задач и методам бирж и доля попаданий в кэши (core.metrics)"""
+        return pipeline_metrics.snapshot()
 
     def pause(self):
         """Приостанавливает обработку очереди"""
@@ -245,22 +441,31 @@ class RequestQueue(QObject):
         return self.paused
 
     def clear(self):
-        """Очищает очередь"""
-        # Создаем новую очередь
-        self.task_queue = queue.PriorityQueue()
-
-        # Отмечаем все активные задачи как отмененные
-        for task_id in list(self.active_tasks.keys()):
-            task = self.active_tasks[task_id]
-            if task['status'] == 'queued':
-                task['status'] = 'cancelled'
-                self.completed_tasks.append(task)
-                del self.active_tasks[task_id]
+        """Очищает очередь; callback'и отмененных задач получают ошибку CANCELLED"""
+        with self._parked_lock:
+            # Удаляем ожидающие задачи из всех полос и отложенные до сброса лимита биржи
+            self.task_queue.clear()
+            self._parked.clear()
+
+            # Отмечаем все ожидающие задачи как отмененные
+            cancelled = self.state.cancel(self.DISPATCHABLE)
+        for task in cancelled:
+            pipeline_metrics.task_dropped(task['id'])
+            # Владелец задачи узнает об отмене как об ошибке: иначе его учет
+            # незавершенных страниц (догрузка пропусков, backfill) не сойдется
+            if task['callback'] is not None:
+                self.result_dispatcher.submit(task['callback'], None, self.CANCELLED, task['delivery'])
 
         self._notify_queue_status()
 
     def stop(self):
         """Останавливает обработку очереди"""
         self.is_running = False
+        self.result_dispatcher.shutdown()
+        self.uploader.close()
+        with self._tcp_sinks_lock:
+            for sink in self.tcp_sinks.values():
+                sink.close()
+            self.tcp_sinks.clear()
         if self.worker_thread.is_alive():
             self.worker_thread.join(1.0)
\ No newline at end of file
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from core.signals import HEADLESS, QObject, pyqtSignal, pyqtSlot, Qt
+
+
+logger = logging.getLogger(__name__)
+
+
+class ResultDispatcher(QObject):
+    """
+    Доставляет результаты задач в callback'и на нужном потоке
+
+    Результаты с delivery='main' копятся в очереди и доставляются в главном
+    потоке Qt пачкой за один проход цикла событий: сколько бы задач ни
+    завершилось, в цикл событий уходит одно queued-событие. delivery='worker'
+    отправляет callback в пул рабочих потоков для тяжелой постобработки.
+
+    В headless-режиме (core.signals.HEADLESS) цикла событий нет, и callback'и
+    с delivery='main' вызываются сразу в потоке, завершившем задачу.
+    """
+
+    MAIN = 'main'
+    WORKER = 'worker'
+
+    # Ограничение на один проход, чтобы большая пачка не блокировала интерфейс
+    MAX_BATCH_SECONDS = 0.05
+
+    _delivery_requested = pyqtSignal()
+
+    def __init__(self, max_workers=2, parent=None):
+        # Объект должен создаваться в главном потоке: в нем выполняется доставка
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._pending = deque()
+        self._coalesced = {}
+        self._scheduled = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="result-worker")
+        self._delivery_requested.connect(self._deliver_batch, Qt.QueuedConnection)
+
+    def submit(self, callback, data, error, delivery=MAIN):
+        """Ставит результат задачи в очередь доставки"""
+        if callback is None:
+            return
+
+        if delivery == self.WORKER:
+            try:
+                self._executor.submit(self._invoke, callback, data, error)
+            except RuntimeError:
+                # Пул уже остановлен (закрытие приложения): результат некому обработать
+                pass
+            return
+
+        if HEADLESS:
+            self._invoke(callback, data, error)
+            return
+
+        with self._lock:
+            self._pending.append((callback, data, error))
+            self._schedule_locked()
+
+    def coalesce(self, key, callback):
+        """
+        Планирует вызов callback() в главном потоке, схлопывая повторы по key
+
+        Если до ближайшей доставки вызов с тем же ключом запрошен несколько
+        раз, он выполнится один раз.
+        """
+        if HEADLESS:
+            callback()
+            return
+
+        with self._lock:
+            self._coalesced[key] = callback
+            self._schedule_locked()
+
+    def _schedule_locked(self):
+        if not self._scheduled:
+            self._scheduled = True
+            self._delivery_requested.emit()
+
+    @pyqtSlot()
+    def _deliver_batch(self):
+        """Доставляет накопленные результаты в главном потоке"""
+        deadline = time.monotonic() + self.MAX_BATCH_SECONDS
+
+        while True:
+            with self._lock:
+                if not self._pending or time.monotonic() > deadline:
+                    break
+                callback, data, error = self._pending.popleft()
+            self._invoke(callback, data, error)
+
+        with self._lock:
+            coalesced = self._coalesced
+            self._coalesced = {}
+            self._scheduled = False
+            if self._pending:
+                # Остаток доставим в следующем проходе цикла событий
+                self._schedule_locked()
+
+        for callback in coalesced.values():
+            try:
+                callback()
+            except Exception as e:
+                logger.exception("Error in coalesced callback: %s", e)
+
+    @staticmethod
+    def _invoke(callback, data, error):
+        try:
+            callback(data, error)
+        except Exception as e:
+            logger.exception("Error in result callback: %s", e)
+
+    def shutdown(self):
+        """Останавливает пул рабочих потоков"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,80 @@
+"""
+QObject и сигналы для модулей core
+
+В приложении это классы PyQt5. В headless-режиме (переменная окружения
+KUCOIN_VIEWER_HEADLESS=1 или PyQt5 не установлен) PyQt не импортируется, а
+используются совместимые по интерфейсу замены на чистом Python: сигнал
+вызывает подключенные слоты синхронно в потоке emit(), без цикла событий.
+"""
+import os
+import threading
+
+HEADLESS = os.environ.get("KUCOIN_VIEWER_HEADLESS", "").lower() in ("1", "true", "yes")
+
+if not HEADLESS:
+    try:
+        from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot, Qt
+    except ImportError:
+        HEADLESS = True
+
+if HEADLESS:
+    class Qt:
+        """Типы соединений (в headless-режиме все соединения прямые)"""
+        AutoConnection = 0
+        DirectConnection = 1
+        QueuedConnection = 2
+
+    class _BoundSignal:
+        """Сигнал конкретного объекта: список слотов, вызываемых при emit()"""
+
+        def __init__(self):
+            self._slots = []
+            self._lock = threading.Lock()
+
+        def connect(self, slot, connection_type=Qt.AutoConnection):
+            with self._lock:
+                self._slots.append(slot)
+
+        def disconnect(self, slot=None):
+            with self._lock:
+                if slot is None:
+                    self._slots.clear()
+                else:
+                    self._slots.remove(slot)
+
+        def emit(self, *args):
+            with self._lock:
+                slots = list(self._slots)
+            for slot in slots:
+                slot(*args)
+
+    class pyqtSignal:
+        """Дескриптор сигнала: у каждого объекта свой _BoundSignal"""
+
+        def __init__(self, *types):
+            self.types = types
+            self.name = None
+
+        def __set_name__(self, owner, name):
+            self.name = name
+
+        def __get__(self, instance, owner):
+            if instance is None:
+                return self
+            signal = instance.__dict__.get(self.name)
+            if signal is None:
+                signal = instance.__dict__.setdefault(self.name, _BoundSignal())
+            return signal
+
+    def pyqtSlot(*types, **kwargs):
+        return lambda method: method
+
+    class QObject:
+        def __init__(self, parent=None):
+            self._parent = parent
+
+        def parent(self):
+            return self._parent
+
+
+__all__ = ['HEADLESS', 'QObject', 'pyqtSignal', 'pyqtSlot', 'Qt']
@@ -0,0 +1,59 @@
+"""
+Время запуска приложения
+
+Этапы запуска (окно создано, первая отрисовка, сервисы готовы, список пар
+загружен) отмечаются через startup.mark() и считаются от старта процесса:
+на Linux - по /proc/self/stat, то есть вместе с запуском интерпретатора и
+импортом модулей, иначе - от первого импорта этого модуля. Этапы пишутся в
+журнал и выгружаются в метрики (core.metrics_export).
+"""
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+def _process_age():
+    """Сколько секунд назад запущен процесс; None, если узнать нельзя"""
+    try:
+        with open('/proc/self/stat') as f:
+            # Имя процесса в скобках может содержать пробелы - поля считаются после него
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StartupTimer:
+    """Этапы запуска: имя -> секунды от старта процесса; повторная отметка этапа не учитывается"""
+
+    def __init__(self):
+        age = _process_age()
+        self.started = time.monotonic() - (age if age is not None and age >= 0 else 0.0)
+        self._lock = threading.Lock()
+        self._phases = {}
+
+    def mark(self, phase):
+        """Отмечает этап; возвращает секунды от старта процесса"""
+        elapsed = time.monotonic() - self.started
+        with self._lock:
+            if phase in self._phases:
+                return self._phases[phase]
+            self._phases[phase] = elapsed
+        logger.info("Startup: %s at %.0f ms", phase, elapsed * 1000,
+                    extra={'startup_phase': phase, 'startup_ms': round(elapsed * 1000)})
+        return elapsed
+
+    def phases(self):
+        """Этапы в порядке отметки: {имя: секунды}"""
+        with self._lock:
+            return dict(self._phases)
+
+
+# Общий таймер: этапы отмечают main.py, MainWindow и InfoTab
+startup = StartupTimer()
@@ -0,0 +1,100 @@
+from collections import Counter
+
+
+class TaskRecord:
+    """Компактная запись о завершенной задаче (без callback и аргументов запроса)"""
+
+    __slots__ = ('id', 'task_type', 'status', 'exchange', 'symbol', 'timeframe',
+                 'priority', 'lane', 'created_at', 'completed_at', 'error', 'progress', 'revision')
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_task(cls, task):
+        """Создает запись из словаря задачи RequestQueue"""
+        return cls(**{name: task.get(name) for name in cls.__slots__})
+
+    def get(self, key, default=None):
+        """Доступ к полям в стиле словаря задачи"""
+        if key in self.__slots__:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __repr__(self):
+        return f"TaskRecord(id={self.id}, task_type={self.task_type!r}, status={self.status!r})"
+
+
+class TaskHistory:
+    """
+    Кольцевой буфер завершенных задач фиксированной емкости
+
+    Хранит последние capacity записей, а итоги за все время работы
+    ведет в счетчиках по статусу и типу задачи.
+    """
+
+    def __init__(self, capacity=1000):
+        if capacity < 1:
+            raise ValueError("History capacity must be positive")
+        self.capacity = capacity
+        self._buffer = [None] * capacity
+        self._start = 0  # Индекс самой старой записи
+        self._size = 0
+
+        # Итоги за все время работы
+        self.status_totals = Counter()
+        self.type_totals = Counter()
+        self.type_status_totals = Counter()
+
+    def append(self, record):
+        """Добавляет запись; возвращает вытесненную запись или None"""
+        self.status_totals[record.status] += 1
+        self.type_totals[record.task_type] += 1
+        self.type_status_totals[(record.task_type, record.status)] += 1
+
+        if self._size < self.capacity:
+            self._buffer[(self._start + self._size) % self.capacity] = record
+            self._size += 1
+            return None
+
+        evicted = self._buffer[self._start]
+        self._buffer[self._start] = record
+        self._start = (self._start + 1) % self.capacity
+        return evicted
+
+    def recent(self, count):
+        """Возвращает последние count записей (от старых к новым)"""
+        count = max(0, min(count, self._size))
+        return [self._buffer[(self._start + i) % self.capacity]
+                for i in range(self._size - count, self._size)]
+
+    @property
+    def total(self):
+        """Количество задач, завершенных за все время работы"""
+        return sum(self.status_totals.values())
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        for i in range(self._size):
+            yield self._buffer[(self._start + i) % self.capacity]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self)[index]
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        return self._buffer[(self._start + index) % self.capacity]
@@ -0,0 +1,197 @@
+import heapq
+import threading
+from collections import Counter, deque
+from types import MappingProxyType
+
+from core.task_history import TaskHistory, TaskRecord
+
+
+class TaskState:
+    """
+    Единственный владелец состояния задач RequestQueue
+
+    Все изменения проходят через методы класса под одной блокировкой.
+    Читатели получают неизменяемые снимки: TaskRecord вместо живых словарей
+    задач и MappingProxyType вместо словаря статистики. Снимок кэшируется по
+    ревизии, поэтому повторное чтение без изменений не берет блокировку.
+    """
+
+    # Сколько последних изменений задач хранится для инкрементальных читателей
+    CHANGE_LOG_SIZE = 50000
+    # Сколько активных задач попадает в снимок статистики
+    SNAPSHOT_ACTIVE_TASKS = 50
+    SNAPSHOT_COMPLETED_TASKS = 10
+
+    def __init__(self, history_size):
+        self._lock = threading.RLock()
+        self._active = {}  # ID -> словарь задачи (принадлежит только TaskState)
+        self._index = {}  # ID -> словарь активной задачи или TaskRecord завершенной
+        self._history = TaskHistory(history_size)
+        self._status_counts = Counter()  # Статусы активных задач
+
+        self.revision = 0
+        self._change_log = deque(maxlen=self.CHANGE_LOG_SIZE)
+        self._snapshot = None
+
+    def _mark_changed(self, task_id):
+        self.revision += 1
+        self._change_log.append((self.revision, task_id))
+        return self.revision
+
+    def add(self, task):
+        """Регистрирует новую задачу"""
+        with self._lock:
+            self._active[task['id']] = task
+            self._index[task['id']] = task
+            self._status_counts[task['status']] += 1
+            task['revision'] = self._mark_changed(task['id'])
+
+    def set_status(self, task_id, status, expected=None):
+        """
+        Меняет статус активной задачи
+
+        Если задан expected, статус меняется только когда текущий статус
+        входит в expected. Возвращает словарь задачи или None, если задача
+        уже завершена или отменена.
+        """
+        with self._lock:
+            task = self._active.get(task_id)
+            if task is None or (expected is not None and task['status'] not in expected):
+                return None
+            self._status_counts[task['status']] -= 1
+            self._status_counts[status] += 1
+            task['status'] = status
+            task['revision'] = self._mark_changed(task_id)
+            return task
+
+    def update(self, task_id, **fields):
+        """Обновляет поля активной задачи без смены статуса"""
+        with self._lock:
+            task = self._active.get(task_id)
+            if task is None:
+                return None
+            task.update(fields)
+            task['revision'] = self._mark_changed(task_id)
+            return task
+
+    def finish(self, task_id, status, **fields):
+        """
+        Переносит задачу в историю с итоговым статусом
+
+        Возвращает словарь задачи (для вызова callback) или None, если задача
+        уже была завершена другим потоком.
+        """
+        with self._lock:
+            task = self._active.pop(task_id, None)
+            if task is None:
+                return None
+            self._finish_locked(task, status, fields)
+            return task
+
+    def cancel(self, statuses):
+        """Отменяет все активные задачи с указанными статусами"""
+        with self._lock:
+            cancelled = [task for task in self._active.values() if task['status'] in statuses]
+            for task in cancelled:
+                del self._active[task['id']]
+                self._finish_locked(task, 'cancelled', {})
+            return cancelled
+
+    def _finish_locked(self, task, status, fields):
+        self._status_counts[task['status']] -= 1
+        task['status'] = status
+        task.update(fields)
+        task['revision'] = self._mark_changed(task['id'])
+
+        record = TaskRecord.from_task(task)
+        self._index[record.id] = record
+        evicted = self._history.append(record)
+
+        if evicted is not None:
+            # Вытесненная из истории задача удаляется из индекса
+            self._index.pop(evicted.id, None)
+            self._mark_changed(evicted.id)
+
+    def get(self, task_id):
+        """Возвращает неизменяемую запись задачи по ID"""
+        with self._lock:
+            task = self._index.get(task_id)
+            return self._frozen(task) if task is not None else None
+
+    def all_tasks(self):
+        """Возвращает записи всех известных задач в порядке добавления"""
+        with self._lock:
+            return self.revision, [self._frozen(task) for task in self._index.values()]
+
+    def changes_since(self, since_revision):
+        """
+        Возвращает задачи, изменившиеся после ревизии since_revision
+
+        Возвращает кортеж (revision, tasks, removed_ids). Если журнал уже не
+        содержит нужных записей, tasks равен None и читатель должен перечитать
+        полный индекс через all_tasks().
+        """
+        with self._lock:
+            revision = self.revision
+            if since_revision >= revision:
+                return revision, [], []
+
+            log = self._change_log
+            if not log or log[0][0] > since_revision + 1:
+                return revision, None, []
+
+            # Идем с конца журнала: обходим только новые записи
+            changed_ids = []
+            seen = set()
+            for rev, task_id in reversed(log):
+                if rev <= since_revision:
+                    break
+                if task_id not in seen:
+                    seen.add(task_id)
+                    changed_ids.append(task_id)
+            changed_ids.reverse()
+
+            tasks = []
+            removed_ids = []
+            for task_id in changed_ids:
+                task = self._index.get(task_id)
+                if task is None:
+                    removed_ids.append(task_id)
+                else:
+                    tasks.append(self._frozen(task))
+            return revision, tasks, removed_ids
+
+    def snapshot(self):
+        """
+        Возвращает неизменяемый снимок состояния задач
+
+        Пока ревизия не изменилась, возвращается закэшированный снимок без
+        взятия блокировки.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot['revision'] == self.revision:
+            return snapshot
+
+        with self._lock:
+            active = self._active.values()
+            top_active = heapq.nsmallest(self.SNAPSHOT_ACTIVE_TASKS, active,
+                                         key=lambda t: (t['priority'], t['id']))
+            tasks = tuple(TaskRecord.from_task(task) for task in top_active)
+            tasks += tuple(self._history.recent(self.SNAPSHOT_COMPLETED_TASKS))
+
+            snapshot = MappingProxyType({
+                'revision': self.revision,
+                'active': len(self._active),
+                'processing': self._status_counts['in_progress'],
+                'waiting': self._status_counts['queued'],
+                'tasks': tasks,
+                'processed': self._history.total,
+                'status_totals': MappingProxyType(dict(self._history.status_totals)),
+                'type_totals': MappingProxyType(dict(self._history.type_totals)),
+            })
+            self._snapshot = snapshot
+            return snapshot
+
+    @staticmethod
+    def _frozen(task):
+        return task if isinstance(task, TaskRecord) else TaskRecord.from_task(task)
@@ -0,0 +1,368 @@
+import json
+import logging
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+# Тип кадра: колоночный пакет свечей
+FRAME_COLUMNAR = 1
+# Заголовок кадра: длина (тип + полезная нагрузка), тип
+FRAME_HEADER = struct.Struct('>IB')
+
+
+def encode_candle_frames(df, metadata, batch_rows=5000):
+    """
+    Кодирует свечи в кадры с префиксом длины
+
+    Полезная нагрузка кадра FRAME_COLUMNAR:
+        uint32 длина JSON-заголовка, JSON-заголовок
+        ({"columns", "dtypes", "rows", "metadata"}), затем колонки подряд
+        в little-endian: timestamp - int64 (мс), остальные - float64.
+    """
+    frames = []
+    names = list(df.columns)
+    for start in range(0, max(len(df), 1), batch_rows):
+        chunk = df.iloc[start:start + batch_rows]
+        columns = []
+        dtypes = []
+        for name in names:
+            series = chunk[name]
+            if np.issubdtype(series.dtype, np.datetime64):
+                columns.append(series.to_numpy(dtype='datetime64[ms]').astype('<i8'))
+                dtypes.append('timestamp_ms')
+            else:
+                columns.append(series.to_numpy(dtype='<f8'))
+                dtypes.append('f8')
+
+        header = json.dumps({
+            'columns': names,
+            'dtypes': dtypes,
+            'rows': len(chunk),
+            'metadata': metadata,
+        }, separators=(',', ':'), default=str).encode('utf-8')
+        payload = b''.join([struct.pack('>I', len(header)), header] + [c.tobytes() for c in columns])
+        frames.append(FRAME_HEADER.pack(len(payload) + 1, FRAME_COLUMNAR) + payload)
+    return frames
+
+
+class TcpSink:
+    """
+    Постоянное TCP-соединение с коллектором для потоковой отправки свечей
+
+    Кадры ставятся в исходящий буфер и отправляются фоновым потоком подряд,
+    не дожидаясь ответа на каждый кадр. Коллектор подтверждает прием
+    накопительным счетчиком (uint64 big-endian - число кадров, принятых по
+    текущему соединению); неподтвержденных кадров в полете не больше window.
+    При обрыве соединение восстанавливается с экспоненциальной задержкой, и
+    неподтвержденные кадры отправляются заново. При acks=False кадр считается
+    доставленным, как только записан в сокет.
+
+    Если коллектор не успевает и буфер в памяти превышает max_buffer_bytes,
+    новые кадры сбрасываются в файл на диске и подгружаются оттуда по мере
+    освобождения буфера. Файл переживает перезапуск приложения.
+    """
+
+    ACK = struct.Struct('>Q')
+
+    def __init__(self, host, port, secure=False, max_buffer_bytes=64 * 1024 * 1024,
+                 spool_dir=None, acks=True, window=64, connect_timeout=10, max_backoff=30.0):
+        self.host = host
+        self.port = port
+        self.secure = secure
+        self.max_buffer_bytes = max_buffer_bytes
+        self.acks = acks
+        self.window = window
+        self.connect_timeout = connect_timeout
+        self.max_backoff = max_backoff
+
+        if spool_dir is None:
+            spool_dir = os.path.join(os.path.expanduser("~"), ".kucoin_viewer", "tcp_spool")
+        os.makedirs(spool_dir, exist_ok=True)
+        self.spool_path = os.path.join(spool_dir, f"{host}_{port}.spool")
+
+        self._cond = threading.Condition()
+        self._buffer = deque()  # (seq, frame), по порядку номеров
+        self._buffered_bytes = 0
+        self._in_flight = 0  # Отправлено, но не подтверждено (первые кадры буфера)
+        self._spool_frames = 0  # Кадров в файле, ожидающих загрузки в буфер
+        self._spool_read_pos = 0
+        self._next_seq = 0  # Номер следующего кадра
+        self.sent_seq = 0  # Все кадры с номером < sent_seq доставлены
+
+        self._sock = None
+        self._connection = 0  # Поколение соединения: подтверждения старых игнорируются
+        self._running = True
+        self.connected = False
+        self.reconnects = 0
+        self.sent_bytes = 0
+        self.last_error = ""
+
+        # Кадры, оставшиеся в файле с прошлого запуска, отправляются первыми
+        self._recover_spool()
+
+        self._thread = threading.Thread(target=self._send_loop, name=f"tcp-sink-{host}:{port}")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def send_frames(self, frames):
+        """Ставит кадры в очередь отправки; возвращает номер, до которого их нужно ждать"""
+        with self._cond:
+            for frame in frames:
+                seq = self._next_seq
+                self._next_seq += 1
+                if self._spool_frames or self._buffered_bytes + len(frame) > self.max_buffer_bytes:
+                    # Буфер переполнен (или уже идет сброс на диск) - порядок сохраняется через файл
+                    self._spill(frame)
+                else:
+                    self._buffer.append((seq, frame))
+                    self._buffered_bytes += len(frame)
+            self._cond.notify_all()
+            return self._next_seq
+
+    def send_dataframe(self, df, metadata, batch_rows=5000):
+        """Кодирует свечи в кадры и ставит их в очередь отправки"""
+        return self.send_frames(encode_candle_frames(df, metadata, batch_rows))
+
+    def wait_sent(self, seq, timeout=None, progress=None):
+        """Ждет доставки всех кадров с номерами меньше seq; progress(sent_seq) - по мере доставки"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.sent_seq < seq:
+                if not self._running:
+                    raise ConnectionError("TCP sink is closed")
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(timeout=1.0 if remaining is None else min(remaining, 1.0))
+                if progress is not None:
+                    progress(self.sent_seq)
+        return True
+
+    def stats(self):
+        """Текущее состояние канала"""
+        with self._cond:
+            return {
+                'connected': self.connected,
+                'buffered_bytes': self._buffered_bytes,
+                'in_flight': self._in_flight,
+                'spooled_frames': self._spool_frames,
+                'sent_bytes': self.sent_bytes,
+                'reconnects': self.reconnects,
+                'last_error': self.last_error,
+            }
+
+    def close(self):
+        """Останавливает отправку; недоставленные кадры из памяти сохраняются на диск"""
+        with self._cond:
+            self._running = False
+            pending = [frame for _, frame in self._buffer]
+            self._buffer.clear()
+            self._buffered_bytes = 0
+            self._in_flight = 0
+            if pending:
+                # Кадры из памяти старше кадров в файле - переписываем файл целиком
+                pending.extend(self._read_spool_tail())
+                self._reset_spool()
+                for frame in pending:
+                    self._spill(frame)
+            self._cond.notify_all()
+        self._disconnect()
+
+    def _spill(self, frame):
+        with open(self.spool_path, 'ab') as f:
+            f.write(frame)
+        self._spool_frames += 1
+
+    def _read_spool_tail(self):
+        frames = []
+        if not self._spool_frames:
+            return frames
+        with open(self.spool_path, 'rb') as f:
+            f.seek(self._spool_read_pos)
+            for _ in range(self._spool_frames):
+                frames.append(self._read_frame(f))
+        return frames
+
+    def _reset_spool(self):
+        self._spool_frames = 0
+        self._spool_read_pos = 0
+        if os.path.exists(self.spool_path):
+            os.remove(self.spool_path)
+
+    def _recover_spool(self):
+        if not os.path.exists(self.spool_path):
+            return
+        with open(self.spool_path, 'rb') as f:
+            while True:
+                header = f.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                length, _ = FRAME_HEADER.unpack(header)
+                if len(f.read(length - 1)) < length - 1:
+                    break
+                self._spool_frames += 1
+        if self._spool_frames:
+            # Восстановленные кадры получают первые номера и уходят раньше новых
+            self._next_seq = self._spool_frames
+            logger.info("TCP sink %s:%s: %s spooled frames pending", self.host, self.port, self._spool_frames)
+
+    @staticmethod
+    def _read_frame(f):
+        header = f.read(FRAME_HEADER.size)
+        length, _ = FRAME_HEADER.unpack(header)
+        return header + f.read(length - 1)
+
+    def _refill_from_spool(self):
+        """Подгружает кадры из файла в освободившийся буфер (под блокировкой)"""
+        if not self._spool_frames or self._buffered_bytes >= self.max_buffer_bytes:
+            return
+        with open(self.spool_path, 'rb') as f:
+            f.seek(self._spool_read_pos)
+            while self._spool_frames and (not self._buffer or
+                                          self._buffered_bytes < self.max_buffer_bytes):
+                frame = self._read_frame(f)
+                self._buffer.append((self._next_seq - self._spool_frames, frame))
+                self._buffered_bytes += len(frame)
+                self._spool_read_pos += len(frame)
+                self._spool_frames -= 1
+        if not self._spool_frames:
+            self._reset_spool()
+
+    def _next_frame(self):
+        """
+        Ждет следующий кадр для отправки с учетом окна подтверждений
+
+        Возвращает (сокет, поколение соединения, кадр); сокет None означает,
+        что соединение потеряно и нужно переподключиться, кадр None - остановку.
+        """
+        with self._cond:
+            while True:
+                if not self._running:
+                    return None, None, None
+                if self._sock is None:
+                    return None, None, b''
+                self._refill_from_spool()
+                window_open = not self.acks or self._in_flight < self.window
+                if window_open and self._in_flight < len(self._buffer):
+                    self._in_flight += 1
+                    return self._sock, self._connection, self._buffer[self._in_flight - 1][1]
+                self._cond.wait()
+
+    def _acknowledge(self, connection, count):
+        """Снимает с буфера count доставленных кадров"""
+        with self._cond:
+            if connection != self._connection:
+                return
+            for _ in range(min(count, self._in_flight)):
+                seq, frame = self._buffer.popleft()
+                self._buffered_bytes -= len(frame)
+                self._in_flight -= 1
+                self.sent_seq = seq + 1
+            self._cond.notify_all()
+
+    def _send_loop(self):
+        backoff = 0.5
+        while self._running:
+            if self._sock is None:
+                try:
+                    self._connect()
+                    backoff = 0.5
+                except OSError as e:
+                    self._on_connection_error(e, backoff)
+                    backoff = min(self.max_backoff, backoff * 2)
+                    continue
+
+            sock, connection, frame = self._next_frame()
+            if frame is None:
+                break
+            if sock is None:
+                continue
+            try:
+                sock.sendall(frame)
+                with self._cond:
+                    self.sent_bytes += len(frame)
+                if not self.acks:
+                    self._acknowledge(connection, 1)
+            except OSError as e:
+                self._on_connection_error(e, backoff)
+                backoff = min(self.max_backoff, backoff * 2)
+
+    def _ack_loop(self, sock, connection):
+        """Читает накопительные подтверждения коллектора для одного соединения"""
+        acked = 0
+        data = b''
+        try:
+            while True:
+                chunk = sock.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+                while len(data) >= self.ACK.size:
+                    (total,) = self.ACK.unpack_from(data)
+                    data = data[self.ACK.size:]
+                    if total > acked:
+                        self._acknowledge(connection, total - acked)
+                        acked = total
+        except OSError:
+            pass
+        # Соединение закрыто коллектором: отправитель переподключится
+        with self._cond:
+            if connection == self._connection and self._sock is sock:
+                self._drop_connection()
+
+    def _on_connection_error(self, error, backoff):
+        self.last_error = str(error)
+        logger.warning("TCP sink %s:%s error: %s; reconnecting in %.1fs", self.host, self.port, error, backoff)
+        self._disconnect()
+        time.sleep(backoff)
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.connect_timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        if self.secure:
+            context = ssl.create_default_context()
+            sock = context.wrap_socket(sock, server_hostname=self.host)
+        sock.settimeout(None)
+
+        with self._cond:
+            if self._connection:
+                self.reconnects += 1
+            self._connection += 1
+            self._sock = sock
+            self.connected = True
+            connection = self._connection
+
+        if self.acks:
+            reader = threading.Thread(target=self._ack_loop, args=(sock, connection),
+                                      name=f"tcp-sink-ack-{self.host}:{self.port}")
+            reader.daemon = True
+            reader.start()
+
+    def _drop_connection(self):
+        """Закрывает сокет; неподтвержденные кадры будут отправлены заново (под блокировкой)"""
+        self.connected = False
+        self._in_flight = 0
+        self._connection += 1
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        self._cond.notify_all()
+
+    def _disconnect(self):
+        with self._cond:
+            self._drop_connection()
@@ -0,0 +1,311 @@
+import json
+import os
+import threading
+import time
+import zlib
+from urllib.parse import quote
+
+import ccxt
+import numpy as np
+import pandas as pd
+
+from core.data_manager import OHLCV_COLUMNS, StorageBackend, candles_to_rows
+
+
+# Свечей в одном чанке ряда (для 1m - около 5.7 дня)
+CHUNK_CANDLES = 8192
+
+# Сколько последних чанков ряда остаются горячими (несжатыми)
+HOT_CHUNKS = 2
+
+ROW_DTYPE = np.dtype([('ts', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'),
+                      ('close', '<f8'), ('volume', '<f8')])
+
+
+def _load_codecs():
+    """Доступные кодеки блоков: имя -> (compress, decompress), от лучшего к запасному"""
+    codecs = {}
+    try:
+        import zstandard
+        codecs['zstd'] = (zstandard.ZstdCompressor(level=9).compress,
+                          lambda data: zstandard.ZstdDecompressor().decompress(data))
+    except ImportError:
+        pass
+    try:
+        import lz4.frame
+        codecs['lz4'] = (lambda data: lz4.frame.compress(data, compression_level=9), lz4.frame.decompress)
+    except ImportError:
+        pass
+    codecs['zlib'] = (lambda data: zlib.compress(data, 6), zlib.decompress)
+    return codecs
+
+
+CODECS = _load_codecs()
+DEFAULT_CODEC = next(iter(CODECS))
+
+
+def _shuffle(array):
+    """Перестановка байтов: i-е байты всех значений подряд - так числа сжимаются лучше"""
+    return np.ascontiguousarray(array).view(np.uint8).reshape(-1, 8).T.tobytes()
+
+
+def _unshuffle(buffer, dtype):
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(8, -1).T.copy().view(dtype).ravel()
+
+
+def encode_block(rows, codec=DEFAULT_CODEC):
+    """
+    Сжимает чанк: время - первое значение и дельты, OHLCV - по колонкам
+
+    Дельты времени у непрерывного ряда одинаковы и сжимаются почти в ноль.
+    """
+    ts = rows['ts']
+    parts = [ts[:1].tobytes(), _shuffle(np.diff(ts))]
+    parts.extend(_shuffle(rows[name]) for name in ROW_DTYPE.names[1:])
+    return CODECS[codec][0](b''.join(parts))
+
+
+def decode_block(payload, count, codec):
+    raw = CODECS[codec][1](payload)
+    rows = np.empty(count, dtype=ROW_DTYPE)
+    column_size = count * 8
+    first = np.frombuffer(raw, dtype='<i8', count=1)
+    offset = 8
+    deltas = _unshuffle(raw[offset:offset + column_size - 8], '<i8')
+    offset += column_size - 8
+    rows['ts'][0] = first[0]
+    rows['ts'][1:] = first[0] + np.cumsum(deltas)
+    for name in ROW_DTYPE.names[1:]:
+        rows[name] = _unshuffle(raw[offset:offset + column_size], '<f8')
+        offset += column_size
+    return rows
+
+
+def merge_rows(existing, incoming):
+    """Объединяет строки чанка по ts; новые значения побеждают"""
+    if existing is None or len(existing) == 0:
+        return incoming
+    combined = np.concatenate([incoming, existing])
+    _, first = np.unique(combined['ts'], return_index=True)
+    return combined[first]
+
+
+class _Series:
+    """
+    Файлы одного ряда (exchange, symbol, timeframe)
+
+        hot/<chunk>.npy - горячие чанки без сжатия
+        cold.blk        - сжатые блоки запечатанных чанков, только дописывается
+        index.json      - индекс блоков: чанк -> [смещение, длина, строк, codec]
+        empty.json      - известно пустые интервалы
+    """
+
+    def __init__(self, path, timeframe):
+        self.path = path
+        self.span = CHUNK_CANDLES * ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        self.hot_dir = os.path.join(path, 'hot')
+        self.cold_path = os.path.join(path, 'cold.blk')
+        self.index_path = os.path.join(path, 'index.json')
+        self.empty_path = os.path.join(path, 'empty.json')
+        os.makedirs(self.hot_dir, exist_ok=True)
+
+        index = self._read_json(self.index_path, {'blocks': {}, 'garbage': 0})
+        self.blocks = {int(chunk): entry for chunk, entry in index['blocks'].items()}
+        self.garbage = index['garbage']
+        self.hot = {int(name[:-4]) for name in os.listdir(self.hot_dir) if name.endswith('.npy')}
+
+    @staticmethod
+    def _read_json(path, default):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    @staticmethod
+    def _write_json(path, value):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(value, f)
+        os.replace(tmp_path, path)
+
+    def _save_index(self):
+        self._write_json(self.index_path, {
+            'blocks': {str(chunk): entry for chunk, entry in self.blocks.items()},
+            'garbage': self.garbage,
+        })
+
+    def _hot_path(self, chunk):
+        return os.path.join(self.hot_dir, f"{chunk}.npy")
+
+    def chunks(self):
+        return sorted(self.hot | set(self.blocks))
+
+    def read_chunk(self, chunk):
+        if chunk in self.hot:
+            return np.load(self._hot_path(chunk))
+        entry = self.blocks.get(chunk)
+        if entry is None:
+            return None
+        offset, length, count, codec = entry
+        with open(self.cold_path, 'rb') as f:
+            f.seek(offset)
+            payload = f.read(length)
+        return decode_block(payload, count, codec)
+
+    def write_chunk(self, chunk, rows):
+        """Записывает чанк горячим; запечатанный чанк переписывается новым блоком"""
+        if chunk in self.blocks:
+            self._seal(chunk, rows)
+            return
+        # Через временный файл: оборванная запись не портит прежнюю версию чанка
+        path = self._hot_path(chunk)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, rows)
+        os.replace(tmp_path, path)
+        self.hot.add(chunk)
+
+    def _seal(self, chunk, rows):
+        payload = encode_block(rows)
+        with open(self.cold_path, 'ab') as f:
+            offset = f.tell()
+            f.write(payload)
+        previous = self.blocks.get(chunk)
+        if previous is not None:
+            self.garbage += previous[1]
+        self.blocks[chunk] = [offset, len(payload), len(rows), DEFAULT_CODEC]
+        self._save_index()
+
+    def seal_closed(self, now_ms):
+        """Сжимает закрытые горячие чанки, кроме HOT_CHUNKS последних"""
+        keep = set(sorted(self.hot)[-HOT_CHUNKS:])
+        for chunk in sorted(self.hot - keep):
+            if (chunk + 1) * self.span > now_ms:
+                continue
+            self._seal(chunk, np.load(self._hot_path(chunk)))
+            os.remove(self._hot_path(chunk))
+            self.hot.discard(chunk)
+
+        # Переписанные блоки оставляют мусор: сжимаем файл, когда его больше живых данных
+        live = sum(entry[1] for entry in self.blocks.values())
+        if self.garbage > max(live, 1 << 20):
+            self.compact()
+
+    def compact(self):
+        """Переписывает cold.blk только с актуальными блоками"""
+        tmp_path = f"{self.cold_path}.tmp"
+        blocks = {}
+        with open(self.cold_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk, (offset, length, count, codec) in sorted(self.blocks.items()):
+                src.seek(offset)
+                blocks[chunk] = [dst.tell(), length, count, codec]
+                dst.write(src.read(length))
+        os.replace(tmp_path, self.cold_path)
+        self.blocks = blocks
+        self.garbage = 0
+        self._save_index()
+
+    def read_empty(self):
+        return [tuple(interval) for interval in self._read_json(self.empty_path, [])]
+
+    def write_empty(self, intervals):
+        self._write_json(self.empty_path, [list(interval) for interval in intervals])
+
+
+class TieredStorage(StorageBackend):
+    """
+    История свечей в файлах с горячим и холодным уровнями
+
+    Ряд делится на чанки по CHUNK_CANDLES свечей. Последние HOT_CHUNKS чанков
+    хранятся несжатыми массивами numpy и читаются без распаковки; более
+    старые закрытые чанки запечатываются в сжатые блоки (дельты времени,
+    колонки OHLCV с перестановкой байтов, zstd/lz4/zlib). Чтение диапазона
+    по индексу блоков распаковывает только затронутые чанки.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.RLock()
+        self._series = {}
+
+    def _get_series(self, exchange, symbol, timeframe):
+        key = (exchange, symbol, timeframe)
+        series = self._series.get(key)
+        if series is None:
+            path = os.path.join(self.root, quote(exchange, safe=''), quote(symbol, safe=''),
+                                quote(timeframe, safe=''))
+            series = self._series[key] = _Series(path, timeframe)
+        return series
+
+    def write_candles(self, exchange, symbol, timeframe, df):
+        if df is None or df.empty:
+            return 0
+        ts, values = candles_to_rows(df)
+        rows = np.empty(len(ts), dtype=ROW_DTYPE)
+        rows['ts'] = ts
+        for column, name in enumerate(ROW_DTYPE.names[1:]):
+            rows[name] = values[:, column]
+
+        with self._lock:
+            series = self._get_series(exchange, symbol, timeframe)
+            chunk_ids = rows['ts'] // series.span
+            for chunk in np.unique(chunk_ids).tolist():
+                incoming = rows[chunk_ids == chunk]
+                series.write_chunk(chunk, merge_rows(series.read_chunk(chunk), incoming))
+            series.seal_closed(int(time.time() * 1000))
+        return len(rows)
+
+    def read_candles(self, exchange, symbol, timeframe, start=None, end=None):
+        with self._lock:
+            series = self._get_series(exchange, symbol, timeframe)
+            chunks = series.chunks()
+            if start is not None:
+                chunks = [chunk for chunk in chunks if (chunk + 1) * series.span > start]
+            if end is not None:
+                chunks = [chunk for chunk in chunks if chunk * series.span < end]
+            parts = [series.read_chunk(chunk) for chunk in chunks]
+
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=ROW_DTYPE)
+        mask = np.ones(len(rows), dtype=bool)
+        if start is not None:
+            mask &= rows['ts'] >= start
+        if end is not None:
+            mask &= rows['ts'] < end
+        rows = rows[mask]
+        df = pd.DataFrame({name: rows[name] for name in OHLCV_COLUMNS})
+        df.insert(0, 'timestamp', pd.to_datetime(rows['ts'], unit='ms'))
+        return df
+
+    def mark_empty(self, exchange, symbol, timeframe, intervals):
+        with self._lock:
+            series = self._get_series(exchange, symbol, timeframe)
+            merged = []
+            for start, end in sorted(series.read_empty() + [(int(s), int(e)) for s, e in intervals]):
+                if merged and start <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+                else:
+                    merged.append((start, end))
+            series.write_empty(merged)
+
+    def read_empty(self, exchange, symbol, timeframe, start=None, end=None):
+        with self._lock:
+            intervals = self._get_series(exchange, symbol, timeframe).read_empty()
+        start = start if start is not None else 0
+        end = end if end is not None else 2 ** 62
+        return [(s, e) for s, e in intervals if s < end and e > start]
+
+    def stats(self):
+        """Размер уровней на диске: {'hot_bytes', 'cold_bytes', 'blocks'}"""
+        hot_bytes = cold_bytes = blocks = 0
+        for path, _, files in os.walk(self.root):
+            for name in files:
+                size = os.path.getsize(os.path.join(path, name))
+                if name.endswith('.npy'):
+                    hot_bytes += size
+                elif name == 'cold.blk':
+                    cold_bytes += size
+        with self._lock:
+            blocks = sum(len(series.blocks) for series in self._series.values())
+        return {'hot_bytes': hot_bytes, 'cold_bytes': cold_bytes, 'blocks': blocks}
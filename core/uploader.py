@@ -0,0 +1,231 @@
+import gzip
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class UploadError(Exception):
+    """Ошибка загрузки данных на сервер"""
+
+
+class Uploader:
+    """
+    Загрузка экспортированных данных на HTTP-сервер
+
+    Использует одну requests.Session с пулом keep-alive соединений. Тело
+    запроса сжимается zstd (если установлен zstandard) или gzip. Небольшие
+    данные отправляются одним POST, большие - частями через протокол
+    возобновляемой загрузки:
+
+        POST {endpoint}/uploads                    -> {"upload_id": "..."}
+        GET  {endpoint}/uploads/{id}               -> {"received_parts": [0, 1, ...]}
+        PUT  {endpoint}/uploads/{id}/parts/{n}     (сжатая часть)
+        POST {endpoint}/uploads/{id}/complete
+
+    Незавершенные загрузки запоминаются в state-файле, поэтому после сбоя
+    или перезапуска отправляются только недостающие части. Каждый запрос
+    повторяется с экспоненциальной задержкой при сетевых ошибках, 429 и 5xx.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, pool_size=4, part_size=4 * 1024 * 1024, max_retries=5,
+                 backoff=0.5, max_backoff=30.0, timeout=30, compression=None,
+                 state_file=None):
+        self.part_size = part_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.compression = compression or ('zstd' if zstandard is not None else 'gzip')
+
+        self.session = requests.Session()
+        # Повторы делаем сами, чтобы учитывать Retry-After и возобновление частей
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        if state_file is None:
+            state_file = os.path.join(os.path.expanduser("~"), ".kucoin_viewer", "uploads.json")
+        self.state_file = state_file
+        self._state_lock = threading.Lock()
+
+    def upload(self, endpoint, filepath=None, data=None, metadata=None, progress=None):
+        """
+        Загружает файл filepath или объект data (сериализуется в JSON)
+
+        progress(sent_bytes, total_bytes) вызывается после каждой части.
+        Возвращает словарь с результатом загрузки.
+        """
+        metadata = dict(metadata or {})
+        if filepath is None:
+            if data is None:
+                raise UploadError("Nothing to upload: neither filepath nor data given")
+            payload = json.dumps(data, separators=(',', ':'), default=str).encode('utf-8')
+            total = len(payload)
+            read_part = lambda index: payload[index * self.part_size:(index + 1) * self.part_size]
+            digest = hashlib.sha256(payload).hexdigest()
+        else:
+            total = os.path.getsize(filepath)
+            read_part = lambda index: self._read_file_part(filepath, index)
+            digest = self._file_digest(filepath)
+            metadata.setdefault('filename', os.path.basename(filepath))
+
+        metadata.update({'size': total, 'sha256': digest})
+
+        if total <= self.part_size:
+            response = self._request('POST', endpoint, data=self._compress(read_part(0)),
+                                     headers=self._headers(metadata))
+            if progress is not None:
+                progress(total, total)
+            return {'endpoint': endpoint, 'bytes': total, 'parts': 1,
+                    'metadata': metadata, 'response': self._json(response)}
+
+        return self._upload_in_parts(endpoint, total, read_part, digest, metadata, progress)
+
+    def _upload_in_parts(self, endpoint, total, read_part, digest, metadata, progress):
+        """Возобновляемая загрузка частями"""
+        part_count = (total + self.part_size - 1) // self.part_size
+        state_key = f"{endpoint}|{digest}"
+        base = endpoint.rstrip('/') + '/uploads'
+
+        # Продолжаем незавершенную загрузку, если сервер ее помнит
+        upload_id = self._load_state().get(state_key)
+        received = set()
+        if upload_id:
+            try:
+                status = self._json(self._request('GET', f"{base}/{upload_id}"))
+                received = set(status.get('received_parts', []))
+            except UploadError:
+                upload_id = None
+
+        if not upload_id:
+            created = self._json(self._request(
+                'POST', base, json=dict(metadata, part_size=self.part_size, parts=part_count)))
+            upload_id = created['upload_id']
+            self._save_state(state_key, upload_id)
+
+        sent = sum(min(self.part_size, total - index * self.part_size) for index in received)
+        if progress is not None:
+            progress(sent, total)
+
+        for index in range(part_count):
+            if index in received:
+                continue
+            part = read_part(index)
+            headers = self._headers()
+            headers['X-Part-Sha256'] = hashlib.sha256(part).hexdigest()
+            self._request('PUT', f"{base}/{upload_id}/parts/{index}",
+                          data=self._compress(part), headers=headers)
+            sent += len(part)
+            if progress is not None:
+                progress(sent, total)
+
+        response = self._request('POST', f"{base}/{upload_id}/complete")
+        self._save_state(state_key, None)
+        return {'endpoint': endpoint, 'bytes': total, 'parts': part_count,
+                'upload_id': upload_id, 'metadata': metadata, 'response': self._json(response)}
+
+    def _request(self, method, url, **kwargs):
+        """HTTP-запрос с повторами и экспоненциальной задержкой"""
+        kwargs.setdefault('timeout', self.timeout)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code < 400:
+                    return response
+                last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+                if response.status_code not in self.RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get('Retry-After')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = str(e)
+
+            if attempt < self.max_retries:
+                delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+                delay = delay * (0.5 + random.random() / 2)  # jitter
+                if retry_after is not None:
+                    try:
+                        delay = max(delay, float(retry_after))
+                    except ValueError:
+                        pass
+                time.sleep(delay)
+
+        raise UploadError(f"{method} {url} failed: {last_error}")
+
+    def _headers(self, metadata=None):
+        headers = {
+            'Content-Type': 'application/octet-stream',
+            'Content-Encoding': self.compression,
+        }
+        if metadata is not None:
+            headers['X-Upload-Metadata'] = json.dumps(metadata, separators=(',', ':'), default=str)
+        return headers
+
+    def _compress(self, payload):
+        if self.compression == 'zstd':
+            return zstandard.ZstdCompressor(level=3).compress(payload)
+        return gzip.compress(payload, compresslevel=5)
+
+    def _read_file_part(self, filepath, index):
+        with open(filepath, 'rb') as f:
+            f.seek(index * self.part_size)
+            return f.read(self.part_size)
+
+    @staticmethod
+    def _file_digest(filepath):
+        sha = hashlib.sha256()
+        with open(filepath, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(block)
+        return sha.hexdigest()
+
+    @staticmethod
+    def _json(response):
+        try:
+            return response.json()
+        except ValueError:
+            return {}
+
+    def _load_state(self):
+        with self._state_lock:
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                return {}
+
+    def _save_state(self, key, upload_id):
+        with self._state_lock:
+            try:
+                with open(self.state_file, 'r') as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+
+            if upload_id is None:
+                state.pop(key, None)
+            else:
+                state[key] = upload_id
+
+            os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+            with open(self.state_file, 'w') as f:
+                json.dump(state, f)
+
+    def close(self):
+        """Закрывает пул соединений"""
+        self.session.close()
@@ -2,8 +2,11 @@ import os
 import sys
 import platform
 
+from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QApplication
 
+from core.log import setup_logging
+from core.startup import startup
 from ui.main_window import MainWindow
 
 
@@ -20,9 +23,16 @@ def configure_platform():
 
 
 def main():
+    # Журнал пишется фоновым потоком в файл с ротацией (core.log)
+    setup_logging()
+
     # Настройка платформы
     configure_platform()
 
+    # QtWebEngine импортируется при создании вкладки Info, уже после QApplication:
+    # для этого общий OpenGL-контекст включается заранее
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
+
     # Создаем приложение
     app = QApplication(sys.argv)
 
@@ -44,6 +54,7 @@ def main():
     # Создаем и показываем основное окно
     window = MainWindow()
     window.show()
+    startup.mark('window_shown')
 
     sys.exit(app.exec_())
 
@@ -0,0 +1,107 @@
+"""
+Локальный коллектор-заглушка для проверки TCP-транспорта (core.tcp_sink.TcpSink)
+
+Читает кадры с префиксом длины, подтверждает их накопительным счетчиком и
+дописывает свечи в CSV-файлы каталога --output (по одному на symbol/timeframe).
+С --drop-rate коллектор случайно рвет соединение до подтверждения кадра.
+
+    python scripts/tcp_collector_stand_in.py --port 9000 --drop-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import socketserver
+import struct
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.tcp_sink import FRAME_COLUMNAR, FRAME_HEADER, TcpSink  # noqa: E402
+
+
+def decode_columnar(payload):
+    """Разбирает полезную нагрузку FRAME_COLUMNAR в (header, {колонка: массив})"""
+    header_len = struct.unpack_from('>I', payload)[0]
+    header = json.loads(payload[4:4 + header_len])
+    offset = 4 + header_len
+    rows = header['rows']
+    columns = {}
+    for name, dtype in zip(header['columns'], header['dtypes']):
+        columns[name] = np.frombuffer(payload, dtype='<i8' if dtype == 'timestamp_ms' else '<f8',
+                                      count=rows, offset=offset)
+        offset += rows * 8
+    return header, columns
+
+
+class CollectorHandler(socketserver.BaseRequestHandler):
+    output_dir = None
+    drop_rate = 0.0
+
+    def _recv_exact(self, size):
+        data = b''
+        while len(data) < size:
+            chunk = self.request.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def handle(self):
+        received = 0
+        while True:
+            header = self._recv_exact(FRAME_HEADER.size)
+            if header is None:
+                return
+            length, frame_type = FRAME_HEADER.unpack(header)
+            payload = self._recv_exact(length - 1)
+            if payload is None:
+                return
+            if random.random() < self.drop_rate:
+                print("Dropping connection before ack")
+                return
+            if frame_type == FRAME_COLUMNAR:
+                self._store(*decode_columnar(payload))
+            received += 1
+            self.request.sendall(TcpSink.ACK.pack(received))
+
+    def _store(self, header, columns):
+        metadata = header.get('metadata') or {}
+        name = f"{metadata.get('symbol', 'unknown')}_{metadata.get('timeframe', '')}".replace('/', '-')
+        path = os.path.join(self.output_dir, name + '.csv')
+        is_new = not os.path.exists(path)
+        with open(path, 'a') as f:
+            if is_new:
+                f.write(','.join(header['columns']) + '\n')
+            for row in zip(*columns.values()):
+                f.write(','.join(str(v) for v in row) + '\n')
+        print(f"Received {header['rows']} rows for {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--output', default='received_frames')
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help="Доля кадров, после которых коллектор рвет соединение")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    CollectorHandler.output_dir = args.output
+    CollectorHandler.drop_rate = args.drop_rate
+
+    server = socketserver.ThreadingTCPServer((args.host, args.port), CollectorHandler)
+    server.daemon_threads = True
+    print(f"TCP collector stand-in listening on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
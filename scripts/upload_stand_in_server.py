@@ -0,0 +1,155 @@
+"""
+Локальный сервер-заглушка для проверки загрузки данных (задача upload_data)
+
+Принимает одиночные POST и возобновляемую загрузку частями в формате,
+который использует core.uploader.Uploader, распаковывает gzip/zstd и
+сохраняет полученные файлы в каталог --output.
+
+    python scripts/upload_stand_in_server.py --port 8000 --fail-rate 0.2
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+class UploadStore:
+    """Состояние незавершенных загрузок"""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.uploads = {}
+        self.lock = threading.Lock()
+        os.makedirs(output_dir, exist_ok=True)
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    store = None
+    fail_rate = 0.0
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        encoding = self.headers.get('Content-Encoding')
+        if encoding == 'gzip':
+            return gzip.decompress(body)
+        if encoding == 'zstd':
+            if zstandard is None:
+                raise ValueError("zstd body received but zstandard is not installed")
+            return zstandard.ZstdDecompressor().decompress(body)
+        return body
+
+    def _reply(self, status, payload=None):
+        body = json.dumps(payload or {}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _maybe_fail(self):
+        """Имитирует перегруженный сервер"""
+        if random.random() < self.fail_rate:
+            self._body()
+            self.send_response(503)
+            self.send_header('Retry-After', '0')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return True
+        return False
+
+    def do_POST(self):
+        if self._maybe_fail():
+            return
+        store = self.store
+
+        match = re.fullmatch(r'(.*)/uploads/([\w-]+)/complete', self.path)
+        if match:
+            self._body()
+            with store.lock:
+                upload = store.uploads.pop(match.group(2), None)
+            if upload is None:
+                return self._reply(404, {'error': 'unknown upload'})
+            if len(upload['parts']) != upload['meta']['parts']:
+                return self._reply(409, {'error': 'missing parts'})
+            data = b''.join(upload['parts'][i] for i in range(upload['meta']['parts']))
+            return self._save(data, upload['meta'])
+
+        if self.path.endswith('/uploads'):
+            meta = json.loads(self._body() or b'{}')
+            upload_id = uuid.uuid4().hex
+            with store.lock:
+                store.uploads[upload_id] = {'meta': meta, 'parts': {}}
+            return self._reply(201, {'upload_id': upload_id})
+
+        # Одиночная загрузка
+        data = self._body()
+        meta = json.loads(self.headers.get('X-Upload-Metadata', '{}'))
+        return self._save(data, meta)
+
+    def do_PUT(self):
+        if self._maybe_fail():
+            return
+        match = re.fullmatch(r'(.*)/uploads/([\w-]+)/parts/(\d+)', self.path)
+        if not match:
+            return self._reply(404, {'error': 'not found'})
+        data = self._body()
+        expected = self.headers.get('X-Part-Sha256')
+        if expected and hashlib.sha256(data).hexdigest() != expected:
+            return self._reply(400, {'error': 'checksum mismatch'})
+        with self.store.lock:
+            upload = self.store.uploads.get(match.group(2))
+            if upload is None:
+                return self._reply(404, {'error': 'unknown upload'})
+            upload['parts'][int(match.group(3))] = data
+        return self._reply(200, {'received': int(match.group(3))})
+
+    def do_GET(self):
+        match = re.fullmatch(r'(.*)/uploads/([\w-]+)', self.path)
+        upload = self.store.uploads.get(match.group(2)) if match else None
+        if upload is None:
+            return self._reply(404, {'error': 'unknown upload'})
+        return self._reply(200, {'received_parts': sorted(upload['parts'])})
+
+    def _save(self, data, meta):
+        sha = hashlib.sha256(data).hexdigest()
+        if meta.get('sha256') and meta['sha256'] != sha:
+            return self._reply(400, {'error': 'checksum mismatch'})
+        name = os.path.basename(meta.get('filename') or f"{sha[:16]}.bin")
+        path = os.path.join(self.store.output_dir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        print(f"Received {len(data)} bytes -> {path}")
+        return self._reply(200, {'stored': name, 'bytes': len(data), 'sha256': sha})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--output', default='received_uploads')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help="Доля запросов, на которые сервер отвечает 503")
+    args = parser.parse_args()
+
+    UploadHandler.store = UploadStore(args.output)
+    UploadHandler.fail_rate = args.fail_rate
+    server = ThreadingHTTPServer((args.host, args.port), UploadHandler)
+    print(f"Upload stand-in server listening on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
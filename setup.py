@@ -3,7 +3,7 @@ from setuptools import setup, find_packages
 setup(
     name="crypto_analyzer",
     version="0.1",
-    packages=find_packages(),
+    packages=find_packages(exclude=['benchmarks', 'tests']),
     install_requires=[
         'PyQt6',
         'plotly',
@@ -11,8 +11,17 @@ setup(
         'numpy',
         'psycopg2-binary',
         'python-dotenv',
+        'requests',
         'kucoin-python',
         'setuptools',
         'PyQtWebEngine'
-    ]
+    ],
+    extras_require={
+        # Экспорт в Parquet / Arrow IPC
+        'export': ['pyarrow'],
+        # Сжатие холодных чанков истории (без них - zlib)
+        'compression': ['zstandard', 'lz4'],
+        # Тесты (tests/) и бенчмарки (benchmarks/)
+        'dev': ['pytest', 'pytest-benchmark'],
+    }
 ) 
\ No newline at end of file
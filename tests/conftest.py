@@ -0,0 +1,47 @@
+"""
+Тесты очереди, хранилища, загрузки и биржи без сети
+
+    python -m pytest tests
+
+Биржа заменяется ReplayExchange (benchmarks.fake_exchange), сервер загрузки
+и TCP-коллектор - заглушками в том же процессе; кэш, история и спул пишутся
+во временный HOME.
+"""
+import os
+
+import pytest
+
+# Без цикла событий Qt: callback'и доставляются в потоке задачи
+os.environ.setdefault("KUCOIN_VIEWER_HEADLESS", "1")
+
+from benchmarks.fake_exchange import install_fake_exchange, make_archive, make_symbols  # noqa: E402
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    """Временный HOME: кэш, индекс листингов и спул не смешиваются с рабочими"""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def archive():
+    return make_archive(make_symbols(4), timeframe='1m', candles=3000)
+
+
+@pytest.fixture
+def api_client(home, archive):
+    from core.api_client import ApiClient
+
+    client = ApiClient()
+    install_fake_exchange(client, archive)
+    return client
+
+
+@pytest.fixture
+def request_queue(api_client):
+    from core.request_queue import RequestQueue
+
+    queue = RequestQueue(api_client)
+    yield queue
+    queue.stop()
@@ -0,0 +1,36 @@
+"""Биржа без сети: непрерывные свечи от листинга до текущего момента"""
+import time
+
+import ccxt
+
+
+LISTING_MS = 1699920000000  # 2023-11-14 00:00 UTC, кратно всем таймфреймам до 1d
+
+
+class ListedExchange:
+    """
+    Отвечает на fetch_ohlcv окном [since, since + limit * tf), как KuCoin:
+    окно до листинга пустое. calls - since каждого запроса.
+    """
+
+    def __init__(self, listing_ms=LISTING_MS):
+        self.listing_ms = listing_ms
+        self.calls = []
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        self.calls.append(since)
+        tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        limit = limit or 500
+        now = int(time.time() * 1000) // tf_ms * tf_ms
+        if since is None:
+            since = now - (limit - 1) * tf_ms
+        start = max(-(-since // tf_ms) * tf_ms, self.listing_ms)
+        end = min(since + limit * tf_ms, now + 1)
+        return [[ts, 1.0, 2.0, 0.5, 1.5, 10.0] for ts in range(start, end, tf_ms)]
+
+
+class DisconnectedExchange:
+    """Любой запрос свечей - ошибка"""
+
+    def fetch_ohlcv(self, *args, **kwargs):
+        raise ccxt.ExchangeNotAvailable("disconnected")
@@ -0,0 +1,118 @@
+"""ApiClient.fetch_ohlcv поверх ReplayExchange: кэш, хранилище и начало истории"""
+import sqlite3
+
+import pytest
+
+from benchmarks.fake_exchange import START_MS, install_fake_exchange, make_candle_frame
+from core.data_manager import SQLiteStorage
+from core.integrity import candle_timestamps
+from core.replay import ReplayArchive
+from tests.listed_exchange import LISTING_MS, ListedExchange
+
+
+MINUTE_MS = 60000
+SYMBOL = 'COIN0/USDT'
+
+
+class BrokenStorage(SQLiteStorage):
+    """Хранилище, в которое нельзя записать свечи"""
+
+    def write_candles(self, exchange, symbol, timeframe, df):
+        raise sqlite3.OperationalError("disk I/O error")
+
+
+def disconnect_exchange(api_client):
+    """Заменяет биржу пустым архивом: любой запрос свечей завершается ошибкой"""
+    install_fake_exchange(api_client, ReplayArchive())
+
+
+def fetch(api_client, since_ms, limit, **kwargs):
+    return api_client.fetch_ohlcv(1, SYMBOL, '1m', since_ms // 1000, limit=limit, **kwargs)
+
+
+def test_fetch_returns_window_from_exchange(api_client):
+    df = fetch(api_client, START_MS + 100 * MINUTE_MS, 50)
+
+    timestamps = candle_timestamps(df)
+    assert len(df) == 50
+    assert timestamps[0] == START_MS + 100 * MINUTE_MS
+    assert (timestamps[1:] - timestamps[:-1] == MINUTE_MS).all()
+
+
+def test_fetch_reads_json_cache(api_client):
+    first = fetch(api_client, START_MS, 100)
+    disconnect_exchange(api_client)
+
+    cached = fetch(api_client, START_MS, 100)
+    assert cached is not None
+    assert (candle_timestamps(cached) == candle_timestamps(first)).all()
+    assert cached['close'].tolist() == pytest.approx(first['close'].tolist())
+
+    # Мимо кэша запрос уходит на биржу
+    assert fetch(api_client, START_MS, 100, use_cache=False) is None
+
+
+def test_fetch_reads_full_range_from_storage(api_client, tmp_path):
+    api_client.storage = SQLiteStorage(str(tmp_path / "history.db"))
+    api_client.storage.write_candles('kucoin', SYMBOL, '1m', make_candle_frame(500))
+    disconnect_exchange(api_client)
+
+    df = fetch(api_client, START_MS + 100 * MINUTE_MS, 200, use_cache=False)
+    assert len(df) == 200
+    assert candle_timestamps(df)[0] == START_MS + 100 * MINUTE_MS
+
+    # Диапазон выходит за сохраненные свечи - нужен запрос к бирже
+    assert fetch(api_client, START_MS + 400 * MINUTE_MS, 200, use_cache=False) is None
+
+
+def test_fetch_writes_exchange_response_to_storage(api_client, tmp_path):
+    api_client.storage = SQLiteStorage(str(tmp_path / "history.db"))
+    fetch(api_client, START_MS, 100, use_cache=False)
+
+    stored = api_client.storage.read_candles('kucoin', SYMBOL, '1m', START_MS, START_MS + 100 * MINUTE_MS)
+    assert len(stored) == 100
+
+
+def test_storage_write_error_fails_uncached_fetch(api_client, tmp_path):
+    api_client.storage = BrokenStorage(str(tmp_path / "history.db"))
+    errors = []
+    api_client.request_complete.connect(lambda task_id, data, error: errors.append(error))
+
+    # Обычный запрос отдает свечи и без хранилища
+    assert len(fetch(api_client, START_MS, 100)) == 100
+    # Догрузке и backfill свечи нужны в хранилище: ошибка записи - ошибка задачи
+    assert fetch(api_client, START_MS + 100 * MINUTE_MS, 100, use_cache=False) is None
+    assert errors == ["", "disk I/O error"]
+
+
+def test_fetch_clamps_window_to_listing(api_client):
+    api_client.listing_index.set('kucoin', SYMBOL, '1m', START_MS)
+
+    df = fetch(api_client, START_MS - 30 * MINUTE_MS, 100)
+    assert candle_timestamps(df)[0] == START_MS
+
+
+def test_fetch_before_listing_skips_exchange(api_client):
+    api_client.listing_index.set('kucoin', SYMBOL, '1m', START_MS)
+    disconnect_exchange(api_client)
+
+    df = fetch(api_client, START_MS - 500 * MINUTE_MS, 100)
+    assert df.empty
+    assert df.attrs['history_start'] == START_MS
+
+
+def test_empty_window_discovers_listing_once(api_client):
+    # Как у KuCoin: окно до листинга пустое
+    exchange = ListedExchange()
+    api_client.exchanges.get('kucoin').exchange = exchange
+
+    df = fetch(api_client, LISTING_MS - 1000 * MINUTE_MS, 100)
+    assert df.empty
+    assert df.attrs['history_start'] == LISTING_MS
+    assert api_client.listing_index.get('kucoin', SYMBOL, '1m') == LISTING_MS
+
+    # Начало истории известно: следующее окно до листинга обходится без биржи
+    probes = len(exchange.calls)
+    df = fetch(api_client, LISTING_MS - 500 * MINUTE_MS, 50)
+    assert df.empty
+    assert len(exchange.calls) == probes
@@ -0,0 +1,75 @@
+"""BackfillManager: страницы заданий через RequestQueue и журнал в SQLite"""
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from benchmarks.fake_exchange import START_MS
+from core.backfill_jobs import BackfillJournal, BackfillManager
+from core.data_manager import SQLiteStorage
+
+
+SYMBOL = 'COIN0/USDT'
+START = datetime.fromtimestamp(START_MS / 1000, timezone.utc)
+
+
+def pause(request_queue):
+    """Пауза действует со следующего прохода диспетчера: ждем конца текущего ожидания задачи"""
+    request_queue.pause()
+    time.sleep(0.6)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = BackfillJournal(str(tmp_path / "jobs.db"))
+    yield journal
+    journal.close()
+
+
+def job_status(manager, job_id):
+    return next(job['status'] for job in manager.jobs() if job['id'] == job_id)
+
+
+def test_job_completes(request_queue, journal):
+    manager = BackfillManager(request_queue, journal)
+    job_id = manager.create_job([SYMBOL], ['1m'], START, START + timedelta(minutes=30), page_limit=10)
+    assert manager.wait([job_id], timeout=10)
+    assert job_status(manager, job_id) == 'completed'
+    assert journal.job_totals(job_id) == (3, 3, 0, 30)
+    assert journal.pending_pages(job_id) == []
+
+
+def test_cleared_pages_stay_pending(request_queue, journal):
+    manager = BackfillManager(request_queue, journal)
+    pause(request_queue)
+    job_id = manager.create_job([SYMBOL], ['1m'], START, START + timedelta(minutes=30), page_limit=10)
+    request_queue.clear()
+
+    # Отмена завершает задание, но страницы не считаются загруженными
+    assert manager.wait([job_id], timeout=5)
+    assert job_status(manager, job_id) == 'cancelled'
+    assert len(journal.pending_pages(job_id)) == 3
+    assert journal.job_totals(job_id)[1:3] == (0, 0)
+
+    request_queue.resume()
+    assert manager.retry(job_id)
+    assert manager.wait([job_id], timeout=10)
+    assert job_status(manager, job_id) == 'completed'
+    assert journal.pending_pages(job_id) == []
+
+
+def test_storage_error_fails_page(request_queue, journal, tmp_path):
+    class BrokenStorage(SQLiteStorage):
+        def write_candles(self, exchange, symbol, timeframe, df):
+            raise sqlite3.OperationalError("disk I/O error")
+
+    request_queue.api_client.storage = BrokenStorage(str(tmp_path / "history.db"))
+    manager = BackfillManager(request_queue, journal)
+    job_id = manager.create_job([SYMBOL], ['1m'], START, START + timedelta(minutes=20), page_limit=10)
+
+    # Страница считается загруженной, только когда свечи записаны в хранилище
+    assert manager.wait([job_id], timeout=10)
+    assert job_status(manager, job_id) == 'failed'
+    assert journal.job_totals(job_id)[1:3] == (0, 2)
+    assert len(journal.pending_pages(job_id)) == 2
@@ -0,0 +1,170 @@
+"""RateLimiter на фиктивных часах: темп токенов и резерв бюджета интерактивных запросов"""
+import heapq
+import itertools
+import types
+
+import pytest
+
+from core import exchange_pool
+from core.exchange_pool import RateLimiter
+
+
+class FakeClock:
+    """
+    Подменяет time и threading.Condition в core.exchange_pool
+
+    Ожидание на условии сдвигает часы на свой таймаут. Запланированные
+    через at() вызовы выполняются, когда часы доходят до их времени, внутри
+    чужого ожидания - как другой поток, пришедший, пока первый ждет токен.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self._events = []
+        self._order = itertools.count()
+        self._in_event = False
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def at(self, when, func):
+        heapq.heappush(self._events, (when, next(self._order), func))
+
+    def advance(self, seconds):
+        # Как и настоящее ожидание, не короче микросекунды: иначе остаток
+        # токена в доли ulp не сдвинул бы часы
+        target = self.now + max(seconds, 1e-6)
+        if self._events and self._events[0][0] <= target and not self._in_event:
+            when, _, func = heapq.heappop(self._events)
+            self.now = max(self.now, when)
+            self._in_event = True
+            try:
+                func()
+            finally:
+                self._in_event = False
+            # Завершившийся вызов будит ожидающих (notify_all)
+            return
+        self.now = target
+
+    def Condition(self):
+        clock = self
+
+        class FakeCondition:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def wait(self, timeout):
+                clock.advance(timeout)
+
+            def notify_all(self):
+                pass
+
+        return FakeCondition()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(exchange_pool, 'time', clock)
+    monkeypatch.setattr(exchange_pool, 'threading', types.SimpleNamespace(Condition=clock.Condition))
+    return clock
+
+
+# Ожидание условия не короче 1 мс, поэтому за десятки токенов часы
+# уходят вперед на сотые доли секунды
+def acquire_times(limiter, clock, count, background=False):
+    times = []
+    for _ in range(count):
+        limiter.acquire(background=background)
+        times.append(round(clock.now, 4))
+    return times
+
+
+def test_tokens_are_paced_by_rate(clock):
+    limiter = RateLimiter(rate=10, burst=1)
+
+    assert acquire_times(limiter, clock, 4) == [0.0, 0.1, 0.2, 0.3]
+
+
+def test_burst_is_spent_first_and_refills_up_to_cap(clock):
+    limiter = RateLimiter(rate=10, burst=3)
+    assert acquire_times(limiter, clock, 4) == [0.0, 0.0, 0.0, 0.1]
+
+    # После долгого простоя накапливается не больше burst токенов
+    clock.sleep(60)
+    assert acquire_times(limiter, clock, 4) == [60.1, 60.1, 60.1, 60.2]
+
+
+def test_limiters_are_independent(clock):
+    slow = RateLimiter(rate=1, burst=1)
+    fast = RateLimiter(rate=100, burst=1)
+    slow.acquire()
+    fast.acquire()
+
+    # Пустой ограничитель одной биржи не задерживает другую
+    fast.acquire()
+    assert round(clock.now, 4) == 0.01
+
+
+def test_background_calls_cannot_use_reserve(clock):
+    limiter = RateLimiter(rate=10, burst=1, reserve=0.3)
+
+    # Фоновые запросы идут не чаще (1 - reserve) * rate = 7 в секунду
+    assert acquire_times(limiter, clock, 50, background=True)[-1] == pytest.approx(7.0, abs=0.05)
+    # Интерактивные по-прежнему получают полную частоту
+    times = acquire_times(limiter, clock, 11)
+    assert times[-1] - times[0] == pytest.approx(1.0, abs=0.05)
+
+
+def test_without_reserve_background_uses_whole_budget(clock):
+    limiter = RateLimiter(rate=10, burst=1, reserve=0.0)
+
+    assert acquire_times(limiter, clock, 50, background=True)[-1] == pytest.approx(4.9, abs=0.05)
+
+
+def test_interactive_gets_tokens_while_background_is_saturated(clock):
+    limiter = RateLimiter(rate=10, burst=1, reserve=0.3)
+    latencies = []
+
+    def interactive(arrived):
+        limiter.acquire()
+        latencies.append(clock.now - arrived)
+
+    for second in range(10):
+        arrived = second + 0.55
+        clock.at(arrived, lambda arrived=arrived: interactive(arrived))
+
+    # Фон все время ждет токен; интерактивный запрос приходит раз в секунду
+    background = acquire_times(limiter, clock, 70, background=True)
+
+    assert len(latencies) == 10
+    # Интерактивному запросу хватает резерва: не дольше одного интервала токена
+    assert max(latencies) <= 0.1 + 1e-6
+    # Фон при этом не замедляется сверх своей доли бюджета
+    assert background[-1] == pytest.approx(69 / 7, abs=0.05)
+
+
+class StubExchange:
+    rateLimit = 100
+
+
+def test_reserve_needs_two_slots():
+    # С одним слотом фоновый запрос занял бы единственное соединение
+    with pytest.raises(ValueError):
+        exchange_pool.ExchangeClient('kucoin', {'max_concurrency': 1, 'interactive_reserve': 0.3}, StubExchange())
+
+    client = exchange_pool.ExchangeClient('kucoin', {'max_concurrency': 1, 'interactive_reserve': 0}, StubExchange())
+    assert client._background_slots._value == 1
+
+    client = exchange_pool.ExchangeClient('kucoin', {'max_concurrency': 3, 'interactive_reserve': 0.3}, StubExchange())
+    # Фоновым запросам - на один слот меньше
+    assert client._background_slots._value == 2
@@ -0,0 +1,89 @@
+"""Потоковый экспорт: чанки дают тот же файл, что и запись за один раз, и читаются обратно"""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.exporter import export_dataframe
+
+
+METADATA = {'symbol': 'BTC/USDT', 'timeframe': '1m', 'exported_at': '2024-01-01T00:00:00'}
+
+
+def make_candles(count):
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=count, freq='min'),
+        'open': close + 0.5,
+        'high': close + 1.25,
+        'low': close - 1.0,
+        'close': close,
+        'volume': rng.gamma(2.0, 50.0, count),
+    })
+
+
+def export(df, path, file_format, chunk_size):
+    export_dataframe(df, str(path), file_format, METADATA, chunk_size=chunk_size)
+    return path
+
+
+@pytest.mark.parametrize("file_format", ['json', 'csv'])
+@pytest.mark.parametrize("chunk_size", [1, 7, 50])
+def test_chunked_output_matches_single_write(tmp_path, file_format, chunk_size):
+    df = make_candles(50)
+    single = export(df, tmp_path / f"single.{file_format}", file_format, chunk_size=len(df))
+    chunked = export(df, tmp_path / f"chunked.{file_format}", file_format, chunk_size=chunk_size)
+
+    assert chunked.read_text() == single.read_text()
+
+
+def test_json_round_trip(tmp_path):
+    df = make_candles(23)
+    path = export(df, tmp_path / "candles.json", 'json', chunk_size=5)
+
+    with open(path) as f:
+        exported = json.load(f)
+
+    # Тот же документ, что и прежний экспорт одним json.dump
+    expected = {
+        'metadata': METADATA,
+        'data': [dict(row, timestamp=str(row['timestamp'])) for row in df.to_dict(orient='records')],
+    }
+    assert exported == expected
+
+
+def test_json_empty_and_missing_values(tmp_path):
+    with open(export(make_candles(0), tmp_path / "empty.json", 'json', chunk_size=5)) as f:
+        assert json.load(f) == {'metadata': METADATA, 'data': []}
+
+    df = make_candles(3)
+    df.loc[1, 'volume'] = np.nan
+    with open(export(df, tmp_path / "nan.json", 'json', chunk_size=2)) as f:
+        assert [row['volume'] for row in json.load(f)['data']][1] is None
+
+
+def test_csv_round_trip(tmp_path):
+    df = make_candles(23)
+    path = export(df, tmp_path / "candles.csv", 'csv', chunk_size=5)
+
+    with open(path) as f:
+        assert json.loads(f.readline()[2:]) == METADATA
+    restored = pd.read_csv(path, skiprows=1, parse_dates=['timestamp'])
+    pd.testing.assert_frame_equal(restored, df)
+
+
+@pytest.mark.parametrize("file_format", ['parquet', 'arrow'])
+def test_columnar_round_trip(tmp_path, file_format):
+    pa = pytest.importorskip("pyarrow")
+    df = make_candles(23)
+    path = export(df, tmp_path / f"candles.{file_format}", file_format, chunk_size=5)
+
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(str(path))
+    else:
+        table = pa.ipc.open_file(str(path)).read_all()
+    assert json.loads(table.schema.metadata[b'export_metadata']) == METADATA
+    pd.testing.assert_frame_equal(table.to_pandas(), df, check_dtype=False)
@@ -0,0 +1,128 @@
+"""IntegrityChecker: поиск пропусков и их догрузка через RequestQueue и ReplayExchange"""
+import threading
+import time
+
+import numpy as np
+
+from benchmarks.fake_exchange import START_MS, install_fake_exchange, make_candle_array
+from core.data_manager import SQLiteStorage, merge_candles, rows_to_candles
+from core.integrity import IntegrityChecker, find_gaps, subtract_intervals
+from core.replay import ReplayArchive
+
+
+MINUTE_MS = 60000
+SYMBOL = 'COIN0/USDT'
+
+
+def ts(index):
+    return START_MS + index * MINUTE_MS
+
+
+def without(rows, *ranges):
+    """Свечи rows без строк из полуинтервалов индексов ranges"""
+    keep = np.ones(len(rows), dtype=bool)
+    for start, end in ranges:
+        keep[start:end] = False
+    return rows[keep]
+
+
+def pause(request_queue):
+    """Пауза действует со следующего прохода диспетчера: ждем конца текущего ожидания задачи"""
+    request_queue.pause()
+    time.sleep(0.6)
+
+
+def test_find_gaps_between_candles():
+    timestamps = [ts(i) for i in (0, 1, 2, 5, 6, 9)]
+    assert find_gaps(timestamps, MINUTE_MS) == [(ts(3), ts(5)), (ts(7), ts(9))]
+
+
+def test_find_gaps_with_bounds():
+    timestamps = [ts(i) for i in (2, 3, 4)]
+    assert find_gaps(timestamps, MINUTE_MS, ts(0), ts(8)) == [(ts(0), ts(2)), (ts(5), ts(8))]
+    # Начало выравнивается по сетке таймфрейма
+    assert find_gaps(timestamps, MINUTE_MS, ts(0) + 1, ts(5)) == [(ts(1), ts(2))]
+    assert find_gaps([], MINUTE_MS, ts(0), ts(3)) == [(ts(0), ts(3))]
+
+
+def test_subtract_intervals():
+    gaps = [(0, 10), (20, 30)]
+    assert subtract_intervals(gaps, [(2, 4), (8, 22)]) == [(0, 2), (4, 8), (22, 30)]
+    assert subtract_intervals(gaps, [(0, 30)]) == []
+
+
+def test_checker_skips_known_empty_and_pre_listing(home, tmp_path):
+    from core.listing_index import ListingIndex
+
+    storage = SQLiteStorage(str(tmp_path / "history.db"))
+    storage.write_candles('kucoin', SYMBOL, '1m', rows_to_candles(without(make_candle_array(100), (40, 50), (70, 80))))
+    storage.mark_empty('kucoin', SYMBOL, '1m', [(ts(70), ts(80))])
+    listing_index = ListingIndex()
+    listing_index.set('kucoin', SYMBOL, '1m', ts(0))
+
+    checker = IntegrityChecker(None, storage, listing_index)
+    assert checker.find_gaps('kucoin', SYMBOL, '1m', start=ts(-20), end=ts(100)) == [(ts(40), ts(50))]
+
+
+def test_repair_fetches_missing_pages(request_queue, api_client):
+    rows = make_candle_array(600)
+    # У биржи нет свечей 300..360, в памяти не хватает еще и 100..150
+    archive = ReplayArchive(meta={'rateLimit': 1})
+    archive.add('fetch_ohlcv', [SYMBOL, '1m'], {}, result=without(rows, (300, 360)).tolist())
+    install_fake_exchange(api_client, archive)
+    df = rows_to_candles(without(rows, (100, 150), (300, 360)))
+
+    checker = IntegrityChecker(request_queue, page_limit=40)
+    gaps = checker.find_gaps('kucoin', SYMBOL, '1m', df=df)
+    assert gaps == [(ts(100), ts(150)), (ts(300), ts(360))]
+
+    pages = []
+    done = threading.Event()
+
+    def on_page(data, error):
+        pages.append((data, error))
+        if len(pages) == scheduled:
+            done.set()
+
+    scheduled = checker.repair('kucoin', SYMBOL, '1m', gaps, callback=on_page)
+    # Страницы не длиннее page_limit свечей: 40 + 10 и 40 + 20
+    assert scheduled == 4
+    assert done.wait(10)
+    assert not any(error for _, error in pages)
+
+    for data, _ in pages:
+        df = merge_candles(df, data)
+    assert len(df) == 540
+    # Пустое у биржи окно запомнено и больше не считается пропуском
+    assert sorted(checker.known_empty('kucoin', SYMBOL, '1m')) == [(ts(300), ts(340)), (ts(340), ts(360))]
+    assert checker.find_gaps('kucoin', SYMBOL, '1m', df=df) == []
+
+
+def test_repair_skips_pages_in_flight(request_queue):
+    checker = IntegrityChecker(request_queue)
+    pause(request_queue)
+    gaps = [(ts(0), ts(10))]
+
+    assert checker.repair('kucoin', SYMBOL, '1m', gaps) == 1
+    assert checker.repair('kucoin', SYMBOL, '1m', gaps) == 0
+
+
+def test_clear_during_repair_releases_pages(request_queue):
+    checker = IntegrityChecker(request_queue, page_limit=10)
+    pause(request_queue)
+    gaps = [(ts(0), ts(30))]
+    errors = []
+    done = threading.Event()
+
+    def on_page(data, error):
+        errors.append(error)
+        if len(errors) == 3:
+            done.set()
+
+    assert checker.repair('kucoin', SYMBOL, '1m', gaps, callback=on_page) == 3
+    request_queue.clear()
+
+    # Отмененные страницы доходят до callback'а и больше не числятся в работе
+    assert done.wait(5)
+    assert errors == [request_queue.CANCELLED] * 3
+    assert checker.repair('kucoin', SYMBOL, '1m', gaps) == 3
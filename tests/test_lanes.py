@@ -0,0 +1,85 @@
+"""LaneScheduler: порядок полос, лимиты одновременных задач и ожидание"""
+import queue
+import threading
+
+import pytest
+
+from core import lanes
+from core.lanes import LaneScheduler
+
+
+def put(scheduler, lane, task_id, priority=1):
+    scheduler.put(lane, priority, task_id, {'id': task_id, 'lane': lane})
+
+
+def take(scheduler, timeout=0.05):
+    lane, _, task = scheduler.get(timeout=timeout)
+    return lane, task['id']
+
+
+def test_interactive_lane_goes_first():
+    scheduler = LaneScheduler()
+    put(scheduler, lanes.BULK, 1)
+    put(scheduler, lanes.PREFETCH, 2)
+    put(scheduler, lanes.INTERACTIVE, 3)
+
+    assert [take(scheduler) for _ in range(3)] == [
+        (lanes.INTERACTIVE, 3), (lanes.PREFETCH, 2), (lanes.BULK, 1)]
+
+
+def test_order_within_lane_by_priority_then_id():
+    scheduler = LaneScheduler()
+    put(scheduler, lanes.INTERACTIVE, 3, priority=1)
+    put(scheduler, lanes.INTERACTIVE, 1, priority=1)
+    put(scheduler, lanes.INTERACTIVE, 2, priority=0)
+
+    assert [take(scheduler)[1] for _ in range(3)] == [2, 1, 3]
+
+
+def test_background_lane_cap():
+    scheduler = LaneScheduler()
+    for task_id in range(1, 4):
+        put(scheduler, lanes.BULK, task_id)
+
+    assert [take(scheduler)[1] for _ in range(lanes.LANE_CONCURRENCY[lanes.BULK])] == [1, 2]
+    # Оба слота bulk заняты: третья задача ждет
+    with pytest.raises(queue.Empty):
+        take(scheduler)
+    assert scheduler.stats()[lanes.BULK]['in_flight'] == 2
+    assert scheduler.stats()[lanes.BULK]['queued'] == 1
+
+    # Интерактивная задача не ждет фон
+    put(scheduler, lanes.INTERACTIVE, 4)
+    assert take(scheduler) == (lanes.INTERACTIVE, 4)
+
+    scheduler.done(lanes.BULK)
+    assert take(scheduler) == (lanes.BULK, 3)
+
+
+def test_done_wakes_waiting_get():
+    scheduler = LaneScheduler({lanes.INTERACTIVE: 1, lanes.PREFETCH: 1, lanes.BULK: 1})
+    put(scheduler, lanes.PREFETCH, 1)
+    put(scheduler, lanes.PREFETCH, 2)
+    take(scheduler)
+
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(take(scheduler, timeout=5)))
+    waiter.start()
+    scheduler.done(lanes.PREFETCH)
+    waiter.join(5)
+    assert result == [(lanes.PREFETCH, 2)]
+
+
+def test_clear_keeps_in_flight_counts():
+    scheduler = LaneScheduler()
+    for task_id in range(1, 4):
+        put(scheduler, lanes.BULK, task_id)
+    take(scheduler)
+
+    scheduler.clear()
+    assert scheduler.qsize() == 0
+    assert scheduler.stats()[lanes.BULK]['in_flight'] == 1
+    # Лишний done не уводит счетчик в минус
+    scheduler.done(lanes.BULK)
+    scheduler.done(lanes.BULK)
+    assert scheduler.stats()[lanes.BULK]['in_flight'] == 0
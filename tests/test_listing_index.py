@@ -0,0 +1,60 @@
+"""Поиск начала истории пары (find_earliest_candle) по ReplayExchange"""
+import ccxt
+import pytest
+
+from benchmarks.fake_exchange import START_MS, make_archive
+from core.listing_index import ListingIndex, find_earliest_candle
+from core.replay import ReplayArchive, ReplayExchange
+
+
+MINUTE_MS = 60000
+SYMBOL = 'COIN0/USDT'
+NOW_MS = START_MS + 5000 * MINUTE_MS
+
+
+def replay_fetch(archive, timeframe='1m', calls=None):
+    exchange = ReplayExchange(archive)
+
+    def fetch(since, limit):
+        if calls is not None:
+            calls.append(since)
+        return exchange.fetch_ohlcv(SYMBOL, timeframe, since=since, limit=limit)
+    return fetch
+
+
+@pytest.mark.parametrize("timeframe", ['1m', '1h', '1d'])
+def test_finds_listing_within_probe_budget(timeframe):
+    archive = make_archive([SYMBOL], timeframe=timeframe, candles=3000)
+    tf_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+    calls = []
+
+    earliest = find_earliest_candle(replay_fetch(archive, timeframe, calls), timeframe, 500,
+                                    now_ms=START_MS + 3000 * tf_ms)
+    assert earliest == START_MS
+    assert len(calls) <= 20
+
+
+def test_listing_off_window_grid():
+    # Листинг не совпадает с границами окон поиска
+    listing = START_MS + 7 * MINUTE_MS
+    archive = make_archive([SYMBOL], candles=3000, start_ms=listing)
+    assert find_earliest_candle(replay_fetch(archive), '1m', 500, now_ms=NOW_MS) == listing
+
+
+def test_no_candles():
+    archive = ReplayArchive()
+    archive.add('fetch_ohlcv', [SYMBOL, '1m'], {}, result=[[START_MS, 1, 1, 1, 1, 1]])
+    fetch = replay_fetch(archive)
+
+    assert find_earliest_candle(lambda since, limit: [], '1m', 500, now_ms=NOW_MS) is None
+    # Свечи есть только раньше нижней границы поиска
+    assert find_earliest_candle(fetch, '1m', 500, now_ms=NOW_MS, lower_ms=START_MS + MINUTE_MS) is None
+
+
+def test_discover_remembers_listing(home):
+    archive = make_archive([SYMBOL], candles=3000)
+    index = ListingIndex()
+    assert index.discover('kucoin', SYMBOL, '1m', replay_fetch(archive), 500) is not None
+
+    # Индекс переживает перезапуск
+    assert ListingIndex().get('kucoin', SYMBOL, '1m') == START_MS
@@ -0,0 +1,103 @@
+"""Запись ответов биржи в архив и воспроизведение без сети"""
+import gzip
+
+import ccxt
+import pytest
+
+from core.replay import WEEK_MS, ArchiveWriter, RecordingExchange, ReplayArchive, ReplayExchange, archive_path
+
+
+MINUTE_MS = 60000
+SYMBOL = 'COIN0/USDT'
+START_MS = 1704067200000  # 2024-01-01 UTC
+
+
+def candles(start_index, count):
+    return [[START_MS + index * MINUTE_MS, 1.0, 2.0, 0.5, 1.5, 10.0] for index in range(start_index, start_index + count)]
+
+
+class StubExchange:
+    """Биржа ccxt с заранее заданными ответами"""
+
+    id = 'kucoin'
+    rateLimit = 50
+
+    def __init__(self):
+        self.tickers = [{'symbol': SYMBOL, 'last': 1.0}, ccxt.RateLimitExceeded("429 retry after 3s")]
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        start = (since - START_MS) // MINUTE_MS
+        return candles(start, limit)
+
+    def fetch_ticker(self, symbol, params={}):
+        response = self.tickers.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+@pytest.fixture
+def recorded(tmp_path):
+    """Архив после записи: две страницы свечей, тикер и ошибка ограничения запросов"""
+    path = archive_path(str(tmp_path), 'kucoin')
+    writer = ArchiveWriter(path)
+    exchange = RecordingExchange(StubExchange(), writer)
+    exchange.fetch_ohlcv(SYMBOL, '1m', since=START_MS, limit=100)
+    exchange.fetch_ohlcv(SYMBOL, '1m', since=START_MS + 100 * MINUTE_MS, limit=100)
+    exchange.fetch_ticker(SYMBOL)
+    with pytest.raises(ccxt.RateLimitExceeded):
+        exchange.fetch_ticker(SYMBOL)
+    writer.close()
+    return path
+
+
+def test_replay_answers_recorded_calls(recorded):
+    archive = ReplayArchive.load(recorded)
+    exchange = ReplayExchange(archive)
+
+    assert exchange.rateLimit == 50
+    assert exchange.fetch_ohlcv(SYMBOL, '1m', since=START_MS, limit=100) == candles(0, 100)
+    # Повторы одного вызова - по порядку записи, ошибка воспроизводится тем же классом ccxt
+    assert exchange.fetch_ticker(SYMBOL) == {'symbol': SYMBOL, 'last': 1.0}
+    with pytest.raises(ccxt.RateLimitExceeded):
+        exchange.fetch_ticker(SYMBOL)
+    with pytest.raises(ccxt.ExchangeNotAvailable):
+        exchange.fetch_ticker('OTHER/USDT')
+
+
+def test_ohlcv_window_from_recorded_pages(recorded):
+    exchange = ReplayExchange(ReplayArchive.load(recorded))
+
+    # Окно на стыке двух записанных страниц
+    assert exchange.fetch_ohlcv(SYMBOL, '1m', since=START_MS + 50 * MINUTE_MS, limit=100) == candles(50, 100)
+    assert exchange.fetch_ohlcv(SYMBOL, '1m', since=START_MS + 150 * MINUTE_MS, limit=100) == candles(150, 50)
+    # Без since - последние свечи, как у биржи
+    assert exchange.fetch_ohlcv(SYMBOL, '1m', limit=30) == candles(170, 30)
+    with pytest.raises(ccxt.ExchangeNotAvailable):
+        exchange.fetch_ohlcv('OTHER/USDT', '1m', since=START_MS, limit=10)
+
+
+def test_truncated_archive_is_readable(recorded):
+    with gzip.open(recorded, 'at', encoding='utf-8') as f:
+        f.write('{"method": "fetch_tic')
+
+    archive = ReplayArchive.load(recorded)
+    assert ReplayExchange(archive).fetch_ohlcv(SYMBOL, '1m', since=START_MS, limit=100) == candles(0, 100)
+
+
+def test_replay_rate_and_time_shift():
+    archive = ReplayArchive()
+    archive.add('fetch_ohlcv', [SYMBOL, '1m'], {}, result=candles(0, 10))
+
+    exchange = ReplayExchange(archive, rate=2)
+    exchange.fetch_ohlcv(SYMBOL, '1m', since=START_MS, limit=5)
+    exchange.fetch_ohlcv(SYMBOL, '1m', since=START_MS, limit=5)
+    # Третий запрос за секунду - ограничение, как у настоящей биржи
+    with pytest.raises(ccxt.RateLimitExceeded):
+        exchange.fetch_ohlcv(SYMBOL, '1m', since=START_MS, limit=5)
+
+    # Сдвиг к текущему времени кратен неделе и прозрачен для since
+    shifted = ReplayExchange(archive, shift_time=True)
+    assert shifted.offset > 0 and shifted.offset % WEEK_MS == 0
+    page = shifted.fetch_ohlcv(SYMBOL, '1m', since=START_MS + shifted.offset, limit=3)
+    assert [candle[0] for candle in page] == [START_MS + shifted.offset + index * MINUTE_MS for index in range(3)]
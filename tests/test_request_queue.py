@@ -0,0 +1,101 @@
+"""RequestQueue: откладывание задач биржи под ограничением запросов и очистка очереди"""
+import threading
+import time
+
+from benchmarks.fake_exchange import START_MS, install_fake_exchange
+from core.request_queue import RequestQueue
+
+
+SYMBOL = 'COIN0/USDT'
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def pause(request_queue):
+    """Пауза действует со следующего прохода диспетчера: ждем конца текущего ожидания задачи"""
+    request_queue.pause()
+    time.sleep(0.6)
+
+
+def status(request_queue, task_id):
+    return request_queue.state.get(task_id).status
+
+
+def add_fetch(request_queue, callback=None, exchange='kucoin'):
+    return request_queue.add_request('fetch_ohlcv', symbol=SYMBOL, timeframe='1m', since=START_MS // 1000,
+                                     limit=10, exchange=exchange, callback=callback,
+                                     metadata={'use_cache': False})
+
+
+def test_task_completes(request_queue):
+    done = threading.Event()
+    results = []
+    add_fetch(request_queue, lambda data, error: (results.append((data, error)), done.set()))
+
+    assert done.wait(5)
+    data, error = results[0]
+    assert not error
+    assert len(data) == 10
+
+
+def test_rate_limited_task_is_parked_until_reset(request_queue, api_client):
+    api_client.exchanges.get('kucoin').mark_rate_limited(0.5)
+    done = threading.Event()
+    task_id = add_fetch(request_queue, lambda data, error: done.set())
+
+    assert wait_until(lambda: status(request_queue, task_id) == 'rate_limited')
+    assert not done.is_set()
+
+    # После сброса ограничения задача возвращается в свою полосу и выполняется
+    assert done.wait(5)
+    assert status(request_queue, task_id) == 'completed'
+
+
+def test_parked_exchange_does_not_block_others(request_queue, api_client, archive):
+    install_fake_exchange(api_client, archive, exchange_id='binance')
+    api_client.exchanges.get('kucoin').mark_rate_limited(60)
+    done = threading.Event()
+
+    parked = add_fetch(request_queue)
+    add_fetch(request_queue, lambda data, error: done.set(), exchange='binance')
+
+    assert done.wait(5)
+    assert status(request_queue, parked) == 'rate_limited'
+
+
+def test_clear_drops_parked_tasks(request_queue, api_client):
+    client = api_client.exchanges.get('kucoin')
+    client.mark_rate_limited(60)
+    called = []
+    task_id = add_fetch(request_queue, lambda data, error: called.append(error))
+    assert wait_until(lambda: status(request_queue, task_id) == 'rate_limited')
+
+    request_queue.clear()
+    assert status(request_queue, task_id) == 'cancelled'
+
+    # Сброс ограничения не возвращает отмененную задачу в работу
+    client.mark_rate_limited(0)
+    time.sleep(1.0)
+    assert called == [RequestQueue.CANCELLED]
+    assert request_queue.get_stats()['active'] == 0
+
+
+def test_clear_cancels_queued_tasks(request_queue):
+    pause(request_queue)
+    results = []
+    task_ids = [add_fetch(request_queue, lambda data, error: results.append((data, error))) for _ in range(3)]
+    no_callback = add_fetch(request_queue)
+
+    request_queue.clear()
+    assert [status(request_queue, task_id) for task_id in task_ids + [no_callback]] == ['cancelled'] * 4
+    assert request_queue.task_queue.qsize() == 0
+    # Каждый callback узнает об отмене
+    assert wait_until(lambda: len(results) == 3)
+    assert results == [(None, RequestQueue.CANCELLED)] * 3
@@ -0,0 +1,114 @@
+"""Таблица запросов PipeTab: применение изменений задач без перечитывания индекса"""
+from collections import deque
+
+import pytest
+
+pytest.importorskip("PyQt5.QtWidgets")
+
+from ui.pipe_tab import RequestTableModel  # noqa: E402
+
+
+class ChangeLogQueue:
+    """Источник задач модели с журналом изменений, как у RequestQueue"""
+
+    def __init__(self, log_size=1000):
+        self.tasks = {}  # ID -> задача в порядке добавления
+        self.revision = 0
+        self.change_log = deque(maxlen=log_size)
+
+    def add(self, *task_ids):
+        for task_id in task_ids:
+            self.tasks[task_id] = {'id': task_id, 'task_type': 'fetch_ohlcv', 'status': 'queued', 'priority': 1}
+            self._mark_changed(task_id)
+
+    def set_status(self, task_id, status):
+        self.tasks[task_id] = dict(self.tasks[task_id], status=status)
+        self._mark_changed(task_id)
+
+    def evict(self, task_id):
+        """Задача вытеснена из истории очереди"""
+        del self.tasks[task_id]
+        self._mark_changed(task_id)
+
+    def _mark_changed(self, task_id):
+        self.revision += 1
+        self.change_log.append((self.revision, task_id))
+
+    def get_all_tasks(self):
+        return list(self.tasks.values())
+
+    def get_task_changes(self, since_revision):
+        if since_revision >= self.revision:
+            return self.revision, [], []
+        if not self.change_log or self.change_log[0][0] > since_revision + 1:
+            return self.revision, None, []
+        changed = dict.fromkeys(task_id for rev, task_id in self.change_log if rev > since_revision)
+        return (self.revision, [self.tasks[task_id] for task_id in changed if task_id in self.tasks],
+                [task_id for task_id in changed if task_id not in self.tasks])
+
+
+def model_for(queue):
+    model = RequestTableModel(queue)
+    events = []
+    model.modelReset.connect(lambda: events.append('reset'))
+    model.rowsInserted.connect(lambda parent, first, last: events.append(('insert', first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: events.append(('remove', first, last)))
+    model.dataChanged.connect(lambda top, bottom: events.append(('changed', top.row(), bottom.row())))
+    return model, events
+
+
+def ids(model):
+    return [model.task_at(row)['id'] for row in range(model.rowCount())]
+
+
+def test_refresh_applies_deltas():
+    queue = ChangeLogQueue()
+    queue.add(1, 2, 3, 4)
+    model, events = model_for(queue)
+
+    # Первое обновление читает индекс целиком
+    model.refresh()
+    assert ids(model) == [1, 2, 3, 4]
+    assert events == ['reset']
+
+    events.clear()
+    queue.set_status(2, 'in_progress')
+    queue.set_status(3, 'in_progress')
+    queue.set_status(1, 'in_progress')
+    queue.add(5)
+    model.refresh()
+    # Соседние строки - один dataChanged, новые задачи дописываются в конец
+    assert events == [('changed', 0, 2), ('insert', 4, 4)]
+    assert model.task_at(1)['status'] == 'in_progress'
+
+    events.clear()
+    model.refresh()
+    assert events == []
+
+
+def test_refresh_removes_evicted_tasks():
+    queue = ChangeLogQueue()
+    queue.add(1, 2, 3, 4, 5)
+    model, events = model_for(queue)
+    model.refresh()
+
+    events.clear()
+    for task_id in (1, 2, 4):
+        queue.evict(task_id)
+    model.refresh()
+    # Смежные строки удаляются одним диапазоном
+    assert ids(model) == [3, 5]
+    assert events == [('remove', 3, 3), ('remove', 0, 1)]
+
+
+def test_refresh_reloads_after_log_overflow():
+    queue = ChangeLogQueue(log_size=3)
+    queue.add(1)
+    model, events = model_for(queue)
+    model.refresh()
+
+    events.clear()
+    queue.add(2, 3, 4, 5)
+    model.refresh()
+    assert events == ['reset']
+    assert ids(model) == [1, 2, 3, 4, 5]
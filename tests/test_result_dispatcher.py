@@ -0,0 +1,144 @@
+"""
+ResultDispatcher: доставка пачками в главном потоке и пул рабочих потоков
+
+Тесты идут без Qt, на замене сигналов из core.signals: роль цикла событий
+играет сам тест.
+"""
+import threading
+import time
+
+import pytest
+
+from core import result_dispatcher
+from core.result_dispatcher import ResultDispatcher
+from core.signals import Qt
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    """
+    Диспетчер, у которого проход цикла событий выполняет сам тест
+
+    Доставка MAIN работает как с Qt (очередь и пачки), но запросы доставки
+    не уходят в цикл событий, а записываются в delivery_requests; пачку
+    доставляет вызов _deliver_batch().
+    """
+    monkeypatch.setattr(result_dispatcher, 'HEADLESS', False)
+    dispatcher = ResultDispatcher()
+    dispatcher.delivery_requests = []
+    dispatcher._delivery_requested.disconnect()
+    dispatcher._delivery_requested.connect(lambda: dispatcher.delivery_requests.append(1), Qt.DirectConnection)
+    yield dispatcher
+    dispatcher.shutdown()
+
+
+def submit_from_thread(dispatcher, callbacks_and_results, delivery=ResultDispatcher.MAIN):
+    """Результаты приходят из потока задачи, как в RequestQueue"""
+    thread = threading.Thread(target=lambda: [dispatcher.submit(callback, data, None, delivery)
+                                              for callback, data in callbacks_and_results])
+    thread.start()
+    thread.join()
+
+
+def run_event_loop(dispatcher, limit=1000):
+    """Выполняет проходы цикла событий, пока есть запросы доставки; возвращает число пачек"""
+    batches = 0
+    while len(dispatcher.delivery_requests) > batches and batches < limit:
+        dispatcher._deliver_batch()
+        batches += 1
+    return batches
+
+
+def test_results_are_delivered_in_one_batch_in_order(dispatcher):
+    received = []
+
+    def callback(data, error):
+        received.append((data, threading.get_ident()))
+
+    submit_from_thread(dispatcher, [(callback, index) for index in range(100)])
+    # Сто результатов - один запрос к циклу событий
+    assert dispatcher.delivery_requests == [1]
+    assert received == []
+
+    assert run_event_loop(dispatcher) == 1
+    assert [data for data, _ in received] == list(range(100))
+    assert {thread for _, thread in received} == {threading.get_ident()}
+
+
+def test_long_batch_is_split_and_keeps_order(dispatcher):
+    dispatcher.MAX_BATCH_SECONDS = 0.02
+    received = []
+
+    def slow_callback(data, error):
+        time.sleep(0.005)
+        received.append(data)
+
+    submit_from_thread(dispatcher, [(slow_callback, index) for index in range(30)])
+    batches = run_event_loop(dispatcher)
+
+    # Проход ограничен по времени: пачек несколько, но меньше, чем результатов
+    assert 1 < batches < 30
+    assert received == list(range(30))
+
+
+def test_new_results_after_delivery_request_new_pass(dispatcher):
+    received = []
+    submit_from_thread(dispatcher, [(lambda data, error: received.append(data), 1)])
+    run_event_loop(dispatcher)
+    submit_from_thread(dispatcher, [(lambda data, error: received.append(data), 2)])
+
+    assert len(dispatcher.delivery_requests) == 2
+    run_event_loop(dispatcher)
+    assert received == [1, 2]
+
+
+def test_failing_callback_does_not_stop_batch(dispatcher):
+    received = []
+
+    def failing(data, error):
+        raise RuntimeError("callback failed")
+
+    submit_from_thread(dispatcher, [(failing, 0), (lambda data, error: received.append(data), 1)])
+    run_event_loop(dispatcher)
+    assert received == [1]
+
+
+def test_coalesced_calls_run_once_per_pass(dispatcher):
+    calls = []
+    for index in range(5):
+        dispatcher.coalesce('refresh', lambda index=index: calls.append(index))
+
+    assert dispatcher.delivery_requests == [1]
+    run_event_loop(dispatcher)
+    # Выполняется последний запрошенный вызов
+    assert calls == [4]
+
+
+def test_worker_delivery_bypasses_main_thread(dispatcher):
+    done = threading.Event()
+    threads = []
+
+    def callback(data, error):
+        threads.append(threading.current_thread().name)
+        if len(threads) == 10:
+            done.set()
+
+    submit_from_thread(dispatcher, [(callback, index) for index in range(10)], ResultDispatcher.WORKER)
+    assert done.wait(5)
+    assert dispatcher.delivery_requests == []
+    assert all(name.startswith("result-worker") for name in threads)
+
+
+def test_headless_main_delivery_is_immediate(monkeypatch):
+    monkeypatch.setattr(result_dispatcher, 'HEADLESS', True)
+    dispatcher = ResultDispatcher()
+    received = []
+    try:
+        submit_from_thread(dispatcher, [(lambda data, error: received.append((data, threading.current_thread().name)), 1)])
+        dispatcher.coalesce('refresh', lambda: received.append('refresh'))
+    finally:
+        dispatcher.shutdown()
+
+    # Без цикла событий callback выполняется сразу в потоке задачи
+    assert received[0][0] == 1 and received[0][1] != threading.current_thread().name
+    assert received[1] == 'refresh'
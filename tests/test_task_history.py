@@ -0,0 +1,63 @@
+"""Кольцевой буфер завершенных задач и итоговые счетчики"""
+import pytest
+
+from core.task_history import TaskHistory, TaskRecord
+
+
+def record(task_id, status='completed', task_type='fetch_ohlcv'):
+    return TaskRecord(id=task_id, status=status, task_type=task_type)
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        TaskHistory(0)
+
+
+def test_ring_keeps_last_records():
+    history = TaskHistory(3)
+    evicted = [history.append(record(task_id)) for task_id in range(1, 6)]
+
+    assert evicted[:3] == [None, None, None]
+    assert [r.id for r in evicted[3:]] == [1, 2]
+    assert len(history) == 3
+    assert [r.id for r in history] == [3, 4, 5]
+    assert history[0].id == 3
+    assert history[-1].id == 5
+    assert [r.id for r in history[1:]] == [4, 5]
+    with pytest.raises(IndexError):
+        history[3]
+
+
+def test_recent_returns_oldest_first():
+    history = TaskHistory(4)
+    for task_id in range(1, 7):
+        history.append(record(task_id))
+
+    assert [r.id for r in history.recent(2)] == [5, 6]
+    assert [r.id for r in history.recent(10)] == [3, 4, 5, 6]
+    assert history.recent(0) == []
+
+
+def test_counters_include_evicted_records():
+    history = TaskHistory(2)
+    history.append(record(1, 'completed', 'fetch_ohlcv'))
+    history.append(record(2, 'error', 'fetch_ohlcv'))
+    history.append(record(3, 'completed', 'upload_data'))
+    history.append(record(4, 'cancelled', 'fetch_ticker'))
+
+    assert history.total == 4
+    assert history.status_totals == {'completed': 2, 'error': 1, 'cancelled': 1}
+    assert history.type_totals == {'fetch_ohlcv': 2, 'upload_data': 1, 'fetch_ticker': 1}
+    assert history.type_status_totals[('fetch_ohlcv', 'error')] == 1
+
+
+def test_record_reads_like_task_dict():
+    task = {'id': 7, 'task_type': 'fetch_ohlcv', 'status': 'completed', 'symbol': 'COIN0/USDT',
+            'callback': print, 'data': b'payload'}
+    rec = TaskRecord.from_task(task)
+
+    assert rec['symbol'] == 'COIN0/USDT'
+    assert rec.get('error', '-') == '-'
+    assert 'callback' not in rec
+    with pytest.raises(KeyError):
+        rec['data']
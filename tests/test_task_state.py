@@ -0,0 +1,140 @@
+"""TaskState: ревизии, журнал изменений для PipeTab и неизменяемые снимки"""
+import pytest
+
+from core.task_history import TaskRecord
+from core.task_state import TaskState
+
+
+def make_task(task_id, status='queued', priority=1):
+    return {'id': task_id, 'task_type': 'fetch_ohlcv', 'status': status, 'priority': priority,
+            'symbol': 'COIN0/USDT', 'callback': None}
+
+
+def state_with(count, history_size=100):
+    state = TaskState(history_size)
+    for task_id in range(1, count + 1):
+        state.add(make_task(task_id))
+    return state
+
+
+def test_every_change_bumps_revision():
+    state = state_with(1)
+    assert state.revision == 1
+
+    task = state.set_status(1, 'in_progress')
+    assert state.revision == 2
+    assert task['revision'] == 2
+
+    state.update(1, symbol='COIN1/USDT')
+    state.finish(1, 'completed')
+    assert state.revision == 4
+    assert state.get(1).revision == 4
+
+
+def test_set_status_respects_expected():
+    state = state_with(1)
+    assert state.set_status(1, 'in_progress', expected=('rate_limited',)) is None
+    assert state.get(1).status == 'queued'
+
+    state.finish(1, 'completed')
+    # Завершенная задача больше не меняется
+    assert state.set_status(1, 'in_progress') is None
+    assert state.update(1, symbol='COIN1/USDT') is None
+    assert state.finish(1, 'error') is None
+    assert state.get(1).status == 'completed'
+
+
+def test_changes_since_returns_each_task_once():
+    state = state_with(3)
+    revision = state.revision
+    state.set_status(2, 'in_progress')
+    state.update(2, symbol='COIN1/USDT')
+    state.finish(3, 'completed')
+
+    new_revision, changed, removed = state.changes_since(revision)
+    assert new_revision == state.revision
+    assert [task.id for task in changed] == [2, 3]
+    assert all(isinstance(task, TaskRecord) for task in changed)
+    assert changed[0].symbol == 'COIN1/USDT'
+    assert removed == []
+
+    assert state.changes_since(new_revision) == (new_revision, [], [])
+
+
+def test_changes_since_reports_evicted_tasks():
+    state = state_with(3, history_size=2)
+    revision = state.revision
+    for task_id in (1, 2, 3):
+        state.finish(task_id, 'completed')
+
+    _, changed, removed = state.changes_since(revision)
+    # Задача 1 вытеснена из истории завершением задачи 3
+    assert [task.id for task in changed] == [2, 3]
+    assert removed == [1]
+    assert state.get(1) is None
+    assert [task.id for task in state.all_tasks()[1]] == [2, 3]
+
+
+def test_changes_since_asks_for_full_reload_after_log_overflow(monkeypatch):
+    monkeypatch.setattr(TaskState, 'CHANGE_LOG_SIZE', 4)
+    state = state_with(6)
+
+    revision, changed, removed = state.changes_since(0)
+    assert changed is None
+    assert revision == state.revision
+    # Последние записи журнала еще доступны
+    assert [task.id for task in state.changes_since(state.revision - 2)[1]] == [5, 6]
+
+
+def test_snapshot_is_cached_until_revision_changes():
+    state = state_with(3)
+    state.set_status(1, 'in_progress')
+
+    snapshot = state.snapshot()
+    assert state.snapshot() is snapshot
+    assert (snapshot['active'], snapshot['processing'], snapshot['waiting']) == (3, 1, 2)
+
+    state.finish(1, 'completed')
+    updated = state.snapshot()
+    assert updated is not snapshot
+    assert updated['revision'] == state.revision
+    assert (updated['active'], updated['processed']) == (2, 1)
+    assert updated['status_totals'] == {'completed': 1}
+    # Старый снимок не меняется
+    assert snapshot['processed'] == 0
+
+
+def test_snapshot_is_read_only():
+    state = state_with(2)
+    snapshot = state.snapshot()
+
+    with pytest.raises(TypeError):
+        snapshot['active'] = 0
+    with pytest.raises(TypeError):
+        snapshot['status_totals']['completed'] = 1
+    # Задачи в снимке - записи, а не живые словари очереди
+    assert all(isinstance(task, TaskRecord) for task in snapshot['tasks'])
+    state.set_status(1, 'in_progress')
+    assert snapshot['tasks'][0].status == 'queued'
+
+
+def test_snapshot_lists_top_priority_active_tasks(monkeypatch):
+    monkeypatch.setattr(TaskState, 'SNAPSHOT_ACTIVE_TASKS', 2)
+    state = TaskState(10)
+    for task_id, priority in ((1, 5), (2, 0), (3, 1), (4, 0)):
+        state.add(make_task(task_id, priority=priority))
+    state.finish(3, 'completed')
+
+    # Сначала самые приоритетные активные, затем последние завершенные
+    assert [task.id for task in state.snapshot()['tasks']] == [2, 4, 3]
+
+
+def test_cancel_moves_matching_tasks_to_history():
+    state = state_with(3)
+    state.set_status(2, 'in_progress')
+
+    cancelled = state.cancel(('queued', 'rate_limited'))
+    assert sorted(task['id'] for task in cancelled) == [1, 3]
+    assert state.get(1).status == 'cancelled'
+    assert state.snapshot()['active'] == 1
+    assert state.snapshot()['status_totals'] == {'cancelled': 2}
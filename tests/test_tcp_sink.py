@@ -0,0 +1,215 @@
+"""TcpSink против коллектора в процессе теста: окно подтверждений, переподключение и спул"""
+import socketserver
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.tcp_sink import FRAME_COLUMNAR, FRAME_HEADER, TcpSink
+from scripts.tcp_collector_stand_in import decode_columnar
+
+
+def make_candle_frame(count):
+    """Свечи в формате DataFrame, как их отдает ApiClient"""
+    close = 100 + np.cumsum(np.random.default_rng(0).normal(0, 1, count))
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2024-01-01', periods=count, freq='min'),
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close,
+        'volume': np.full(count, 10.0),
+    })
+
+
+def make_frames(count):
+    """Кадры с уникальной полезной нагрузкой (тип 0 - не колоночный)"""
+    frames = []
+    for index in range(count):
+        payload = f"frame-{index:04d}".encode()
+        frames.append(FRAME_HEADER.pack(len(payload) + 1, 0) + payload)
+    return frames
+
+
+class Collector:
+    """
+    Коллектор по протоколу TcpSink
+
+    frames - полезная нагрузка подтвержденных кадров по порядку (после
+    переподключения кадр может прийти повторно). Пока acks не установлен,
+    коллектор не подтверждает кадры; drop_after рвет первое соединение
+    после приема указанного числа кадров, не подтвердив последний.
+    """
+
+    def __init__(self, drop_after=None):
+        self.frames = []
+        self.frame_types = []
+        self.connections = 0
+        self.acks = threading.Event()
+        self.acks.set()
+        self.drop_after = drop_after
+        self._lock = threading.Lock()
+
+        collector = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                collector.handle(self.request)
+
+        # Порт занят сразу, а соединения принимаются только после start()
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler, bind_and_activate=False)
+        self.server.daemon_threads = True
+        self.server.allow_reuse_address = True
+        self.server.server_bind()
+        self.port = self.server.server_address[1]
+
+    def start(self):
+        self.server.server_activate()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.acks.set()
+        self.server.shutdown()
+        self.server.server_close()
+
+    @staticmethod
+    def _recv_exact(sock, size):
+        data = b''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def handle(self, sock):
+        with self._lock:
+            self.connections += 1
+            first = self.connections == 1
+        received = 0
+        while True:
+            header = self._recv_exact(sock, FRAME_HEADER.size)
+            if header is None:
+                return
+            length, frame_type = FRAME_HEADER.unpack(header)
+            payload = self._recv_exact(sock, length - 1)
+            if payload is None:
+                return
+            if first and self.drop_after is not None and received + 1 == self.drop_after:
+                return
+            self.acks.wait(10)
+            with self._lock:
+                self.frames.append(payload)
+                self.frame_types.append(frame_type)
+            received += 1
+            sock.sendall(TcpSink.ACK.pack(received))
+
+
+@pytest.fixture
+def collector():
+    collector = Collector().start()
+    yield collector
+    collector.stop()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+def payloads(frames):
+    return [frame[FRAME_HEADER.size:] for frame in frames]
+
+
+def test_frames_are_delivered_in_order(home, collector):
+    sink = TcpSink('127.0.0.1', collector.port)
+    frames = make_frames(200)
+    try:
+        assert sink.wait_sent(sink.send_frames(frames), timeout=10)
+        assert collector.frames == payloads(frames)
+        assert sink.stats()['buffered_bytes'] == 0
+    finally:
+        sink.close()
+
+
+def test_unacked_frames_are_limited_by_window(home, collector):
+    collector.acks.clear()
+    sink = TcpSink('127.0.0.1', collector.port, window=4)
+    frames = make_frames(10)
+    try:
+        last = sink.send_frames(frames)
+        assert wait_until(lambda: sink.stats()['in_flight'] == 4)
+        time.sleep(0.2)
+        # Без подтверждений следующие кадры не отправляются
+        assert sink.stats()['in_flight'] == 4
+        assert sink.sent_seq == 0
+        assert not sink.wait_sent(last, timeout=0.1)
+
+        collector.acks.set()
+        assert sink.wait_sent(last, timeout=10)
+        assert collector.frames == payloads(frames)
+    finally:
+        sink.close()
+
+
+def test_reconnect_resends_unacked_frames(home):
+    collector = Collector(drop_after=3).start()
+    sink = TcpSink('127.0.0.1', collector.port, max_backoff=0.5)
+    frames = make_frames(20)
+    try:
+        assert sink.wait_sent(sink.send_frames(frames), timeout=10)
+        assert sink.reconnects == 1
+        assert collector.connections == 2
+        # Доставка "хотя бы раз": после переподключения повторяются только неподтвержденные кадры
+        assert list(dict.fromkeys(collector.frames)) == payloads(frames)
+    finally:
+        sink.close()
+        collector.stop()
+
+
+def test_spooled_frames_survive_restart(home):
+    collector = Collector()  # Порт занят, но соединения не принимаются
+    spool_dir = str(home / "spool")
+    sink = TcpSink('127.0.0.1', collector.port, spool_dir=spool_dir, max_buffer_bytes=100)
+    frames = make_frames(30)
+    try:
+        sink.send_frames(frames)
+        # Сверх буфера в памяти кадры пишутся на диск
+        assert sink.stats()['spooled_frames'] > 0
+    finally:
+        sink.close()
+
+    # Закрытие дописывает в спул и кадры из памяти
+    restarted = TcpSink('127.0.0.1', collector.port, spool_dir=spool_dir, max_buffer_bytes=100)
+    try:
+        assert restarted.stats()['spooled_frames'] == 30
+        collector.start()
+        assert restarted.wait_sent(30, timeout=10)
+        assert collector.frames == payloads(frames)
+
+        # Новые кадры нумеруются после восстановленных
+        assert restarted.wait_sent(restarted.send_frames(make_frames(1)), timeout=10)
+        assert len(collector.frames) == 31
+    finally:
+        restarted.close()
+        collector.stop()
+
+
+def test_dataframe_frames_decode(home, collector):
+    df = make_candle_frame(12000)
+    sink = TcpSink('127.0.0.1', collector.port)
+    try:
+        assert sink.wait_sent(sink.send_dataframe(df, {'symbol': 'COIN0/USDT', 'timeframe': '1m'}), timeout=10)
+    finally:
+        sink.close()
+
+    assert collector.frame_types == [FRAME_COLUMNAR] * 3
+    decoded = [decode_columnar(payload) for payload in collector.frames]
+    assert [header['rows'] for header, _ in decoded] == [5000, 5000, 2000]
+    assert decoded[0][0]['metadata'] == {'symbol': 'COIN0/USDT', 'timeframe': '1m'}
+    closes = [value for _, columns in decoded for value in columns['close']]
+    assert closes == pytest.approx(df['close'].tolist())
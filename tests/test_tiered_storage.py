@@ -0,0 +1,113 @@
+"""TieredStorage: кодирование блоков, запечатывание чанков и сжатие cold.blk"""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.tiered_storage import CHUNK_CANDLES, CODECS, ROW_DTYPE, TieredStorage, decode_block, encode_block
+
+
+MINUTE_MS = 60000
+SPAN_MS = CHUNK_CANDLES * MINUTE_MS
+# Начало ряда на границе чанка 1m
+START_MS = 3460 * SPAN_MS
+SYMBOL = 'COIN0/USDT'
+
+
+def make_rows(timestamps, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = np.empty(len(timestamps), dtype=ROW_DTYPE)
+    rows['ts'] = timestamps
+    for name in ROW_DTYPE.names[1:]:
+        rows[name] = rng.normal(100, 5, len(timestamps))
+    return rows
+
+
+def make_frame(start_index, count, seed=0):
+    rows = make_rows(START_MS + np.arange(start_index, start_index + count) * MINUTE_MS, seed)
+    df = pd.DataFrame({name: rows[name] for name in ROW_DTYPE.names[1:]})
+    df.insert(0, 'timestamp', pd.to_datetime(rows['ts'], unit='ms'))
+    return df
+
+
+@pytest.mark.parametrize("codec", list(CODECS))
+@pytest.mark.parametrize("count", [1, 2, 1000])
+def test_block_round_trip_irregular_timestamps(codec, count):
+    rng = np.random.default_rng(count)
+    # Пропуски разной длины: от миллисекунды до суток
+    gaps = rng.choice([1, MINUTE_MS, 7 * MINUTE_MS, 86_400_000], size=count - 1)
+    rows = make_rows(START_MS + np.concatenate([[0], np.cumsum(gaps)]))
+    rows['volume'][::7] = np.nan
+
+    decoded = decode_block(encode_block(rows, codec), len(rows), codec)
+    for name in ROW_DTYPE.names:
+        np.testing.assert_array_equal(decoded[name], rows[name])
+
+
+def test_sealed_chunks_round_trip(tmp_path):
+    storage = TieredStorage(str(tmp_path))
+    df = make_frame(0, 5 * CHUNK_CANDLES)
+    storage.write_candles('kucoin', SYMBOL, '1m', df)
+
+    series = storage._get_series('kucoin', SYMBOL, '1m')
+    # Закрытые чанки, кроме двух последних, сжаты в cold.blk
+    assert sorted(series.blocks) == [3460, 3461, 3462]
+    assert sorted(series.hot) == [3463, 3464]
+    pd.testing.assert_frame_equal(storage.read_candles('kucoin', SYMBOL, '1m'), df)
+
+    # Диапазон на стыке холодного и горячего чанков
+    start, end = START_MS + (3 * CHUNK_CANDLES - 10) * MINUTE_MS, START_MS + (3 * CHUNK_CANDLES + 10) * MINUTE_MS
+    part = storage.read_candles('kucoin', SYMBOL, '1m', start, end)
+    pd.testing.assert_frame_equal(part, df.iloc[3 * CHUNK_CANDLES - 10:3 * CHUNK_CANDLES + 10].reset_index(drop=True))
+
+
+def test_rewritten_sealed_chunk_and_compact(tmp_path):
+    storage = TieredStorage(str(tmp_path))
+    df = make_frame(0, 5 * CHUNK_CANDLES)
+    storage.write_candles('kucoin', SYMBOL, '1m', df)
+    series = storage._get_series('kucoin', SYMBOL, '1m')
+    cold_size = os.path.getsize(series.cold_path)
+
+    # Переписываем часть запечатанного чанка: новый блок дописывается в конец
+    update = make_frame(100, 50, seed=1)
+    storage.write_candles('kucoin', SYMBOL, '1m', update)
+    expected = df.copy()
+    expected.iloc[100:150] = update.to_numpy()
+    assert series.garbage > 0
+    assert os.path.getsize(series.cold_path) > cold_size
+    pd.testing.assert_frame_equal(storage.read_candles('kucoin', SYMBOL, '1m'), expected)
+
+    series.compact()
+    live = sum(entry[1] for entry in series.blocks.values())
+    assert series.garbage == 0
+    assert os.path.getsize(series.cold_path) == live
+    pd.testing.assert_frame_equal(storage.read_candles('kucoin', SYMBOL, '1m'), expected)
+
+    # Индекс блоков переживает перезапуск
+    pd.testing.assert_frame_equal(TieredStorage(str(tmp_path)).read_candles('kucoin', SYMBOL, '1m'), expected)
+
+
+
+def test_interrupted_hot_write_keeps_previous_chunk(tmp_path, monkeypatch):
+    storage = TieredStorage(str(tmp_path))
+    df = make_frame(0, 100)
+    storage.write_candles('kucoin', SYMBOL, '1m', df)
+
+    def crashing_save(file, array):
+        # Запись обрывается на середине
+        if isinstance(file, str):
+            file = open(file, 'wb')
+        file.write(b'\x93NUMPY')
+        file.flush()
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, 'save', crashing_save)
+    with pytest.raises(OSError):
+        storage.write_candles('kucoin', SYMBOL, '1m', make_frame(50, 100, seed=1))
+    monkeypatch.undo()
+
+    # Прежняя версия горячего чанка цела, временный файл не считается чанком
+    restarted = TieredStorage(str(tmp_path))
+    assert restarted._get_series('kucoin', SYMBOL, '1m').chunks() == [3460]
+    pd.testing.assert_frame_equal(restarted.read_candles('kucoin', SYMBOL, '1m'), df)
@@ -0,0 +1,173 @@
+"""Uploader против сервера-заглушки в процессе теста: части, повторы и возобновление"""
+import hashlib
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from core.uploader import UploadError, Uploader
+from scripts.upload_stand_in_server import UploadHandler, UploadStore
+
+
+PART_SIZE = 1024
+
+
+class Server:
+    """
+    Сервер загрузки с журналом запросов
+
+    broken_parts - номера частей, на которых соединение рвется посреди
+    приема (тело прочитано, ответа нет); overloaded - сколько следующих
+    POST и PUT получат 503 с Retry-After.
+    """
+
+    def __init__(self, output_dir):
+        self.store = UploadStore(str(output_dir))
+        self.requests = []
+        self.broken_parts = set()
+        self.overloaded = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(UploadHandler):
+            store = self.store
+
+            def _maybe_fail(self):
+                with server._lock:
+                    self.fail_rate = 1.0 if server.overloaded else 0.0
+                    server.overloaded = max(0, server.overloaded - 1)
+                return super()._maybe_fail()
+
+            def do_PUT(self):
+                server.requests.append(('PUT', self.path))
+                part = int(self.path.rsplit('/', 1)[1]) if '/parts/' in self.path else None
+                if part in server.broken_parts:
+                    self._body()
+                    self.close_connection = True
+                    return
+                super().do_PUT()
+
+            def do_POST(self):
+                server.requests.append(('POST', self.path))
+                super().do_POST()
+
+            def do_GET(self):
+                server.requests.append(('GET', self.path))
+                super().do_GET()
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.endpoint = f"http://127.0.0.1:{self.httpd.server_address[1]}/ingest"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def parts_sent(self):
+        return sorted(int(path.rsplit('/', 1)[1]) for method, path in self.requests
+                      if method == 'PUT' and '/parts/' in path)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = Server(tmp_path / "received")
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def payload_file(tmp_path):
+    path = tmp_path / "candles.csv"
+    path.write_bytes(os.urandom(PART_SIZE * 5 + 100))
+    return path
+
+
+def make_uploader(tmp_path, **kwargs):
+    kwargs.setdefault('max_retries', 0)
+    return Uploader(part_size=PART_SIZE, backoff=0.01, compression='gzip',
+                    state_file=str(tmp_path / "uploads.json"), **kwargs)
+
+
+def received(server, name):
+    with open(os.path.join(server.store.output_dir, name), 'rb') as f:
+        return f.read()
+
+
+def test_small_payload_is_single_post(tmp_path, server):
+    uploader = make_uploader(tmp_path)
+    result = uploader.upload(server.endpoint, data={'rows': [1, 2, 3]})
+
+    assert result['parts'] == 1
+    assert [method for method, _ in server.requests] == ['POST']
+    assert json.loads(received(server, result['response']['stored'])) == {'rows': [1, 2, 3]}
+
+
+def test_large_file_is_sent_in_parts(tmp_path, server, payload_file):
+    progress = []
+    uploader = make_uploader(tmp_path)
+    result = uploader.upload(server.endpoint, filepath=str(payload_file),
+                             progress=lambda sent, total: progress.append(sent))
+
+    assert result['parts'] == 6
+    assert server.parts_sent() == list(range(6))
+    assert progress[-1] == payload_file.stat().st_size
+    assert received(server, 'candles.csv') == payload_file.read_bytes()
+
+
+def test_resume_after_broken_part(tmp_path, server, payload_file):
+    server.broken_parts = {3}
+    with pytest.raises(UploadError):
+        make_uploader(tmp_path).upload(server.endpoint, filepath=str(payload_file))
+    # Незавершенная загрузка запомнена, части 0-2 уже на сервере
+    with open(tmp_path / "uploads.json") as f:
+        assert len(json.load(f)) == 1
+    assert server.parts_sent() == [0, 1, 2, 3]
+
+    server.broken_parts = set()
+    server.requests.clear()
+    progress = []
+    result = make_uploader(tmp_path).upload(server.endpoint, filepath=str(payload_file),
+                                            progress=lambda sent, total: progress.append(sent))
+
+    # После перезапуска отправляются только недостающие части
+    assert server.parts_sent() == [3, 4, 5]
+    assert progress[0] == 3 * PART_SIZE
+    assert received(server, 'candles.csv') == payload_file.read_bytes()
+    assert result['response']['sha256'] == hashlib.sha256(payload_file.read_bytes()).hexdigest()
+    with open(tmp_path / "uploads.json") as f:
+        assert json.load(f) == {}
+
+
+def test_restart_when_server_forgot_upload(tmp_path, server, payload_file):
+    server.broken_parts = {1}
+    with pytest.raises(UploadError):
+        make_uploader(tmp_path).upload(server.endpoint, filepath=str(payload_file))
+
+    server.store.uploads.clear()
+    server.broken_parts = set()
+    server.requests.clear()
+    make_uploader(tmp_path).upload(server.endpoint, filepath=str(payload_file))
+
+    # Сервер не знает загрузку (404) - она начинается заново
+    assert server.requests[0][0] == 'GET'
+    assert server.parts_sent() == list(range(6))
+    assert received(server, 'candles.csv') == payload_file.read_bytes()
+
+
+def test_retries_overloaded_server(tmp_path, server, payload_file):
+    server.overloaded = 2
+    make_uploader(tmp_path, max_retries=3).upload(server.endpoint, filepath=str(payload_file))
+
+    assert server.overloaded == 0
+    assert received(server, 'candles.csv') == payload_file.read_bytes()
+
+    # Без повторов перегруженный сервер - ошибка загрузки
+    server.overloaded = 1
+    with pytest.raises(UploadError):
+        make_uploader(tmp_path).upload(server.endpoint, data={'rows': [1]})
@@ -0,0 +1,272 @@
+"""
+Построение графика свечей с индикаторами
+
+Модуль не зависит от Qt: функции выполняются в процессах ComputeService и
+получают свечи массивом (n, 6) из разделяемой памяти.
+"""
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from plotly.offline import plot
+
+
+def candles_to_dataframe(candles):
+    """Преобразует свечной массив (timestamp в мс + OHLCV) в DataFrame"""
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(candles[:, 0].astype(np.int64), unit='ms'),
+        'open': candles[:, 1],
+        'high': candles[:, 2],
+        'low': candles[:, 3],
+        'close': candles[:, 4],
+        'volume': candles[:, 5],
+    })
+
+
+def compute_indicators(close, indicators):
+    """
+    Вычисляет выбранные индикаторы по серии цен закрытия
+
+    indicators - словарь флагов ('ma', 'ema', 'bollinger', 'rsi', 'macd').
+    Возвращает словарь серий pandas.
+    """
+    result = {}
+
+    if indicators.get('ma') or indicators.get('bollinger'):
+        # Простая скользящая средняя за 20 периодов
+        result['ma20'] = close.rolling(window=20).mean()
+
+    if indicators.get('ema'):
+        # Экспоненциальная скользящая средняя за 14 периодов
+        result['ema14'] = close.ewm(span=14).mean()
+
+    if indicators.get('bollinger'):
+        # Полосы Боллинджера
+        std20 = close.rolling(window=20).std()
+        result['upper_band'] = result['ma20'] + 2 * std20
+        result['lower_band'] = result['ma20'] - 2 * std20
+
+    if indicators.get('rsi'):
+        delta = close.diff()
+        gain = delta.where(delta > 0, 0)
+        loss = -delta.where(delta < 0, 0)
+
+        avg_gain = gain.rolling(window=14).mean()
+        avg_loss = loss.rolling(window=14).mean()
+
+        rs = avg_gain / avg_loss
+        result['rsi'] = 100 - (100 / (1 + rs))
+
+    if indicators.get('macd'):
+        ema12 = close.ewm(span=12).mean()
+        ema26 = close.ewm(span=26).mean()
+        result['macd_line'] = ema12 - ema26
+        result['signal_line'] = result['macd_line'].ewm(span=9).mean()
+        result['histogram'] = result['macd_line'] - result['signal_line']
+
+    return result
+
+
+def build_chart_figure(data, symbol, timeframe, indicators):
+    """Строит фигуру Plotly со свечами и выбранными индикаторами"""
+    values = compute_indicators(data['close'], indicators)
+
+    # Определяем количество подграфиков
+    has_separate_indicators = indicators.get('rsi') or indicators.get('macd')
+
+    if has_separate_indicators:
+        subplot_rows = 2
+        row_heights = [0.7, 0.3]
+    else:
+        subplot_rows = 1
+        row_heights = [1]
+
+    # Создаем подграфики
+    fig = make_subplots(rows=subplot_rows, cols=1,
+                        shared_xaxes=True,
+                        vertical_spacing=0.05,
+                        row_heights=row_heights)
+
+    # Добавляем свечной график
+    fig.add_trace(
+        go.Candlestick(
+            x=data['timestamp'],
+            open=data['open'],
+            high=data['high'],
+            low=data['low'],
+            close=data['close'],
+            name="OHLC",
+            increasing_line_color='#26A69A',  # Зеленый цвет для роста
+            decreasing_line_color='#EF5350',  # Красный цвет для падения
+            increasing_fillcolor='rgba(38, 166, 154, 0.6)',  # Полупрозрачный зеленый
+            decreasing_fillcolor='rgba(239, 83, 80, 0.6)'  # Полупрозрачный красный
+        ),
+        row=1, col=1
+    )
+
+    if indicators.get('ma'):
+        fig.add_trace(
+            go.Scatter(
+                x=data['timestamp'],
+                y=values['ma20'],
+                line=dict(width=1.5, color='#FFD600'),  # Яркий желтый для контраста
+                name="MA 20"
+            ),
+            row=1, col=1
+        )
+
+    if indicators.get('ema'):
+        fig.add_trace(
+            go.Scatter(
+                x=data['timestamp'],
+                y=values['ema14'],
+                line=dict(width=1.5, color='#42A5F5'),  # Яркий синий для контраста
+                name="EMA 14"
+            ),
+            row=1, col=1
+        )
+
+    if indicators.get('bollinger'):
+        # Верхняя полоса
+        fig.add_trace(
+            go.Scatter(
+                x=data['timestamp'],
+                y=values['upper_band'],
+                line=dict(width=1, color='rgba(173, 216, 230, 0.7)'),
+                name="Upper BB"
+            ),
+            row=1, col=1
+        )
+
+        # Нижняя полоса
+        fig.add_trace(
+            go.Scatter(
+                x=data['timestamp'],
+                y=values['lower_band'],
+                line=dict(width=1, color='rgba(173, 216, 230, 0.7)'),
+                fill='tonexty',
+                fillcolor='rgba(173, 216, 230, 0.2)',
+                name="Lower BB"
+            ),
+            row=1, col=1
+        )
+
+    if indicators.get('rsi'):
+        fig.add_trace(
+            go.Scatter(
+                x=data['timestamp'],
+                y=values['rsi'],
+                line=dict(width=1.5, color='#EC407A'),  # Яркий розовый для контраста
+                name="RSI (14)"
+            ),
+            row=2, col=1
+        )
+
+        # Линии уровней RSI
+        fig.add_hline(y=70, line_width=1, line_color='rgba(255, 255, 255, 0.7)',
+                      line_dash="dash", row=2, col=1)
+        fig.add_hline(y=30, line_width=1, line_color='rgba(255, 255, 255, 0.7)',
+                      line_dash="dash", row=2, col=1)
+
+        # Задаем диапазон для RSI
+        fig.update_yaxes(range=[0, 100], row=2, col=1)
+
+    if indicators.get('macd'):
+        # MACD линия
+        fig.add_trace(
+            go.Scatter(
+                x=data['timestamp'],
+                y=values['macd_line'],
+                line=dict(width=1.5, color='#42A5F5'),  # Яркий синий
+                name="MACD"
+            ),
+            row=2, col=1
+        )
+
+        # Сигнальная линия
+        fig.add_trace(
+            go.Scatter(
+                x=data['timestamp'],
+                y=values['signal_line'],
+                line=dict(width=1.5, color='#FFD600'),  # Яркий желтый
+                name="Signal"
+            ),
+            row=2, col=1
+        )
+
+        # Гистограмма: цвет столбцов по знаку без цикла по Python-значениям
+        colors = np.where(values['histogram'].to_numpy() >= 0, '#26A69A', '#EF5350')
+        fig.add_trace(
+            go.Bar(
+                x=data['timestamp'],
+                y=values['histogram'],
+                marker_color=colors,
+                name="Histogram"
+            ),
+            row=2, col=1
+        )
+
+    # Настраиваем внешний вид графика
+    fig.update_layout(
+        template="plotly_dark",
+        paper_bgcolor='rgba(25, 25, 35, 1)',  # Более темный фон
+        plot_bgcolor='rgba(25, 25, 35, 1)',  # Более темный фон
+        title=dict(
+            text=f"{symbol} Price Chart ({timeframe})",
+            font=dict(size=20, color='white')  # Белый цвет для заголовка
+        ),
+        legend=dict(
+            bgcolor='rgba(25, 25, 35, 0.8)',
+            bordercolor='rgba(255, 255, 255, 0.3)',
+            borderwidth=1,
+            font=dict(color="white")  # Белый цвет для текста легенды
+        ),
+        hovermode="x unified",
+        hoverdistance=100,
+        spikedistance=1000,
+        xaxis=dict(
+            showspikes=True,
+            spikesnap="cursor",
+            spikemode="across",
+            spikethickness=1,
+            spikecolor="rgba(255, 255, 255, 0.7)",
+            showgrid=True,
+            gridcolor='rgba(255, 255, 255, 0.2)',
+            tickfont=dict(color="white")  # Белый цвет для подписей по оси X
+        ),
+        yaxis=dict(
+            showspikes=True,
+            spikesnap="cursor",
+            spikemode="across",
+            spikethickness=1,
+            spikecolor="rgba(255, 255, 255, 0.7)",
+            showgrid=True,
+            gridcolor='rgba(255, 255, 255, 0.2)',
+            tickfont=dict(color="white")  # Белый цвет для подписей по оси Y
+        ),
+        margin=dict(l=5, r=5, t=40, b=5),  # Уменьшаем отступы графика
+        autosize=True,  # Автоматическое изменение размера
+    )
+
+    # Добавляем подписи для подграфиков с белым цветом
+    if subplot_rows > 1:
+        fig.update_yaxes(title_text="Price", title_font=dict(color="white"), row=1, col=1)
+
+        if indicators.get('rsi') and not indicators.get('macd'):
+            fig.update_yaxes(title_text="RSI", title_font=dict(color="white"), row=2, col=1)
+        elif not indicators.get('rsi') and indicators.get('macd'):
+            fig.update_yaxes(title_text="MACD", title_font=dict(color="white"), row=2, col=1)
+        else:
+            fig.update_yaxes(title_text="Indicators", title_font=dict(color="white"), row=2, col=1)
+
+        # Белый цвет для подписей на оси Y второй диаграммы
+        fig.update_yaxes(tickfont=dict(color="white"), row=2, col=1)
+
+    return fig
+
+
+def build_chart_html(candles, symbol, timeframe, indicators):
+    """Задача пула: строит график по свечному массиву и сериализует его в HTML"""
+    data = candles_to_dataframe(candles)
+    fig = build_chart_figure(data, symbol, timeframe, indicators)
+    return plot(fig, output_type='div', include_plotlyjs='cdn', config={'responsive': True})
@@ -7,20 +7,27 @@ from PyQt5.QtCore import Qt, QDateTime, QSize, pyqtSignal, QStringListModel, QPr
 from PyQt5.QtGui import QIcon
 from PyQt5.QtWebEngineWidgets import QWebEngineView
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 from plotly.offline import plot
 import pandas as pd
 import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+
+from core.compute_service import ComputeService
+from core.data_manager import merge_candles
+from core.integrity import IntegrityChecker
+from core.profiler import profiled
+from core.startup import startup
+from core.exporter import DataExporter, EXPORT_FORMATS, DEFAULT_EXPORT_FORMAT
+from ui.chart_builder import build_chart_html
 
 
 class PairSelector(QFrame):
     pairSelected = pyqtSignal(str)
 
-    def __init__(self, api_client, parent=None):
+    def __init__(self, request_queue, parent=None):
         super().__init__(parent)
-        self.api_client = api_client
+        self.request_queue = request_queue
         self.pairs = []
         self.init_ui()
         self.load_pairs()
@@ -71,9 +78,18 @@ class PairSelector(QFrame):
 
 
     def load_pairs(self):
-        """Загружает список пар с биржи"""
-        # Запустим асинхронную загрузку
-        self.pairs = self.api_client.fetch_markets()
+        """Запускает загрузку списка пар с биржи задачей очереди: интерфейс не ждет ответа"""
+        self.pair_input.setPlaceholderText("Loading trading pairs...")
+        self.request_queue.add_request('fetch_markets', callback=self._on_pairs_loaded, priority=0)
+
+    def _on_pairs_loaded(self, data, error):
+        """Callback задачи fetch_markets (главный поток)"""
+        self.pair_input.setPlaceholderText("Enter or select trading pair...")
+        if error:
+            print(f"Error loading trading pairs: {error}")
+            return
+        startup.mark('markets_loaded')
+        self.pairs = data
         if self.pairs is not None:
             # Создаем списки для интерфейса
             all_pairs = self.pairs['symbol'].tolist()
@@ -209,11 +225,25 @@ class IndicatorPanel(QFrame):
 
 
 class InfoTab(QWidget):
-    def __init__(self, api_client, request_queue):
+    def __init__(self, api_client, request_queue, compute_service=None):
         super().__init__()
         self.api_client = api_client
         self.request_queue = request_queue
+        # Пул процессов для индикаторов, сериализации графиков и экспорта
+        self.compute_service = compute_service or ComputeService(max_workers=0)
+        self._chart_generation = 0  # Номер последнего запрошенного построения графика
+        # Фоновый экспорт данных: ID задания -> (metadata, is_selected)
+        self.exporter = DataExporter(parent=self)
+        self.exporter.progress_updated.connect(self._on_export_progress)
+        self.exporter.export_finished.connect(self._on_export_finished)
+        self._export_jobs = {}
+        # Пропуски в загруженном ряду догружаются фоновыми задачами
+        self.integrity = IntegrityChecker(request_queue, api_client.storage, api_client.listing_index)
+        self._repair_pending = 0
+        self._repair_merged = False
         self.data = None  # Для хранения текущих данных
+        self.exchange = "kucoin"  # Только KuCoin
+        self.data_exchange = None  # Биржа, с которой загружен self.data
         self.current_symbol = "BTC/USDT"  # Пара по умолчанию
         self.data_loaded = False  # Флаг загрузки данных
         self.init_ui()
@@ -252,7 +282,7 @@ class InfoTab(QWidget):
         pair_label = QLabel("Trading Pair")
         pair_label.setObjectName("controlLabel")
         pair_label.setMaximumHeight(16)  # Уменьшаем высоту метки
-        self.pair_selector = PairSelector(self.api_client)
+        self.pair_selector = PairSelector(self.request_queue)
         self.pair_selector.pairSelected.connect(self.on_pair_selected)
         self.pair_selector.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Fixed)
         self.pair_selector.setMinimumHeight(30)  # Добавляем минимальную высоту
@@ -408,6 +438,7 @@ class InfoTab(QWidget):
         if symbol != self.current_symbol:
             self.current_symbol = symbol
             self.data = None  # Сбрасываем текущие данные при смене пары
+            self.data_exchange = None
             self.data_loaded = False
             self.load_data()
 
@@ -434,13 +465,14 @@ class InfoTab(QWidget):
         html = plot(fig, output_type='div', include_plotlyjs='cdn')
         self.browser.setHtml(html)
 
-    def load_data(self, append_mode=False, direction=None):
+    def load_data(self, append_mode=False, direction=None, since=None):
         """
         Загружает данные для выбранной пары и периода
         
         Parameters:
         - append_mode: если True, добавляет данные к существующим
         - direction: 'prev' или 'next' для загрузки предыдущего или следующего периода
+        - since: точное время начала вместо даты из UI (например, начало истории пары)
         """
         symbol = self.current_symbol
         timeframe = self.timeframe_combo.currentText()
@@ -464,6 +496,8 @@ class InfoTab(QWidget):
             else:
                 # Если направление не указано, используем стандартную дату
                 since_date = self.date_edit.date().toPyDate()
+        elif since is not None:
+            since_date = since
         else:
             # При первичной загрузке используем дату из UI
             since_date = self.date_edit.date().toPyDate()
@@ -479,8 +513,8 @@ class InfoTab(QWidget):
         # Детальное логирование
         print(f"DEBUG: Загружаем {symbol} с таймфреймом {timeframe} с {since_date}, append_mode={append_mode}, direction={direction}")
 
-        if hasattr(self.parent(), "statusBar"):
-            self.parent().statusBar().showMessage(f"Загрузка {symbol}, таймфрейм: {timeframe}")
+        if hasattr(self.window(), "statusBar"):
+            self.window().statusBar().showMessage(f"Загрузка {symbol}, таймфрейм: {timeframe}")
 
         # Показываем загрузочное сообщение с деталями
         if not append_mode:
@@ -520,13 +554,14 @@ class InfoTab(QWidget):
         limit = self._get_limit_for_timeframe(timeframe)
 
         # Добавляем запрос в очередь
+        exchange = self.exchange
         task_id = self.request_queue.add_request(
             task_type="fetch_ohlcv",
-            exchange="kucoin",  # Только KuCoin
+            exchange=exchange,
             symbol=symbol,
             timeframe=timeframe,
             since=since_date,
-            callback=lambda data, error: self.update_chart(data, error, append_mode, direction),
+            callback=lambda data, error: self.update_chart(data, error, append_mode, direction, exchange),
             limit=limit
         )
         print(f"DEBUG: Запрос добавлен в очередь, ID задачи: {task_id}")
@@ -605,7 +640,8 @@ class InfoTab(QWidget):
                     'ADA/USDT', 'SHIB/USDT', 'TRX/USDT', 'DOT/USDT',
                     'AVAX/USDT', 'MATIC/USDT', 'LTC/USDT']
 
-    def update_chart(self, new_data, error=None, append_mode=False, direction=None):
+    @profiled("ui:update_chart")
+    def update_chart(self, new_data, error=None, append_mode=False, direction=None, exchange=None):
         print("DEBUG: Обновление графика с новыми данными")
         """
         Обновляет график с новыми данными
@@ -620,8 +656,15 @@ class InfoTab(QWidget):
         self.load_btn.setText("Load Data")
         self.load_btn.setEnabled(True)
 
-        if hasattr(self.parent(), "statusBar"):
-            self.parent().statusBar().clearMessage()
+        if hasattr(self.window(), "statusBar"):
+            self.window().statusBar().clearMessage()
+
+        # Очередь очищена: загруженный график остается, ошибку не показываем
+        if error == self.request_queue.CANCELLED:
+            if self.data_loaded:
+                self.load_prev_btn.setEnabled(True)
+                self.load_next_btn.setEnabled(True)
+            return
 
         if error:
             error_message = f"Ошибка: {error}"
@@ -654,8 +697,8 @@ class InfoTab(QWidget):
                 html = plot(error_fig, output_type='div', include_plotlyjs='cdn')
                 self.browser.setHtml(html)
 
-            if hasattr(self.parent(), "statusBar"):
-                self.parent().statusBar().showMessage(f"Ошибка: {error}", 5000)
+            if hasattr(self.window(), "statusBar"):
+                self.window().statusBar().showMessage(f"Ошибка: {error}", 5000)
 
             # Включаем навигационные кнопки, если данные уже были загружены
             if self.data_loaded:
@@ -664,6 +707,22 @@ class InfoTab(QWidget):
                 
             return
 
+        # Запрошенный период целиком до листинга пары (core.listing_index)
+        history_start = getattr(new_data, 'attrs', {}).get('history_start')
+        if history_start is not None and len(new_data) == 0:
+            start_date = datetime.fromtimestamp(history_start / 1000, tz=timezone.utc)
+            if append_mode and self.data is not None:
+                # Листание назад дошло до начала истории
+                self.load_next_btn.setEnabled(True)
+                if hasattr(self.window(), "statusBar"):
+                    self.window().statusBar().showMessage(
+                        f"Начало истории {self.current_symbol}: {start_date.strftime('%d.%m.%Y')}", 5000)
+            else:
+                # Загружаем график с первой свечи
+                self.date_edit.setDate(start_date.date())
+                self.load_data(since=start_date)
+            return
+
         # Обработка новых данных
         if new_data is not None and len(new_data) > 0:
             if append_mode and self.data is not None:
@@ -671,16 +730,13 @@ class InfoTab(QWidget):
                 print(f"Объединение данных. Старых: {len(self.data)}, новых: {len(new_data)}")
                 
                 # Объединяем датафреймы и удаляем дубликаты
-                combined_data = pd.concat([self.data, new_data])
-                combined_data = combined_data.drop_duplicates(subset=['timestamp']).sort_values('timestamp')
-                
-                # Сохраняем объединенные данные
-                self.data = combined_data
+                self.data = merge_candles(self.data, new_data)
                 print(f"Данные объединены. Итого: {len(self.data)} записей")
                 print(f"Диапазон данных: с {self.data['timestamp'].min()} по {self.data['timestamp'].max()}")
             else:
                 # Сохраняем новые данные
                 self.data = new_data
+                self.data_exchange = exchange or self.exchange
                 print(f"Новые данные загружены. Количество записей: {len(self.data)}")
                 print(f"Диапазон данных: с {self.data['timestamp'].min()} по {self.data['timestamp'].max()}")
 
@@ -696,6 +752,9 @@ class InfoTab(QWidget):
             
             # Обновляем график с учетом индикаторов
             self.update_indicators()
+
+            # Индикаторы через пропуск искажаются: догружаем недостающие свечи
+            self._repair_gaps()
         else:
             # Если нет новых данных и нет старых данных
             if not self.data_loaded:
@@ -715,6 +774,40 @@ class InfoTab(QWidget):
                 html = plot(no_data_fig, output_type='div', include_plotlyjs='cdn')
                 self.browser.setHtml(html)
 
+    def _repair_gaps(self):
+        """Ставит в фон догрузку пропусков текущего ряда"""
+        exchange = self.data_exchange or self.exchange
+        symbol = self.current_symbol
+        timeframe = self.timeframe_combo.currentText()
+        try:
+            gaps = self.integrity.find_gaps(exchange, symbol, timeframe, df=self.data)
+        except Exception as e:
+            print(f"Error checking series integrity: {e}")
+            return
+        if not gaps:
+            return
+
+        scheduled = self.integrity.repair(
+            exchange, symbol, timeframe, gaps,
+            callback=lambda data, error: self._on_gap_repaired(symbol, timeframe, data, error))
+        self._repair_pending += scheduled
+        if scheduled and hasattr(self.window(), "statusBar"):
+            self.window().statusBar().showMessage(
+                f"Пропусков в данных: {len(gaps)}, догружаем {scheduled} стр.", 5000)
+
+    def _on_gap_repaired(self, symbol, timeframe, data, error):
+        """Добавляет догруженные свечи в ряд; график перестраивается после последней страницы"""
+        self._repair_pending = max(0, self._repair_pending - 1)
+        same_series = symbol == self.current_symbol and timeframe == self.timeframe_combo.currentText()
+        if not error and data is not None and len(data) > 0 and self.data is not None and same_series:
+            self.data = merge_candles(self.data, data)
+            self._repair_merged = True
+
+        if self._repair_pending == 0 and self._repair_merged:
+            self._repair_merged = False
+            self._update_data_range_label()
+            self.update_indicators()
+
     def _update_data_range_label(self):
         """Обновляет метку с информацией о диапазоне загруженных данных"""
         if self.data is not None and len(self.data) > 0:
@@ -725,335 +818,137 @@ class InfoTab(QWidget):
         else:
             self.data_range_label.setText("No data loaded")
 
+    @profiled("ui:update_indicators")
     def update_indicators(self):
         if self.data is None:
             return
 
-        data = self.data
-        symbol = self.current_symbol
-
-        # Определяем количество подграфиков
-        subplot_rows = 1
-        has_separate_indicators = self.indicator_panel.rsi_check.isChecked() or self.indicator_panel.macd_check.isChecked()
-
-        if has_separate_indicators:
-            subplot_rows = 2
-            row_heights = [0.7, 0.3]
-        else:
-            subplot_rows = 1
-            row_heights = [1]
-
-        # Создаем подграфики
-        fig = make_subplots(rows=subplot_rows, cols=1,
-                            shared_xaxes=True,
-                            vertical_spacing=0.05,
-                            row_heights=row_heights)
-
-        # Добавляем свечной график
-        fig.add_trace(
-            go.Candlestick(
-                x=data['timestamp'],
-                open=data['open'],
-                high=data['high'],
-                low=data['low'],
-                close=data['close'],
-                name="OHLC",
-                increasing_line_color='#26A69A',  # Зеленый цвет для роста
-                decreasing_line_color='#EF5350',  # Красный цвет для падения
-                increasing_fillcolor='rgba(38, 166, 154, 0.6)',  # Полупрозрачный зеленый
-                decreasing_fillcolor='rgba(239, 83, 80, 0.6)'  # Полупрозрачный красный
-            ),
-            row=1, col=1
-        )
-
-        # Если выбран индикатор MA
-        if self.indicator_panel.ma_check.isChecked():
-            # Вычисляем простую скользящую среднюю за 20 периодов
-            ma20 = data['close'].rolling(window=20).mean()
-            fig.add_trace(
-                go.Scatter(
-                    x=data['timestamp'],
-                    y=ma20,
-                    line=dict(width=1.5, color='#FFD600'),  # Яркий желтый для контраста
-                    name="MA 20"
-                ),
-                row=1, col=1
-            )
-
-        # Если выбран индикатор EMA
-        if self.indicator_panel.ema_check.isChecked():
-            # Вычисляем экспоненциальную скользящую среднюю за 14 периодов
-            ema14 = data['close'].ewm(span=14).mean()
-            fig.add_trace(
-                go.Scatter(
-                    x=data['timestamp'],
-                    y=ema14,
-                    line=dict(width=1.5, color='#42A5F5'),  # Яркий синий для контраста
-                    name="EMA 14"
-                ),
-                row=1, col=1
-            )
-
-        # Если выбраны полосы Боллинджера
-        if self.indicator_panel.bollinger_check.isChecked():
-            # Вычисляем полосы Боллинджера
-            ma20 = data['close'].rolling(window=20).mean()
-            std20 = data['close'].rolling(window=20).std()
-            upper_band = ma20 + 2 * std20
-            lower_band = ma20 - 2 * std20
-
-            # Верхняя полоса
-            fig.add_trace(
-                go.Scatter(
-                    x=data['timestamp'],
-                    y=upper_band,
-                    line=dict(width=1, color='rgba(173, 216, 230, 0.7)'),
-                    name="Upper BB"
-                ),
-                row=1, col=1
-            )
-
-            # Нижняя полоса
-            fig.add_trace(
-                go.Scatter(
-                    x=data['timestamp'],
-                    y=lower_band,
-                    line=dict(width=1, color='rgba(173, 216, 230, 0.7)'),
-                    fill='tonexty',
-                    fillcolor='rgba(173, 216, 230, 0.2)',  # Увеличил непрозрачность заливки
-                    name="Lower BB"
-                ),
-                row=1, col=1
-            )
-
-        # Если выбран RSI
-        if self.indicator_panel.rsi_check.isChecked() and subplot_rows > 1:
-            # Вычисляем RSI
-            delta = data['close'].diff()
-            gain = delta.where(delta > 0, 0)
-            loss = -delta.where(delta < 0, 0)
-
-            avg_gain = gain.rolling(window=14).mean()
-            avg_loss = loss.rolling(window=14).mean()
-
-            rs = avg_gain / avg_loss
-            rsi = 100 - (100 / (1 + rs))
-
-            fig.add_trace(
-                go.Scatter(
-                    x=data['timestamp'],
-                    y=rsi,
-                    line=dict(width=1.5, color='#EC407A'),  # Яркий розовый для контраста
-                    name="RSI (14)"
-                ),
-                row=2, col=1
-            )
-
-            # Добавляем линии уровней RSI с более заметным цветом
-            fig.add_hline(y=70, line_width=1, line_color='rgba(255, 255, 255, 0.7)',
-                          line_dash="dash", row=2, col=1)
-            fig.add_hline(y=30, line_width=1, line_color='rgba(255, 255, 255, 0.7)',
-                          line_dash="dash", row=2, col=1)
-
-            # Задаем диапазон для RSI
-            fig.update_yaxes(range=[0, 100], row=2, col=1)
-
-        # Если выбран MACD
-        if self.indicator_panel.macd_check.isChecked() and subplot_rows > 1:
-            # Вычисляем MACD
-            ema12 = data['close'].ewm(span=12).mean()
-            ema26 = data['close'].ewm(span=26).mean()
-            macd_line = ema12 - ema26
-            signal_line = macd_line.ewm(span=9).mean()
-            histogram = macd_line - signal_line
-
-            # MACD линия
-            fig.add_trace(
-                go.Scatter(
-                    x=data['timestamp'],
-                    y=macd_line,
-                    line=dict(width=1.5, color='#42A5F5'),  # Яркий синий
-                    name="MACD"
-                ),
-                row=2, col=1
-            )
-
-            # Сигнальная линия
-            fig.add_trace(
-                go.Scatter(
-                    x=data['timestamp'],
-                    y=signal_line,
-                    line=dict(width=1.5, color='#FFD600'),  # Яркий желтый
-                    name="Signal"
-                ),
-                row=2, col=1
-            )
-
-            # Гистограмма с более яркими цветами
-            colors = ['#26A69A' if val >= 0 else '#EF5350' for val in histogram]
-            fig.add_trace(
-                go.Bar(
-                    x=data['timestamp'],
-                    y=histogram,
-                    marker_color=colors,
-                    name="Histogram"
-                ),
-                row=2, col=1
-            )
+        indicators = {
+            'ma': self.indicator_panel.ma_check.isChecked(),
+            'ema': self.indicator_panel.ema_check.isChecked(),
+            'rsi': self.indicator_panel.rsi_check.isChecked(),
+            'macd': self.indicator_panel.macd_check.isChecked(),
+            'bollinger': self.indicator_panel.bollinger_check.isChecked(),
+        }
 
-        # Настраиваем внешний вид графика
-        timeframe = self.timeframe_combo.currentText()
-        fig.update_layout(
-            template="plotly_dark",
-            paper_bgcolor='rgba(25, 25, 35, 1)',  # Более темный фон
-            plot_bgcolor='rgba(25, 25, 35, 1)',  # Более темный фон
-            title=dict(
-                text=f"{symbol} Price Chart ({timeframe})",
-                font=dict(size=20, color='white')  # Белый цвет для заголовка
-            ),
-            legend=dict(
-                bgcolor='rgba(25, 25, 35, 0.8)',
-                bordercolor='rgba(255, 255, 255, 0.3)',  # Увеличил контраст рамки
-                borderwidth=1,
-                font=dict(color="white")  # Белый цвет для текста легенды
-            ),
-            hovermode="x unified",
-            hoverdistance=100,
-            spikedistance=1000,
-            xaxis=dict(
-                showspikes=True,
-                spikesnap="cursor",
-                spikemode="across",
-                spikethickness=1,
-                spikecolor="rgba(255, 255, 255, 0.7)",  # Более заметная линия
-                showgrid=True,
-                gridcolor='rgba(255, 255, 255, 0.2)',  # Увеличил контраст сетки
-                tickfont=dict(color="white")  # Белый цвет для подписей по оси X
-            ),
-            yaxis=dict(
-                showspikes=True,
-                spikesnap="cursor",
-                spikemode="across",
-                spikethickness=1,
-                spikecolor="rgba(255, 255, 255, 0.7)",  # Более заметная линия
-                showgrid=True,
-                gridcolor='rgba(255, 255, 255, 0.2)',  # Увеличил контраст сетки
-                tickfont=dict(color="white")  # Белый цвет для подписей по оси Y
-            ),
-            margin=dict(l=10, r=10, t=50, b=10),
+        # Индикаторы и HTML графика строятся в пуле процессов; результат
+        # устаревшего построения (если параметры успели смениться) отбрасывается
+        self._chart_generation += 1
+        generation = self._chart_generation
+        future = self.compute_service.submit(
+            build_chart_html, self.data,
+            self.current_symbol, self.timeframe_combo.currentText(), indicators
         )
+        self._deliver_future(
+            future, lambda html, error: self._on_chart_html_ready(generation, html, error))
 
-        # Добавляем подписи для подграфиков с белым цветом
-        if subplot_rows > 1:
-            fig.update_yaxes(title_text="Price", title_font=dict(color="white"), row=1, col=1)
+    def _deliver_future(self, future, callback):
+        """Передает результат Future в callback(result, error) в главном потоке"""
+        def on_done(done_future):
+            try:
+                result, error = done_future.result(), None
+            except Exception as e:
+                result, error = None, str(e)
+            self.request_queue.result_dispatcher.submit(callback, result, error)
 
-            if self.indicator_panel.rsi_check.isChecked() and not self.indicator_panel.macd_check.isChecked():
-                fig.update_yaxes(title_text="RSI", title_font=dict(color="white"), row=2, col=1)
-            elif not self.indicator_panel.rsi_check.isChecked() and self.indicator_panel.macd_check.isChecked():
-                fig.update_yaxes(title_text="MACD", title_font=dict(color="white"), row=2, col=1)
-            else:
-                fig.update_yaxes(title_text="Indicators", title_font=dict(color="white"), row=2, col=1)
+        future.add_done_callback(on_done)
 
-            # Добавляем белый цвет для подписей на оси Y второй диаграммы
-            fig.update_yaxes(tickfont=dict(color="white"), row=2, col=1)
+    @profiled("ui:chart_html_ready")
+    def _on_chart_html_ready(self, generation, html, error):
+        """Отображает построенный график"""
+        if generation != self._chart_generation:
+            return
 
-        # В конце метода обновляем настройки компоновки
-        if self.data is not None:
-            fig.update_layout(
-                template="plotly_dark",
-                paper_bgcolor='rgba(25, 25, 35, 1)',  # Более темный фон
-                plot_bgcolor='rgba(25, 25, 35, 1)',  # Более темный фон
-                title=dict(
-                    text=f"{symbol} Price Chart ({timeframe})",
-                    font=dict(size=20, color='white')  # Белый цвет для заголовка
-                ),
-                legend=dict(
-                    bgcolor='rgba(25, 25, 35, 0.8)',
-                    bordercolor='rgba(255, 255, 255, 0.3)',  # Увеличил контраст рамки
-                    borderwidth=1,
-                    font=dict(color="white")  # Белый цвет для текста легенды
-                ),
-                hovermode="x unified",
-                hoverdistance=100,
-                spikedistance=1000,
-                xaxis=dict(
-                    showspikes=True,
-                    spikesnap="cursor",
-                    spikemode="across",
-                    spikethickness=1,
-                    spikecolor="rgba(255, 255, 255, 0.7)",  # Более заметная линия
-                    showgrid=True,
-                    gridcolor='rgba(255, 255, 255, 0.2)',  # Увеличил контраст сетки
-                    tickfont=dict(color="white")  # Белый цвет для подписей по оси X
-                ),
-                yaxis=dict(
-                    showspikes=True,
-                    spikesnap="cursor",
-                    spikemode="across",
-                    spikethickness=1,
-                    spikecolor="rgba(255, 255, 255, 0.7)",  # Более заметная линия
-                    showgrid=True,
-                    gridcolor='rgba(255, 255, 255, 0.2)',  # Увеличил контраст сетки
-                    tickfont=dict(color="white")  # Белый цвет для подписей по оси Y
-                ),
-                margin=dict(l=5, r=5, t=40, b=5),  # Уменьшаем отступы графика
-                autosize=True,  # Автоматическое изменение размера
-            )
+        if error:
+            print(f"DEBUG: Ошибка построения графика: {error}")
+            if hasattr(self.window(), "statusBar"):
+                self.window().statusBar().showMessage(f"Ошибка построения графика: {error}", 5000)
+            return
 
-        # Отображаем график
-        html = plot(fig, output_type='div', include_plotlyjs='cdn', config={'responsive': True})
         self.browser.setHtml(html)
 
-        # Устанавливаем фокус на график
-
     def save_data_json(self):
-        """Saves all current data to a JSON file"""
+        """Saves all current data to a file in the format chosen under Settings → Export"""
         if self.data is None or self.data.empty:
             QMessageBox.warning(self, "No Data", "There is no data to save.")
             return
 
+        file_format = self._get_export_format()
+        _, extension, file_filter = EXPORT_FORMATS[file_format]
+
         # Get path for saving with improved filename
         default_dir = os.path.expanduser("~/crypto_data")
         os.makedirs(default_dir, exist_ok=True)
 
-        default_filename = self._generate_filename(is_selected=False)
+        default_filename = self._generate_filename(is_selected=False, extension=extension)
         filepath, _ = QFileDialog.getSaveFileName(
             self,
             "Save Data",
             os.path.join(default_dir, default_filename),
-            "JSON Files (*.json)"
+            file_filter
         )
 
         if filepath:
-            try:
-                # Create metadata
-                metadata = {
-                    'symbol': self.current_symbol,
-                    'timeframe': self.timeframe_combo.currentText(),
-                    'start_date': self.data.index.min().strftime('%Y-%m-%d %H:%M:%S'),
-                    'end_date': self.data.index.max().strftime('%Y-%m-%d %H:%M:%S'),
-                    'exported_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'candle_count': len(self.data)
-                }
+            # Create metadata
+            metadata = {
+                'symbol': self.current_symbol,
+                'timeframe': self.timeframe_combo.currentText(),
+                'start_date': pd.to_datetime(self.data['timestamp'].min()).strftime('%Y-%m-%d %H:%M:%S'),
+                'end_date': pd.to_datetime(self.data['timestamp'].max()).strftime('%Y-%m-%d %H:%M:%S'),
+                'exported_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'candle_count': len(self.data),
+                'format': file_format
+            }
 
-                # Prepare export data
-                export_data = {
-                    'metadata': metadata,
-                    'data': self.data.reset_index().to_dict('records')
-                }
+            self._start_export(self.data, filepath, file_format, metadata, is_selected=False)
 
-                # Save to file
-                with open(filepath, 'w') as f:
-                    json.dump(export_data, f, indent=2)
+    def _get_export_format(self):
+        """Returns the export format chosen under Settings → Export"""
+        settings_tab = getattr(self.window(), "settings_tab", None)
+        if settings_tab is None:
+            return DEFAULT_EXPORT_FORMAT
+        return settings_tab.export_format.currentData() or DEFAULT_EXPORT_FORMAT
 
-                if hasattr(self.parent(), "statusBar"):
-                    self.parent().statusBar().showMessage(f"Data saved to {filepath}")
+    def _start_export(self, df, filepath, file_format, metadata, is_selected):
+        """Starts a chunked export in a background thread"""
+        job_id = self.exporter.start(df, filepath, file_format, metadata)
+        self._export_jobs[job_id] = (df, metadata, is_selected)
 
-                # Check if server upload is needed
-                self._send_to_server_if_needed(filepath, export_data)
+        if hasattr(self.window(), "statusBar"):
+            self.window().statusBar().showMessage(f"Exporting data to {filepath}...")
+
+    def _on_export_progress(self, job_id, done, total):
+        """Shows export progress in the status bar"""
+        if total and hasattr(self.window(), "statusBar"):
+            self.window().statusBar().showMessage(
+                f"Exporting data: {done}/{total} rows ({int(done / total * 100)}%)")
+
+    def _on_export_finished(self, job_id, filepath, error):
+        """Handler for completion of a background export"""
+        df, metadata, is_selected = self._export_jobs.pop(job_id, (None, {}, False))
+
+        if error:
+            print(f"DEBUG: Error in save operation: {error}")
+            if is_selected:
+                if hasattr(self.window(), "statusBar"):
+                    self.window().statusBar().showMessage(f"Error saving data: {error}")
+            else:
+                QMessageBox.critical(self, "Error", f"Failed to save data: {error}")
+            return
+
+        print(f"DEBUG: Successfully saved data to {filepath}")
+
+        # Show feedback in status bar
+        if hasattr(self.window(), "statusBar"):
+            self.window().statusBar().showMessage(f"Data saved to {filepath}")
+
+        # Show toast notification for fast-save
+        if is_selected:
+            self.show_save_notification(filepath)
+
+        # Check if server upload is needed
+        self._send_to_server_if_needed(filepath, metadata, df)
 
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to save data: {str(e)}")
     def save_selected_data(self):
         """Saves only the selected/visible chart data range without confirmation"""
         if self.data is None or self.data.empty:
@@ -1092,7 +987,7 @@ class InfoTab(QWidget):
         # Run JavaScript to get selected range and pass to fast save handler
         self.browser.page().runJavaScript(script, self.on_fast_save_range_received)
 
-    def _generate_filename(self, is_selected=False):
+    def _generate_filename(self, is_selected=False, extension="json"):
         """Generate a descriptive filename that includes all required information"""
         if self.data is None or self.data.empty:
             return None
@@ -1106,7 +1001,7 @@ class InfoTab(QWidget):
 
         # Generate filename with all required information
         selection_tag = "selected" if is_selected else "full"
-        filename = f"{self.current_symbol.replace('/', '_')}_{self.timeframe_combo.currentText()}_{start_date}-{end_date}_{selection_tag}_{timestamp}.json"
+        filename = f"{self.current_symbol.replace('/', '_')}_{self.timeframe_combo.currentText()}_{start_date}-{end_date}_{selection_tag}_{timestamp}.{extension}"
 
         return filename
 
@@ -1114,16 +1009,16 @@ class InfoTab(QWidget):
         """Handler for receiving range data for fast save without confirmation"""
         print("DEBUG: Received range data for fast save:", range_data)
         if not range_data or not range_data.get('success', False):
-            if hasattr(self.parent(), "statusBar"):
-                self.parent().statusBar().showMessage("Failed to get selected range data")
+            if hasattr(self.window(), "statusBar"):
+                self.window().statusBar().showMessage("Failed to get selected range data")
             return
 
         try:
             # Extract the date range
             date_range = range_data.get('xRange', [])
             if not date_range or len(date_range) != 2:
-                if hasattr(self.parent(), "statusBar"):
-                    self.parent().statusBar().showMessage("Invalid range data received")
+                if hasattr(self.window(), "statusBar"):
+                    self.window().statusBar().showMessage("Invalid range data received")
                 return
 
             # Convert to timestamps
@@ -1135,8 +1030,8 @@ class InfoTab(QWidget):
                                     (pd.to_datetime(self.data['timestamp']) <= end_date)].copy()
 
             if filtered_df.empty:
-                if hasattr(self.parent(), "statusBar"):
-                    self.parent().statusBar().showMessage("No data in selected range")
+                if hasattr(self.window(), "statusBar"):
+                    self.window().statusBar().showMessage("No data in selected range")
                 return
 
             # Create metadata for export
@@ -1149,50 +1044,25 @@ class InfoTab(QWidget):
                 'exported_at': datetime.now().isoformat()
             }
 
-            # Convert DataFrame to serializable format - properly handle timestamps
-            filtered_df_copy = filtered_df.copy()
-            for column in filtered_df_copy.select_dtypes(include=['datetime64']).columns:
-                filtered_df_copy[column] = filtered_df_copy[column].astype(str)
-
-            # Now convert to records with timestamps as strings
-            records = filtered_df_copy.replace({pd.NA: None}).to_dict('records')
-
-            # Prepare export data
-            export_data = {
-                'metadata': metadata,
-                'data': records
-            }
-
             # Set default save location
             default_dir = os.path.expanduser("~/crypto_data")
             os.makedirs(default_dir, exist_ok=True)
 
             # Generate descriptive filename
-            filename = self._generate_filename(is_selected=True)
+            file_format = self._get_export_format()
+            metadata['format'] = file_format
+            filename = self._generate_filename(is_selected=True, extension=EXPORT_FORMATS[file_format][1])
             filepath = os.path.join(default_dir, filename)
 
             print(f"DEBUG: Starting to save data to {filepath}")
 
-            # Save with proper JSON serialization
-            with open(filepath, 'w') as f:
-                json.dump(export_data, f, indent=2)
-
-            print(f"DEBUG: Successfully saved data to {filepath}")
-
-            # Show feedback in status bar
-            if hasattr(self.parent(), "statusBar"):
-                self.parent().statusBar().showMessage(f"Data saved to {filepath}")
-
-            # Show toast notification
-            self.show_save_notification(filepath)
-
-            # Send to server if needed
-            self._send_to_server_if_needed(filepath, export_data)
+            # Chunked writing runs in a background thread
+            self._start_export(filtered_df, filepath, file_format, metadata, is_selected=True)
 
         except Exception as e:
             print(f"DEBUG: Error in save operation: {str(e)}")
-            if hasattr(self.parent(), "statusBar"):
-                self.parent().statusBar().showMessage(f"Error saving data: {str(e)}")
+            if hasattr(self.window(), "statusBar"):
+                self.window().statusBar().showMessage(f"Error saving data: {str(e)}")
 
     def show_save_notification(self, filepath):
         """Shows a notification when data is saved successfully"""
@@ -1229,14 +1099,17 @@ class InfoTab(QWidget):
             print(f"DEBUG: Error sending system notification: {str(e)}")
 
         # Показываем сообщение в статусной строке в любом случае
-        if hasattr(self.parent(), "statusBar"):
-            self.parent().statusBar().showMessage(f"Data saved to {filepath}", 5000)
+        if hasattr(self.window(), "statusBar"):
+            self.window().statusBar().showMessage(f"Data saved to {filepath}", 5000)
 
-    def _send_to_server_if_needed(self, local_filepath, export_data):
-        """Send data to remote server if configured in settings"""
+    def _send_to_server_if_needed(self, local_filepath, metadata, df=None):
+        """Send the exported file (or, over TCP, the candles themselves) to the server"""
         try:
-            # Get settings from main window
-            settings_tab = self.parent().settings_tab
+            # Get settings from main window; Settings is built on first open, and until
+            # then its defaults apply: save on the local machine only
+            settings_tab = getattr(self.window(), "settings_tab", None)
+            if settings_tab is None:
+                return
             save_locally = settings_tab.save_locally.isChecked()
 
             if not save_locally:  # If not save locally only
@@ -1245,36 +1118,40 @@ class InfoTab(QWidget):
                 port = settings_tab.port.value()
                 secure = settings_tab.secure.isChecked()
                 protocol = "https" if settings_tab.http_radio.isChecked() and secure else "http"
-                protocol = "tcp" if settings_tab.tcp_radio.isChecked() else protocol
                 api_path = settings_tab.api_path.text()
-
-                # Add to request queue for server upload with visualization in pipe tab
+                data = None
+                if settings_tab.tcp_radio.isChecked():
+                    # TCP streams the candles as binary frames over a persistent connection
+                    protocol = "tcps" if secure else "tcp"
+                    data = df
+
+                # Add to request queue for server upload with visualization in pipe tab;
+                # over HTTP the exported file itself is the payload
                 task_id = self.request_queue.add_request(
                     task_type="upload_data",
-                    data=export_data,
                     endpoint=f"{protocol}://{host}:{port}{api_path}",
+                    data=data,
                     callback=self._on_server_upload_complete,
-                    priority=5,  # High priority for uploads
-                    metadata={
-                        "symbol": self.current_symbol,
-                        "timeframe": self.timeframe_combo.currentText(),
-                        "filepath": local_filepath
-                    }
+                    lane="bulk",  # Background lane: never delays chart loads
+                    priority=5,
+                    metadata=dict(metadata, filepath=local_filepath)
                 )
 
-                if hasattr(self.parent(), "statusBar"):
-                    self.parent().statusBar().showMessage(f"Uploading data to server (Task ID: {task_id})")
+                if hasattr(self.window(), "statusBar"):
+                    self.window().statusBar().showMessage(f"Uploading data to server (Task ID: {task_id})")
 
         except Exception as e:
-            if hasattr(self.parent(), "statusBar"):
-                self.parent().statusBar().showMessage(f"Error preparing server upload: {str(e)}")
+            if hasattr(self.window(), "statusBar"):
+                self.window().statusBar().showMessage(f"Error preparing server upload: {str(e)}")
 
     def _on_server_upload_complete(self, result, error=None, metadata=None):
         """Callback for server upload completion"""
+        if metadata is None:
+            metadata = (result or {}).get('metadata', {})
         if error:
-            if hasattr(self.parent(), "statusBar"):
-                self.parent().statusBar().showMessage(f"Error uploading to server: {error}")
+            if hasattr(self.window(), "statusBar"):
+                self.window().statusBar().showMessage(f"Error uploading to server: {error}")
         else:
-            if hasattr(self.parent(), "statusBar"):
-                self.parent().statusBar().showMessage(
+            if hasattr(self.window(), "statusBar"):
+                self.window().statusBar().showMessage(
                     f"Successfully uploaded {metadata.get('symbol', 'data')} to server")
@@ -1,14 +1,45 @@
+import logging
+
 from PyQt5.QtWidgets import (QMainWindow, QTabWidget, QVBoxLayout, QWidget,
                              QStatusBar, QLabel, QFrame, QHBoxLayout, QSizePolicy,
                              QDesktopWidget, QApplication)
-from PyQt5.QtCore import Qt, QSize, QEvent
+from PyQt5.QtCore import Qt, QSize, QEvent, QTimer
 from PyQt5.QtGui import QIcon
 
-from ui.info_tab import InfoTab
-from ui.pipe_tab import PipeTab
-from ui.settings_tab import SettingsTab
-from core.api_client import ApiClient
-from core.request_queue import RequestQueue
+from ui.stall_watchdog import StallWatchdog
+from core.config import PROFILE_ON_START
+from core.profiler import profiler
+from core.startup import startup
+
+
+logger = logging.getLogger(__name__)
+
+
+class LazyTab(QWidget):
+    """
+    Вкладка, которая строится при первом показе
+
+    До этого на ее месте надпись-заглушка; factory() создает виджет вкладки.
+    """
+
+    def __init__(self, factory, parent=None):
+        super().__init__(parent)
+        self._factory = factory
+        self.widget = None
+        self._layout = QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self._placeholder = QLabel("Loading...")
+        self._placeholder.setAlignment(Qt.AlignCenter)
+        self._layout.addWidget(self._placeholder)
+
+    def ensure(self):
+        """Строит вкладку, если она еще не построена; возвращает ее виджет"""
+        if self.widget is None:
+            self.widget = self._factory()
+            self._layout.removeWidget(self._placeholder)
+            self._placeholder.deleteLater()
+            self._layout.addWidget(self.widget)
+        return self.widget
 
 
 class MainWindow(QMainWindow):
@@ -18,20 +49,86 @@ class MainWindow(QMainWindow):
         
         # Получаем размер экрана для адаптивной настройки
         screen_size = QDesktopWidget().availableGeometry().size()
-        self.resize(min(1200, screen_size.width() * 0.85), min(800, screen_size.height() * 0.85))
+        self.resize(int(min(1200, screen_size.width() * 0.85)), int(min(800, screen_size.height() * 0.85)))
         
         # Определяем, является ли экран высокого разрешения
         self.high_dpi = QApplication.primaryScreen().logicalDotsPerInch() > 120
         
-        # Создаём общие компоненты приложения
-        self.api_client = ApiClient()
-        self.request_queue = RequestQueue(self.api_client)
+        # Общие компоненты приложения создаются после первой отрисовки окна
+        # (_start_services): окно появляется, не дожидаясь импорта ccxt, pandas и plotly
+        self.storage = None
+        self.api_client = None
+        self.request_queue = None
+        self.compute_service = None
+        self.backfill_manager = None
+        self.metrics_exporter = None
+        self.info_tab = None
+        self.pipe_tab = None
+        self.settings_tab = None
+        self._painted = False
+        # Профилирование с запуска (KUCOIN_VIEWER_PROFILE); иначе включается в Settings
+        if PROFILE_ON_START:
+            profiler.start(trace_memory=PROFILE_ON_START == 'memory')
+        # Сторож цикла событий: зависания главного потока видны на вкладке Pipe
+        self.watchdog = StallWatchdog(parent=self)
 
         # Инициализация UI
         self.init_ui()
-        
-        # Следим за изменением размера окна
+
+        # Следим за изменением размера окна и первой отрисовкой
         self.installEventFilter(self)
+        startup.mark('window_created')
+
+    def _start_services(self):
+        """Создает общие компоненты и видимую вкладку; вызывается после первой отрисовки окна"""
+        from core.api_client import ApiClient
+        from core.compute_service import ComputeService
+        from core.metrics_export import start_metrics_export
+        from core.request_queue import RequestQueue
+
+        self.storage = self._create_storage()
+        self.api_client = ApiClient(storage=self.storage)
+        self.request_queue = RequestQueue(self.api_client)
+        self.compute_service = ComputeService()
+        self.backfill_manager = self._create_backfill_manager()
+        # HTTP-эндпоинт и файл метрик, если включены в настройках
+        self.metrics_exporter = start_metrics_export(self.request_queue)
+
+        # Обновляем статус API при изменении
+        self.request_queue.queue_status_changed.connect(self.update_api_status)
+        startup.mark('services_ready')
+
+        # Видимая вкладка строится сейчас, остальные - при первом переключении на них
+        self._on_tab_changed(self.tabs.currentIndex())
+        self.status_bar.showMessage("Connected to KuCoin")
+
+        self.watchdog.start()
+
+        # Продолжаем задания загрузки истории, прерванные при прошлом закрытии
+        if self.backfill_manager is not None:
+            self.backfill_manager.resume()
+        startup.mark('ready')
+
+    def _on_tab_changed(self, index):
+        if self.request_queue is None:
+            # Сервисы еще не созданы: видимую вкладку построит _start_services
+            return
+        self.lazy_tabs[index].ensure()
+
+    def _create_info_tab(self):
+        from ui.info_tab import InfoTab
+        self.info_tab = InfoTab(self.api_client, self.request_queue, self.compute_service)
+        return self.info_tab
+
+    def _create_pipe_tab(self):
+        from ui.pipe_tab import PipeTab
+        self.pipe_tab = PipeTab(self.request_queue, self.backfill_manager, self.watchdog)
+        return self.pipe_tab
+
+    def _create_settings_tab(self):
+        from ui.settings_tab import SettingsTab
+        self.settings_tab = SettingsTab(self)
+        return self.settings_tab
 
     def init_ui(self):
         # Создаем центральный виджет
@@ -75,18 +172,19 @@ class MainWindow(QMainWindow):
         tabs.setObjectName("mainTabs")
         tabs.setElideMode(Qt.ElideRight)  # Добавляем поддержку сокращения текста вкладок
 
-        # Создаем вкладки
-        self.info_tab = InfoTab(self.api_client, self.request_queue)
-        self.pipe_tab = PipeTab(self.request_queue)
-        self.settings_tab = SettingsTab(self)
+        # Вкладки строятся при первом показе (LazyTab)
+        self.tabs = tabs
+        self.lazy_tabs = [LazyTab(self._create_info_tab), LazyTab(self._create_pipe_tab),
+                          LazyTab(self._create_settings_tab)]
 
         # Добавляем вкладки в TabWidget с иконками
         icon_size = 24 if not self.high_dpi else 28
         tabs.setIconSize(QSize(icon_size, icon_size))
         
-        tabs.addTab(self.info_tab, QIcon("resources/icons/chart.png"), "Info")
-        tabs.addTab(self.pipe_tab, QIcon("resources/icons/pipe.png"), "Pipe")
-        tabs.addTab(self.settings_tab, QIcon("resources/icons/settings.png"), "Settings")
+        tabs.addTab(self.lazy_tabs[0], QIcon("resources/icons/chart.png"), "Info")
+        tabs.addTab(self.lazy_tabs[1], QIcon("resources/icons/pipe.png"), "Pipe")
+        tabs.addTab(self.lazy_tabs[2], QIcon("resources/icons/settings.png"), "Settings")
+        tabs.currentChanged.connect(self._on_tab_changed)
 
         # Добавляем TabWidget в основной layout
         main_layout.addWidget(tabs)
@@ -95,14 +193,12 @@ class MainWindow(QMainWindow):
         self.status_bar = QStatusBar()
         self.status_bar.setObjectName("statusBar")
         self.setStatusBar(self.status_bar)
-        self.status_bar.showMessage("Connected to KuCoin")
-
-        # Обновляем статус API при изменении
-        self.request_queue.queue_status_changed.connect(self.update_api_status)
+        self.status_bar.showMessage("Starting...")
 
     def update_api_status(self, stats):
         if stats["rate_limited"]:
-            self.api_status.setText(f"API: Rate Limited ({stats['reset_time']}s)")
+            limited = ", ".join(sorted(stats['rate_limits']))
+            self.api_status.setText(f"API: Rate Limited: {limited} ({stats['reset_time']}s)")
             self.api_status.setProperty("status", "error")
         else:
             self.api_status.setText("API: OK")
@@ -115,8 +211,50 @@ class MainWindow(QMainWindow):
     def eventFilter(self, obj, event):
         if event.type() == QEvent.Resize and obj is self:
             pass
+        elif event.type() == QEvent.Paint and obj is self and not self._painted:
+            self._painted = True
+            startup.mark('first_paint')
+            # Тяжелая инициализация - в следующем проходе цикла событий, когда окно уже на экране
+            QTimer.singleShot(0, self._start_services)
         return super().eventFilter(obj, event)
 
+    def _create_storage(self):
+        """Подключает хранилище истории свечей; без него приложение работает с кэшем"""
+        from core.data_manager import create_storage
+        try:
+            return create_storage()
+        except Exception:
+            logger.exception("Error opening candle storage", extra={'component': 'storage'})
+            return None
+
+    def _create_backfill_manager(self):
+        """Задания загрузки истории пишут свечи в хранилище; без него они недоступны"""
+        if self.storage is None:
+            return None
+        from core.backfill_jobs import BackfillManager
+        try:
+            return BackfillManager(self.request_queue)
+        except Exception:
+            logger.exception("Error opening backfill journal", extra={'component': 'backfill'})
+            return None
+
     def closeEvent(self, event):
-        self.request_queue.stop()
+        self.watchdog.stop()
+        if profiler.running:
+            # Профиль сессии не теряется при закрытии окна
+            try:
+                profiler.dump()
+            except Exception:
+                logger.exception("Error writing profile", extra={'component': 'profiler'})
+            profiler.stop()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+        if self.request_queue is not None:
+            self.request_queue.stop()
+        if self.backfill_manager is not None:
+            self.backfill_manager.journal.close()
+        if self.compute_service is not None:
+            self.compute_service.shutdown()
+        if self.storage is not None:
+            self.storage.close()
         event.accept()
\ No newline at end of file
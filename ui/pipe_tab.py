@@ -1,10 +1,19 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                             QPushButton, QProgressBar, QTableWidget,
-                             QTableWidgetItem, QHeaderView, QFrame,
-                             QGridLayout, QGroupBox, QSizePolicy, QScrollArea)
-from PyQt5.QtCore import Qt, QTimer, QSize
+                             QPushButton, QProgressBar, QTableView,
+                             QHeaderView, QFrame, QComboBox, QLineEdit,
+                             QGridLayout, QGroupBox, QSizePolicy, QScrollArea,
+                             QTableWidget, QTableWidgetItem, QDateEdit, QMessageBox,
+                             QPlainTextEdit)
+from PyQt5.QtCore import (Qt, QTimer, QSize, QAbstractTableModel, QModelIndex,
+                          QSortFilterProxyModel, QDate)
 from PyQt5.QtGui import QIcon, QColor, QFont, QPainter, QBrush
 
+from datetime import datetime, timezone
+
+from core import metrics
+from core.lanes import LANES
+from core.profiler import profiled
+
 
 class StatusCard(QFrame):
     def __init__(self, title, value="0", subtitle="", icon_path=None, parent=None):
@@ -48,10 +57,216 @@ class StatusCard(QFrame):
         self.style().polish(self)
 
 
+class RequestTableModel(QAbstractTableModel):
+    """Модель таблицы запросов поверх индекса задач RequestQueue"""
+
+    # (заголовок, ключ задачи)
+    COLUMNS = [
+        ("ID", 'id'),
+        ("Type", 'task_type'),
+        ("Status", 'status'),
+        ("Exchange", 'exchange'),
+        ("Symbol", 'symbol'),
+        ("Timeframe", 'timeframe'),
+        ("Priority", 'priority'),
+        ("Lane", 'lane'),
+        ("Progress", 'progress'),
+    ]
+    STATUS_COLUMN = 2
+    PROGRESS_COLUMN = 8
+    CENTERED_COLUMNS = {0, 2, 5, 6, 7, 8}
+
+    STATUS_COLORS = {
+        'completed': QColor('#4CAF50'),
+        'error': QColor('#F44336'),
+        'in_progress': QColor('#FFC107'),
+        'rate_limited': QColor('#9C27B0'),
+    }
+
+    def __init__(self, request_queue, parent=None):
+        super().__init__(parent)
+        self.request_queue = request_queue
+        self._tasks = []  # строка -> задача
+        self._rows = {}  # ID задачи -> строка
+        self._revision = -1
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section][0]
+        return None
+
+    def task_at(self, row):
+        """Возвращает задачу для строки модели"""
+        return self._tasks[row]
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        task = self._tasks[index.row()]
+        column = index.column()
+        key = self.COLUMNS[column][1]
+
+        if role == Qt.DisplayRole:
+            value = task.get(key)
+            if value is None:
+                return '-'
+            if column == self.STATUS_COLUMN:
+                return value.upper()
+            if column == self.PROGRESS_COLUMN:
+                return f"{value}%"
+            return str(value)
+
+        if role == Qt.UserRole:
+            # Сырые значения для сортировки (числа сортируются как числа)
+            value = task.get(key)
+            return value if value is not None else ''
+
+        if role == Qt.TextAlignmentRole and column in self.CENTERED_COLUMNS:
+            return Qt.AlignCenter
+
+        if role == Qt.ForegroundRole and column == self.STATUS_COLUMN:
+            return self.STATUS_COLORS.get(task.get('status'))
+
+        return None
+
+    def refresh(self):
+        """Применяет изменения задач с момента последнего обновления"""
+        revision, changed, removed_ids = self.request_queue.get_task_changes(self._revision)
+
+        if changed is None:
+            # Журнал изменений переполнен - перечитываем индекс целиком
+            self.beginResetModel()
+            self._tasks = self.request_queue.get_all_tasks()
+            self._rows = {task['id']: row for row, task in enumerate(self._tasks)}
+            self.endResetModel()
+            self._revision = revision
+            return
+
+        self._revision = revision
+        if removed_ids:
+            self._remove_tasks(removed_ids)
+        if not changed:
+            return
+
+        updated_rows = []
+        new_tasks = []
+        for task in changed:
+            row = self._rows.get(task['id'])
+            if row is None:
+                new_tasks.append(task)
+            else:
+                self._tasks[row] = task
+                updated_rows.append(row)
+
+        # dataChanged только для изменившихся строк, соседние строки объединяем в диапазоны
+        last_column = len(self.COLUMNS) - 1
+        updated_rows.sort()
+        start = prev = None
+        for row in updated_rows:
+            if start is None:
+                start = prev = row
+            elif row == prev + 1:
+                prev = row
+            else:
+                self.dataChanged.emit(self.index(start, 0), self.index(prev, last_column))
+                start = prev = row
+        if start is not None:
+            self.dataChanged.emit(self.index(start, 0), self.index(prev, last_column))
+
+        if new_tasks:
+            first = len(self._tasks)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_tasks) - 1)
+            for task in new_tasks:
+                self._rows[task['id']] = len(self._tasks)
+                self._tasks.append(task)
+            self.endInsertRows()
+
+    def _remove_tasks(self, task_ids):
+        """Удаляет строки задач, вытесненных из истории очереди"""
+        rows = sorted((self._rows[task_id] for task_id in task_ids if task_id in self._rows),
+                      reverse=True)
+        if not rows:
+            return
+
+        # Удаляем смежные диапазоны строк, начиная с конца
+        end = start = rows[0]
+        for row in rows[1:] + [None]:
+            if row is not None and row == start - 1:
+                start = row
+                continue
+            self.beginRemoveRows(QModelIndex(), start, end)
+            del self._tasks[start:end + 1]
+            self.endRemoveRows()
+            if row is not None:
+                end = start = row
+
+        self._rows = {task['id']: row for row, task in enumerate(self._tasks)}
+
+
+class RequestFilterProxyModel(QSortFilterProxyModel):
+    """Сортировка и фильтрация таблицы запросов по статусу, символу и типу"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.status_filter = None
+        self.symbol_filter = ""
+        self.type_filter = None
+        self.setSortRole(Qt.UserRole)
+        self.setDynamicSortFilter(True)
+
+    def set_status_filter(self, status):
+        self.status_filter = status or None
+        self.invalidateFilter()
+
+    def set_symbol_filter(self, text):
+        self.symbol_filter = text.strip().upper()
+        self.invalidateFilter()
+
+    def set_type_filter(self, task_type):
+        self.type_filter = task_type or None
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        task = self.sourceModel().task_at(source_row)
+
+        if self.status_filter and task.get('status') != self.status_filter:
+            return False
+        if self.type_filter and task.get('task_type') != self.type_filter:
+            return False
+        if self.symbol_filter and self.symbol_filter not in (task.get('symbol') or '').upper():
+            return False
+        return True
+
+
 class PipeTab(QWidget):
-    def __init__(self, request_queue):
+    TASK_STATUSES = ['queued', 'in_progress', 'rate_limited', 'completed', 'error', 'cancelled']
+
+    METRIC_COLUMNS = ["Source", "Count", "Queue p95", "Rate limit p95", "Network p95",
+                      "Cache read p95", "Parse p95", "Callback p95", "Total p50", "Total p95"]
+    METRIC_STAGES = [metrics.QUEUE_WAIT, metrics.RATE_LIMIT_WAIT, metrics.NETWORK,
+                     metrics.CACHE_READ, metrics.PARSE, metrics.CALLBACK]
+    # Метрики обновляются реже таблиц: каждый METRICS_EVERY-й тик таймера
+    METRICS_EVERY = 4
+
+    JOB_COLUMNS = ["Job", "Description", "Status", "Pages", "Progress", "Candles", "Speed", "ETA"]
+
+    STALL_COLUMNS = ["Time", "Duration", "Blocked in"]
+
+    def __init__(self, request_queue, backfill_manager=None, watchdog=None):
         super().__init__()
         self.request_queue = request_queue
+        self.backfill_manager = backfill_manager
+        self.watchdog = watchdog
+        self._ticks = 0
+        self._stalls_shown = 0
+        self._stalls = []
         self.init_ui()
 
         # Обновляем информацию каждые 500 мс
@@ -159,28 +374,102 @@ class PipeTab(QWidget):
         # Добавляем группу управления в layout
         scroll_layout.addWidget(control_group)
 
+        # Полосы обслуживания: очередь и время ожидания задач по полосам
+        lanes_group = QGroupBox("Lanes")
+        lanes_group.setObjectName("lanesGroup")
+        lanes_layout = QGridLayout(lanes_group)
+        for column, title in enumerate(("Lane", "Queued", "Running", "Avg wait", "P95 wait", "Max wait")):
+            header_label = QLabel(title)
+            header_label.setObjectName("cardTitle")
+            lanes_layout.addWidget(header_label, 0, column)
+
+        self.lane_labels = {}
+        for row, lane in enumerate(LANES, start=1):
+            lanes_layout.addWidget(QLabel(lane), row, 0)
+            labels = {}
+            for column, key in enumerate(('queued', 'in_flight', 'avg', 'p95', 'max'), start=1):
+                labels[key] = QLabel("0")
+                lanes_layout.addWidget(labels[key], row, column)
+            self.lane_labels[lane] = labels
+
+        scroll_layout.addWidget(lanes_group)
+
+        # Время этапов конвейера по типам задач и методам бирж
+        scroll_layout.addWidget(self._create_metrics_group())
+
+        # Задания загрузки истории (доступны при подключенном хранилище)
+        if self.backfill_manager is not None:
+            scroll_layout.addWidget(self._create_jobs_group())
+
+        # Зависания цикла событий со стеком главного потока
+        if self.watchdog is not None:
+            scroll_layout.addWidget(self._create_stalls_group())
+
         # Группа для таблицы запросов
         table_group = QGroupBox("Active Requests")
         table_group.setObjectName("tableGroup")
         table_layout = QVBoxLayout(table_group)
 
-        # Таблица с текущими запросами
-        self.table = QTableWidget(0, 6)
-        self.table.setHorizontalHeaderLabels(["ID", "Status", "Exchange", "Symbol", "Timeframe", "Priority"])
+        # Фильтры таблицы
+        filter_layout = QHBoxLayout()
+        filter_layout.setSpacing(5)
+
+        self.status_filter = QComboBox()
+        self.status_filter.setObjectName("styledComboBox")
+        self.status_filter.addItem("All statuses", "")
+        for status in self.TASK_STATUSES:
+            self.status_filter.addItem(status.upper(), status)
+        filter_layout.addWidget(self.status_filter)
+
+        self.type_filter = QComboBox()
+        self.type_filter.setObjectName("styledComboBox")
+        self.type_filter.addItem("All types", "")
+        for task_type in self.request_queue.TASK_TYPES:
+            self.type_filter.addItem(task_type, task_type)
+        filter_layout.addWidget(self.type_filter)
+
+        self.symbol_filter = QLineEdit()
+        self.symbol_filter.setObjectName("styledLineEdit")
+        self.symbol_filter.setPlaceholderText("Filter by symbol...")
+        filter_layout.addWidget(self.symbol_filter, 1)
+
+        table_layout.addLayout(filter_layout)
+
+        # Таблица с запросами: модель поверх индекса задач очереди
+        self.table_model = RequestTableModel(self.request_queue, self)
+        self.proxy_model = RequestFilterProxyModel(self)
+        self.proxy_model.setSourceModel(self.table_model)
+
+        self.status_filter.currentIndexChanged.connect(
+            lambda: self.proxy_model.set_status_filter(self.status_filter.currentData()))
+        self.type_filter.currentIndexChanged.connect(
+            lambda: self.proxy_model.set_type_filter(self.type_filter.currentData()))
+        self.symbol_filter.textChanged.connect(self.proxy_model.set_symbol_filter)
+
+        self.table = QTableView()
+        self.table.setModel(self.proxy_model)
         self.table.setObjectName("requestsTable")
         self.table.verticalHeader().setVisible(False)
         self.table.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.table.setMinimumHeight(200)
-
-        # Настраиваем адаптивность колонок
+        # Без начальной сортировки строки идут в порядке добавления задач;
+        # сортировка включается кликом по заголовку
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.table.setSortingEnabled(True)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+
+        # Фиксированная высота строк: представление не измеряет десятки тысяч строк
+        vertical_header = self.table.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.Fixed)
+        vertical_header.setDefaultSectionSize(24)
+
+        # Настраиваем адаптивность колонок (без ResizeToContents - он обходит все строки)
         header = self.table.horizontalHeader()
-        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)  # ID
-        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)  # Status
-        header.setSectionResizeMode(2, QHeaderView.ResizeToContents)  # Exchange
-        header.setSectionResizeMode(3, QHeaderView.Stretch)           # Symbol
-        header.setSectionResizeMode(4, QHeaderView.ResizeToContents)  # Timeframe
-        header.setSectionResizeMode(5, QHeaderView.ResizeToContents)  # Priority
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(4, QHeaderView.Stretch)  # Symbol
         header.setMinimumSectionSize(60)
+        for column, width in ((0, 70), (1, 140), (2, 110), (3, 90), (5, 90), (6, 70), (7, 90), (8, 80)):
+            self.table.setColumnWidth(column, width)
 
         table_layout.addWidget(self.table)
 
@@ -191,6 +480,229 @@ class PipeTab(QWidget):
         scroll_area.setWidget(scroll_content)
         layout.addWidget(scroll_area)
 
+    def _create_metrics_group(self):
+        metrics_group = QGroupBox("Pipeline Metrics")
+        metrics_group.setObjectName("metricsGroup")
+        metrics_layout = QVBoxLayout(metrics_group)
+
+        self.cache_label = QLabel("Cache hit ratio: -")
+        self.cache_label.setObjectName("cardTitle")
+        metrics_layout.addWidget(self.cache_label)
+
+        self.metrics_table = QTableWidget(0, len(self.METRIC_COLUMNS))
+        self.metrics_table.setObjectName("requestsTable")
+        self.metrics_table.setHorizontalHeaderLabels(self.METRIC_COLUMNS)
+        self.metrics_table.verticalHeader().setVisible(False)
+        self.metrics_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.metrics_table.setMinimumHeight(120)
+        header = self.metrics_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        for column in range(1, len(self.METRIC_COLUMNS)):
+            self.metrics_table.setColumnWidth(column, 95)
+        metrics_layout.addWidget(self.metrics_table)
+
+        return metrics_group
+
+    @staticmethod
+    def _format_seconds(seconds):
+        return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+    def _update_metrics(self):
+        snapshot = self.request_queue.get_metrics()
+
+        self.cache_label.setText("Cache hit ratio: " + (", ".join(
+            f"{layer} {stats['ratio']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})"
+            for layer, stats in sorted(snapshot['cache'].items())) or "-"))
+
+        # Строки: типы задач, затем методы бирж (у них нет очереди и callback)
+        rows = [(task_type, stages) for task_type, stages in sorted(snapshot['task'].items())]
+        rows += [(endpoint, stages) for endpoint, stages in sorted(snapshot['endpoint'].items())]
+        self.metrics_table.setRowCount(len(rows))
+        for row, (source, stages) in enumerate(rows):
+            reference = stages.get(metrics.TOTAL) or stages.get(metrics.NETWORK) or {}
+            values = [source, str(reference.get('count', 0))]
+            for stage in self.METRIC_STAGES:
+                values.append(self._format_seconds(stages[stage]['p95']) if stage in stages else "-")
+            total = stages.get(metrics.TOTAL)
+            values.append(self._format_seconds(total['p50']) if total else "-")
+            values.append(self._format_seconds(total['p95']) if total else "-")
+            for column, value in enumerate(values):
+                item = self.metrics_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.metrics_table.setItem(row, column, item)
+                item.setText(value)
+
+    def _create_jobs_group(self):
+        jobs_group = QGroupBox("Backfill Jobs")
+        jobs_group.setObjectName("jobsGroup")
+        jobs_layout = QVBoxLayout(jobs_group)
+
+        # Параметры нового задания
+        form_layout = QHBoxLayout()
+        form_layout.setSpacing(5)
+
+        self.job_symbols = QLineEdit()
+        self.job_symbols.setObjectName("styledLineEdit")
+        self.job_symbols.setPlaceholderText("BTC/USDT,ETH/USDT")
+        form_layout.addWidget(self.job_symbols, 2)
+
+        self.job_timeframes = QLineEdit("1h")
+        self.job_timeframes.setObjectName("styledLineEdit")
+        self.job_timeframes.setPlaceholderText("1h,1d")
+        form_layout.addWidget(self.job_timeframes, 1)
+
+        self.job_start = QDateEdit(QDate.currentDate().addYears(-1))
+        self.job_start.setCalendarPopup(True)
+        self.job_start.setDisplayFormat("yyyy-MM-dd")
+        form_layout.addWidget(self.job_start)
+
+        self.job_end = QDateEdit(QDate.currentDate())
+        self.job_end.setCalendarPopup(True)
+        self.job_end.setDisplayFormat("yyyy-MM-dd")
+        form_layout.addWidget(self.job_end)
+
+        start_btn = QPushButton("Start Backfill")
+        start_btn.setObjectName("controlButton")
+        start_btn.clicked.connect(self.start_backfill)
+        form_layout.addWidget(start_btn)
+
+        retry_btn = QPushButton("Retry Failed")
+        retry_btn.setObjectName("controlButton")
+        retry_btn.clicked.connect(self.retry_failed_jobs)
+        form_layout.addWidget(retry_btn)
+
+        jobs_layout.addLayout(form_layout)
+
+        # Прогресс заданий: страницы, свечи, скорость и оценка времени
+        self.jobs_table = QTableWidget(0, len(self.JOB_COLUMNS))
+        self.jobs_table.setObjectName("requestsTable")
+        self.jobs_table.setHorizontalHeaderLabels(self.JOB_COLUMNS)
+        self.jobs_table.verticalHeader().setVisible(False)
+        self.jobs_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.jobs_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.jobs_table.setMinimumHeight(120)
+        header = self.jobs_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        for column, width in ((0, 50), (2, 90), (3, 110), (4, 80), (5, 90), (6, 100), (7, 80)):
+            self.jobs_table.setColumnWidth(column, width)
+        jobs_layout.addWidget(self.jobs_table)
+
+        return jobs_group
+
+    def _create_stalls_group(self):
+        stalls_group = QGroupBox("Event Loop Stalls")
+        stalls_group.setObjectName("stallsGroup")
+        stalls_layout = QVBoxLayout(stalls_group)
+
+        self.loop_latency_label = QLabel("Event loop latency: -")
+        self.loop_latency_label.setObjectName("cardTitle")
+        stalls_layout.addWidget(self.loop_latency_label)
+
+        self.stalls_table = QTableWidget(0, len(self.STALL_COLUMNS))
+        self.stalls_table.setObjectName("requestsTable")
+        self.stalls_table.setHorizontalHeaderLabels(self.STALL_COLUMNS)
+        self.stalls_table.verticalHeader().setVisible(False)
+        self.stalls_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.stalls_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.stalls_table.setMinimumHeight(100)
+        header = self.stalls_table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        self.stalls_table.setColumnWidth(0, 90)
+        self.stalls_table.setColumnWidth(1, 90)
+        self.stalls_table.itemSelectionChanged.connect(self._show_stall_stack)
+        stalls_layout.addWidget(self.stalls_table)
+
+        # Полный стек выбранного зависания
+        self.stall_stack = QPlainTextEdit()
+        self.stall_stack.setReadOnly(True)
+        self.stall_stack.setMaximumHeight(160)
+        self.stall_stack.setPlaceholderText("Select a stall to see the main thread stack")
+        stalls_layout.addWidget(self.stall_stack)
+
+        return stalls_group
+
+    def _update_stalls(self):
+        summary = self.watchdog.summary()
+        self.loop_latency_label.setText(
+            f"Event loop latency: p50 {self._format_seconds(summary['p50'])}, "
+            f"p95 {self._format_seconds(summary['p95'])}, max {self._format_seconds(summary['max'])}; "
+            f"stalls: {summary['stalls']}")
+
+        # Таблица перестраивается только при новых зависаниях
+        if summary['stalls'] == self._stalls_shown:
+            return
+        self._stalls_shown = summary['stalls']
+        self._stalls = self.watchdog.stalls()
+        self.stalls_table.setRowCount(len(self._stalls))
+        for row, stall in enumerate(self._stalls):
+            values = (datetime.fromtimestamp(stall['time']).strftime("%H:%M:%S"),
+                      self._format_seconds(stall['duration']), stall['location'])
+            for column, value in enumerate(values):
+                item = self.stalls_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.stalls_table.setItem(row, column, item)
+                item.setText(value)
+        self._show_stall_stack()
+
+    def _show_stall_stack(self):
+        rows = self.stalls_table.selectionModel().selectedRows()
+        if not rows or rows[0].row() >= len(self._stalls):
+            self.stall_stack.clear()
+            return
+        stack = self._stalls[rows[0].row()]['stack']
+        self.stall_stack.setPlainText("\n".join(
+            f'File "{filename}", line {lineno}, in {name}\n    {line}' for filename, lineno, name, line in stack))
+
+    def start_backfill(self):
+        symbols = [s.strip().upper() for s in self.job_symbols.text().split(',') if s.strip()]
+        timeframes = [t.strip() for t in self.job_timeframes.text().split(',') if t.strip()]
+        start = datetime.combine(self.job_start.date().toPyDate(), datetime.min.time(), timezone.utc)
+        end = datetime.combine(self.job_end.date().toPyDate(), datetime.min.time(), timezone.utc)
+        if not symbols or not timeframes or start >= end:
+            QMessageBox.warning(self, "Backfill", "Enter symbols, timeframes and a non-empty date range")
+            return
+
+        try:
+            self.backfill_manager.create_job(symbols, timeframes, start, end)
+        except Exception as e:
+            QMessageBox.critical(self, "Backfill", f"Error starting backfill: {e}")
+            return
+        self.job_symbols.clear()
+        self._update_jobs()
+
+    def retry_failed_jobs(self):
+        for job in self.backfill_manager.jobs():
+            if job['status'] in ('failed', 'cancelled'):
+                self.backfill_manager.retry(job['id'])
+        self._update_jobs()
+
+    def _update_jobs(self):
+        jobs = self.backfill_manager.jobs()
+        self.jobs_table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            progress = 100 * job['done'] / job['total'] if job['total'] else 100
+            pages = f"{job['done']}/{job['total']}"
+            if job['errors']:
+                pages += f" ({job['errors']} err)"
+            eta = "-"
+            if job['status'] == 'running' and job['eta'] is not None:
+                minutes, seconds = divmod(int(job['eta']), 60)
+                eta = f"{minutes}m {seconds:02d}s"
+            values = (job['id'], job['description'], job['status'], pages, f"{progress:.1f}%",
+                      job['rows'], f"{job['throughput']:.0f}/s", eta)
+            for column, value in enumerate(values):
+                item = self.jobs_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    self.jobs_table.setItem(row, column, item)
+                item.setText(str(value))
+
+    @profiled("ui:update_stats")
     def update_stats(self):
         # Обновляем информацию о состоянии очереди
         queue_stats = self.request_queue.get_stats()
@@ -205,6 +717,10 @@ class PipeTab(QWidget):
         else:
             self.rate_limit_card.setValue("OK")
             self.rate_limit_card.setColor("success")
+        # Лимиты у каждой биржи свои: показываем, какие именно ограничены
+        self.rate_limit_card.setToolTip(
+            ", ".join(f"{exchange}: {seconds}s" for exchange, seconds in
+                      sorted(queue_stats['rate_limits'].items())))
 
         # Обновляем карточку времени сброса
         if queue_stats['reset_time'] > 0:
@@ -212,12 +728,33 @@ class PipeTab(QWidget):
         else:
             self.reset_time_card.setValue("N/A")
 
-        # Обновляем карточку обработанных запросов
-        self.processed_card.setValue(len(queue_stats['tasks']))
+        # Обновляем карточку обработанных запросов (итог за все время работы)
+        self.processed_card.setValue(queue_stats['processed'])
+        status_totals = queue_stats['status_totals']
+        self.processed_card.setToolTip(
+            ", ".join(f"{status}: {count}" for status, count in sorted(status_totals.items())))
 
         # Обновляем прогресс-бар
         self.progress_bar.setValue(queue_stats['progress'])
 
+        # Обновляем метрики полос
+        for lane, lane_stats in queue_stats['lanes'].items():
+            labels = self.lane_labels[lane]
+            labels['queued'].setText(str(lane_stats['queued']))
+            labels['in_flight'].setText(str(lane_stats['in_flight']))
+            for key in ('avg', 'p95', 'max'):
+                labels[key].setText(f"{lane_stats[key]:.2f}s")
+
+        if self.backfill_manager is not None:
+            self._update_jobs()
+
+        if self.watchdog is not None:
+            self._update_stalls()
+
+        self._ticks += 1
+        if self._ticks % self.METRICS_EVERY == 1:
+            self._update_metrics()
+
         # Обновляем текст кнопки паузы
         if queue_stats['paused']:
             self.pause_btn.setText("Resume Queue")
@@ -233,65 +770,12 @@ class PipeTab(QWidget):
         self.pause_btn.style().polish(self.pause_btn)
 
         # Обновляем таблицу
-        self.update_table(queue_stats['tasks'])
-
-    def update_table(self, tasks):
-        # Очищаем и заново заполняем таблицу
-        self.table.setRowCount(len(tasks))
-
-        for row, task in enumerate(tasks):
-            # ID
-            id_item = QTableWidgetItem(str(task['id']))
-            id_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(row, 0, id_item)
-
-            # Status
-            status_item = QTableWidgetItem(task['status'].upper())
-            status_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(row, 1, status_item)
-
-            # Exchange
-            exchange_item = QTableWidgetItem(task['exchange'])
-            self.table.setItem(row, 2, exchange_item)
-
-            # Symbol
-            symbol_item = QTableWidgetItem(task['symbol'])
-            self.table.setItem(row, 3, symbol_item)
-
-            # Timeframe
-            timeframe_item = QTableWidgetItem(task.get('timeframe', '-'))
-            timeframe_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(row, 4, timeframe_item)
-
-            # Priority
-            priority_item = QTableWidgetItem(str(task['priority']))
-            priority_item.setTextAlignment(Qt.AlignCenter)
-            self.table.setItem(row, 5, priority_item)
-
-            # Раскрашиваем строки в зависимости от статуса
-            status_color = {
-                'completed': "rgba(76, 175, 80, 0.2)",
-                'error': "rgba(244, 67, 54, 0.2)",
-                'in_progress': "rgba(255, 193, 7, 0.2)",
-                'rate_limited': "rgba(156, 39, 176, 0.2)",
-                'queued': "rgba(33, 150, 243, 0.15)",
-                'cancelled': "rgba(158, 158, 158, 0.2)"
-            }
-
-            bg_color = status_color.get(task['status'].lower(), "transparent")
-            for col in range(6):
-                self.table.item(row, col).setBackground(QColor('white'))
-
-                # Дополнительное форматирование для статуса
-                if col == 1:
-                    if task['status'] == 'completed':
-                        self.table.item(row, col).setForeground(QColor('#4CAF50'))
-                    elif task['status'] == 'error':
-                        self.table.item(row, col).setForeground(QColor('#F44336'))
-                    elif task['status'] == 'in_progress':
-                        self.table.item(row, col).setForeground(QColor('#FFC107'))
-                    elif task['status'] == 'rate_limited':
-                        self.table.item(row, col).setForeground(QColor('#9C27B0'))
+        self.update_table()
+
+    @profiled("ui:update_table")
+    def update_table(self):
+        # Модель получает только изменившиеся задачи и обновляет соответствующие строки
+        self.table_model.refresh()
 
     def toggle_queue(self):
         if self.request_queue.is_paused():
@@ -6,6 +6,10 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
 from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QIcon, QColor
 
+from core.config import PROFILE_DIR
+from core.exporter import EXPORT_FORMATS, DEFAULT_EXPORT_FORMAT
+from core.profiler import profiler
+
 
 class ColorSelector(QFrame):
     def __init__(self, default_color="#4CAF50", parent=None):
@@ -57,6 +61,10 @@ class SettingsTab(QWidget):
         export_tab = self.create_export_settings()
         tabs.addTab(export_tab, QIcon("resources/icons/export_settings.png"), "Export")
 
+        # Вкладка диагностики: профилирование во время работы
+        diagnostics_tab = self.create_diagnostics_settings()
+        tabs.addTab(diagnostics_tab, "Diagnostics")
+
         # Добавляем вкладки в основной layout
         layout.addWidget(tabs)
 
@@ -310,6 +318,14 @@ class SettingsTab(QWidget):
         default_path.setText("~/crypto_data")
         default_path.setObjectName("styledLineEdit")
         file_layout.addRow(QLabel("Default Export Path:"), default_path)
+
+        # Формат файла экспорта
+        self.export_format = QComboBox()
+        for key, (title, extension, _) in EXPORT_FORMATS.items():
+            self.export_format.addItem(f"{title} (*.{extension})", key)
+        self.export_format.setCurrentIndex(self.export_format.findData(DEFAULT_EXPORT_FORMAT))
+        self.export_format.setObjectName("styledComboBox")
+        file_layout.addRow(QLabel("Export Format:"), self.export_format)
         
         # Опция сохранения только на локальной машине
         self.save_locally = QCheckBox("Save on local machine only")
@@ -379,6 +395,80 @@ class SettingsTab(QWidget):
         scroll.setWidget(widget)
         return scroll
         
+    def create_diagnostics_settings(self):
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setFrameShape(QFrame.NoFrame)
+
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(10, 10, 10, 10)
+        layout.setSpacing(15)
+
+        # Группа профилирования (core.profiler)
+        profiling_group = QGroupBox("Profiling")
+        profiling_group.setObjectName("settingsGroup")
+        profiling_layout = QFormLayout(profiling_group)
+        profiling_layout.setFieldGrowthPolicy(QFormLayout.ExpandingFieldsGrow)
+
+        self.profile_cpu = QCheckBox("Enabled")
+        self.profile_cpu.setChecked(profiler.running)
+        self.profile_cpu.toggled.connect(self.toggle_profiling)
+        profiling_layout.addRow(QLabel("Sample CPU stacks:"), self.profile_cpu)
+
+        self.profile_memory = QCheckBox("Enabled")
+        self.profile_memory.setChecked(profiler.tracing_memory)
+        self.profile_memory.setToolTip("tracemalloc slows down every allocation while enabled")
+        self.profile_memory.toggled.connect(self.toggle_profiling)
+        profiling_layout.addRow(QLabel("Track allocations:"), self.profile_memory)
+
+        self.profile_interval = QSpinBox()
+        self.profile_interval.setRange(1, 1000)
+        self.profile_interval.setValue(max(1, int(profiler.interval * 1000)))
+        self.profile_interval.setSuffix(" ms")
+        self.profile_interval.setObjectName("styledSpinBox")
+        self.profile_interval.valueChanged.connect(lambda value: setattr(profiler, 'interval', value / 1000))
+        profiling_layout.addRow(QLabel("Sampling interval:"), self.profile_interval)
+
+        buttons_layout = QHBoxLayout()
+        dump_btn = QPushButton("Dump Profile")
+        dump_btn.setObjectName("secondaryButton")
+        dump_btn.clicked.connect(self.dump_profile)
+        buttons_layout.addWidget(dump_btn)
+        reset_btn = QPushButton("Reset Samples")
+        reset_btn.setObjectName("secondaryButton")
+        reset_btn.clicked.connect(profiler.reset)
+        buttons_layout.addWidget(reset_btn)
+        buttons_layout.addStretch()
+        profiling_layout.addRow("", buttons_layout)
+
+        self.profile_status = QLabel(f"Profiles are written to {PROFILE_DIR}")
+        self.profile_status.setWordWrap(True)
+        profiling_layout.addRow("", self.profile_status)
+
+        layout.addWidget(profiling_group)
+        layout.addStretch()
+
+        scroll.setWidget(widget)
+        return scroll
+
+    def toggle_profiling(self, _checked=None):
+        """Включает профилировщик по флажкам; учет памяти работает только вместе с сэмплами CPU"""
+        if self.profile_cpu.isChecked():
+            profiler.start(trace_memory=self.profile_memory.isChecked())
+        else:
+            profiler.stop()
+
+    def dump_profile(self):
+        """Пишет свернутые стеки и сводку на диск"""
+        try:
+            paths = profiler.dump()
+        except Exception as e:
+            from PyQt5.QtWidgets import QMessageBox
+            QMessageBox.warning(self, "Error", f"Failed to write profile: {str(e)}")
+            return
+        self.profile_status.setText("Profile written:\n" + "\n".join(paths))
+
     def toggle_remote_settings(self, checked):
         """Включает/выключает настройки удаленного сервера в зависимости от флажка локального сохранения"""
         self.remote_group.setEnabled(not checked)
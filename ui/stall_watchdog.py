@@ -0,0 +1,124 @@
+"""
+Сторож цикла событий Qt
+
+Таймер в главном потоке отмечает каждый свой тик; по опозданию тиков
+считается задержка цикла событий. Вспомогательный поток следит за
+отметками: если главный поток не отмечался дольше порога, он снимает стек
+главного потока (sys._current_frames) - это место, где цикл событий
+заблокирован. Когда тики возобновляются, зависание с длительностью и стеком
+попадает в кольцо последних зависаний.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from PyQt5.QtCore import QObject, QTimer
+
+from core.config import STALL_THRESHOLD
+from core.metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+# Каталог приложения: в сводке зависания показывается самый глубокий кадр из него
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StallWatchdog(QObject):
+    """
+    Задержка цикла событий и зависания главного потока
+
+    Создается в главном потоке. Если главный поток занят кодом на C, не
+    отпускающим GIL, стек снимается по его окончании и может показать уже
+    сам цикл событий - длительность при этом остается верной.
+    """
+
+    def __init__(self, threshold=STALL_THRESHOLD, interval=0.05, history=50, parent=None):
+        super().__init__(parent)
+        self.threshold = threshold
+        self.interval = interval
+        self.latency = Histogram()  # Опоздание тиков таймера, секунды
+        self.total = 0  # Зависаний за все время
+        self._stalls = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._main_ident = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self._on_tick)
+
+    def start(self):
+        self._beat = time.monotonic()
+        self._timer.start(int(self.interval * 1000))
+        self._thread = threading.Thread(target=self._watch, name="StallWatchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._timer.stop()
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _on_tick(self):
+        now = time.monotonic()
+        with self._lock:
+            self.latency.observe(max(0.0, now - self._beat - self.interval))
+            self._beat = now
+
+    def _capture_stack(self):
+        """Стек главного потока: [(файл, строка, функция, код)] от внешнего кадра к внутреннему"""
+        frame = sys._current_frames().get(self._main_ident)
+        if frame is None:
+            return []
+        return [(entry.filename, entry.lineno, entry.name, entry.line or '')
+                for entry in traceback.extract_stack(frame)]
+
+    @staticmethod
+    def _location(stack):
+        """Самый глубокий кадр приложения - краткое описание места зависания"""
+        for filename, lineno, name, _ in reversed(stack):
+            if filename.startswith(APP_ROOT):
+                return f"{os.path.relpath(filename, APP_ROOT)}:{lineno} {name}"
+        if stack:
+            filename, lineno, name, _ = stack[-1]
+            return f"{os.path.basename(filename)}:{lineno} {name}"
+        return "-"
+
+    def _watch(self):
+        pending = None  # Текущее зависание: отметка, на которой оно началось, и стек
+        while not self._stop.wait(self.interval / 2):
+            with self._lock:
+                beat = self._beat
+            if pending is None:
+                if time.monotonic() - beat >= self.threshold:
+                    stack = self._capture_stack()
+                    pending = {'beat': beat, 'time': time.time() - (time.monotonic() - beat), 'stack': stack}
+            elif beat != pending['beat']:
+                # Главный поток снова обрабатывает события
+                stall = {
+                    'time': pending['time'],
+                    'duration': max(0.0, beat - pending['beat'] - self.interval),
+                    'location': self._location(pending['stack']),
+                    'stack': pending['stack'],
+                }
+                with self._lock:
+                    self._stalls.append(stall)
+                    self.total += 1
+                logger.warning("Event loop stalled for %.2fs in %s", stall['duration'], stall['location'])
+                pending = None
+
+    def stalls(self):
+        """Последние зависания, новые первыми"""
+        with self._lock:
+            return list(reversed(self._stalls))
+
+    def summary(self):
+        """Задержка цикла событий: summary() гистограммы и число зависаний"""
+        with self._lock:
+            return dict(self.latency.summary(), stalls=self.total)